@@ -0,0 +1,178 @@
+// Nucleo do firmware do carrinho, sem nenhuma dependencia do Arduino.
+// O mesmo codigo roda no neward.ino e no simulador do PC (firmware/sim), para testar e medir no Linux.
+//
+// - Parser incremental: recebe um byte por vez num buffer fixo, sem String e sem alocacao.
+// - Tick de controle em taxa fixa: o PWM so muda nos ticks, independente de quando os bytes chegam.
+// - Rampa: a cada tick o PWM de cada roda anda no maximo 'rampaPorTick' em direcao ao alvo
+//   (evita picos de corrente e o carrinho empinando nas trocas de sentido).
+// - Watchdog: sem nenhum comando valido por 'timeoutWatchdogMs', as duas rodas param na hora.
+// - Rodas independentes: cada uma tem o seu alvo e o seu PWM atual.
+//
+// Protocolo binario v1 (mesmo formato de software/protocol.py)
+// Comando: SYNC, versao<<4|tipo, seq, esquerda (int16 LE), direita (int16 LE), CRC-8
+// Ack:     SYNC, versao<<4|tipo, seq, status, CRC-8
+#ifndef CONTROLE_H
+#define CONTROLE_H
+
+#include <stdint.h>
+
+const uint8_t SYNC = 0xA5;
+const uint8_t VERSAO = 1;
+const uint8_t TIPO_COMANDO = 0x1;
+const uint8_t TIPO_ACK = 0x2;
+const uint8_t TAMANHO_COMANDO = 8;
+const uint8_t TAMANHO_ACK = 5;
+const uint8_t STATUS_OK = 0;
+const int16_t PWM_MAX = 255;
+
+struct Controle {
+  // Configuracao
+  uint16_t periodoTickMs;     // 10 ms = 100 Hz
+  int16_t rampaPorTick;       // Variacao maxima de PWM por tick (15 -> 0 a 255 em ~170 ms)
+  uint16_t timeoutWatchdogMs; // O host repete o comando a cada 200 ms; 500 ms sem nada = link caiu
+
+  // Parser: buffer fixo, nada e alocado durante a leitura
+  uint8_t quadro[TAMANHO_COMANDO];
+  uint8_t posicao;
+
+  // Alvo (ultimo comando recebido) e PWM aplicado de cada roda
+  int16_t alvoEsquerda, alvoDireita;
+  int16_t pwmEsquerda, pwmDireita;
+
+  uint32_t ultimoComandoMs;
+  uint32_t proximoTickMs;
+  bool paradoPeloWatchdog;
+
+  // Contadores para diagnostico e para o simulador
+  uint32_t quadrosOk;
+  uint32_t errosCrc;
+  uint32_t bytesDescartados;
+  uint32_t ticks;
+  uint32_t disparosWatchdog;
+};
+
+inline uint8_t crc8(const uint8_t *dados, uint8_t tamanho) {
+  uint8_t crc = 0;
+  for (uint8_t i = 0; i < tamanho; i++) {
+    crc ^= dados[i];
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+inline int16_t limitarPwm(int16_t pwm) {
+  if (pwm > PWM_MAX) return PWM_MAX;
+  if (pwm < -PWM_MAX) return -PWM_MAX;
+  return pwm;
+}
+
+inline void iniciarControle(Controle &c, uint32_t agora, uint16_t periodoTickMs = 10, int16_t rampaPorTick = 15,
+                            uint16_t timeoutWatchdogMs = 500) {
+  c.periodoTickMs = periodoTickMs;
+  c.rampaPorTick = rampaPorTick;
+  c.timeoutWatchdogMs = timeoutWatchdogMs;
+  c.posicao = 0;
+  c.alvoEsquerda = c.alvoDireita = 0;
+  c.pwmEsquerda = c.pwmDireita = 0;
+  c.ultimoComandoMs = agora;
+  c.proximoTickMs = agora + periodoTickMs;
+  c.paradoPeloWatchdog = true; // Comeca parado ate o primeiro comando
+  c.quadrosOk = c.errosCrc = c.bytesDescartados = c.ticks = c.disparosWatchdog = 0;
+}
+
+// Monta o ack de 'seq' em 'ack' (5 bytes)
+inline void montarAck(uint8_t *ack, uint8_t seq, uint8_t status) {
+  ack[0] = SYNC;
+  ack[1] = (VERSAO << 4) | TIPO_ACK;
+  ack[2] = seq;
+  ack[3] = status;
+  ack[4] = crc8(ack + 1, 3);
+}
+
+// Confere versao, tipo e CRC de um quadro completo e guarda o alvo das rodas
+inline bool processarQuadro(Controle &c, uint32_t agora) {
+  if (crc8(c.quadro + 1, TAMANHO_COMANDO - 2) != c.quadro[TAMANHO_COMANDO - 1]) {
+    c.errosCrc++;
+    return false;
+  }
+  c.alvoEsquerda = limitarPwm((int16_t)(c.quadro[3] | (c.quadro[4] << 8)));
+  c.alvoDireita = limitarPwm((int16_t)(c.quadro[5] | (c.quadro[6] << 8)));
+  c.ultimoComandoMs = agora;
+  c.paradoPeloWatchdog = false;
+  c.quadrosOk++;
+  return true;
+}
+
+// Descarta o SYNC do inicio do buffer e recomeca no proximo SYNC ja recebido (se houver), como o
+// FrameParser do PC: um quadro que chegou com um byte a menos engoliu o SYNC do quadro seguinte,
+// e recomecar do zero perderia esse quadro bom tambem.
+inline void ressincronizar(Controle &c) {
+  uint8_t inicio = 1;
+  for (;;) {
+    while (inicio < c.posicao && c.quadro[inicio] != SYNC) inicio++;
+    c.bytesDescartados += inicio;
+    for (uint8_t i = inicio; i < c.posicao; i++) c.quadro[i - inicio] = c.quadro[i];
+    c.posicao -= inicio;
+    if (c.posicao < 2 || c.quadro[1] == ((VERSAO << 4) | TIPO_COMANDO)) return;
+    inicio = 1;  // Cabecalho desconhecido depois do SYNC: procura o proximo
+  }
+}
+
+// Recebe um byte por vez. Retorna true quando fecha um comando valido; o seq dele fica em *seq (para o ack).
+// Um byte perdido so faz o parser esperar o proximo SYNC.
+inline bool receberByte(Controle &c, uint8_t b, uint32_t agora, uint8_t *seq) {
+  if (c.posicao == 0) {
+    if (b == SYNC) c.quadro[c.posicao++] = b;
+    else c.bytesDescartados++;
+    return false;
+  }
+  c.quadro[c.posicao++] = b;
+  if (c.posicao == 2 && b != ((VERSAO << 4) | TIPO_COMANDO)) {
+    // Cabecalho desconhecido: talvez este byte seja o inicio de um novo quadro
+    ressincronizar(c);
+    return false;
+  }
+  if (c.posicao == TAMANHO_COMANDO) {
+    if (processarQuadro(c, agora)) {
+      c.posicao = 0;
+      *seq = c.quadro[2];
+      return true;
+    }
+    ressincronizar(c);
+  }
+  return false;
+}
+
+// Aproxima 'atual' do 'alvo' em no maximo 'passo'
+inline int16_t rampa(int16_t atual, int16_t alvo, int16_t passo) {
+  if (alvo > atual + passo) return atual + passo;
+  if (alvo < atual - passo) return atual - passo;
+  return alvo;
+}
+
+// Chamado a cada volta do loop(). Retorna true quando um tick rodou (o PWM pode ter mudado).
+// Os ticks seguem uma grade fixa; se o loop atrasar mais de um periodo, a grade e reiniciada
+// em vez de rodar varios ticks seguidos para "compensar".
+inline bool tickControle(Controle &c, uint32_t agora) {
+  if ((int32_t)(agora - c.proximoTickMs) < 0) return false;
+  c.proximoTickMs += c.periodoTickMs;
+  if ((int32_t)(agora - c.proximoTickMs) >= 0) c.proximoTickMs = agora + c.periodoTickMs;
+  c.ticks++;
+
+  // Watchdog: link mudo = parada imediata, sem rampa
+  if (!c.paradoPeloWatchdog && agora - c.ultimoComandoMs > c.timeoutWatchdogMs) {
+    c.paradoPeloWatchdog = true;
+    c.disparosWatchdog++;
+    c.alvoEsquerda = c.alvoDireita = 0;
+    c.pwmEsquerda = c.pwmDireita = 0;
+    return true;
+  }
+
+  c.pwmEsquerda = rampa(c.pwmEsquerda, c.alvoEsquerda, c.rampaPorTick);
+  c.pwmDireita = rampa(c.pwmDireita, c.alvoDireita, c.rampaPorTick);
+  return true;
+}
+
+#endif
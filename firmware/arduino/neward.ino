@@ -1,17 +1,49 @@
 #include <SoftwareSerial.h>
+#include "controle.h" // Parser, tick, rampa e watchdog (o mesmo codigo do simulador em firmware/sim)
 
 SoftwareSerial bluetooth(2, 3); // RX, TX
 
+// Velocidade do link. O HC-05 precisa estar configurado igual (AT+UART=38400,0,0)
+const long velocidadeSerial = 38400;
+
 // Pinos do L298N
+// ENA e ENB agora estao em pinos PWM diferentes (antes os dois usavam o 11), entao cada roda
+// tem o seu proprio PWM. Religar: ENB no pino 10 e IN4 no pino 12.
 const int pinoEna = 11;
-const int pinoEnb = 11;
+const int pinoEnb = 10;
 const int pinoIn1 = 5;
 const int pinoIn2 = 6;
 const int pinoIn3 = 9;
-const int pinoIn4 = 10;
+const int pinoIn4 = 12;
+
+Controle controle;
+
+void enviarAck(byte seq, byte status) {
+  byte ack[TAMANHO_ACK];
+  montarAck(ack, seq, status);
+  bluetooth.write(ack, sizeof(ack));
+}
+
+// Aplica o PWM com sinal em um motor: positivo = frente, negativo = tras
+void acionarMotor(int pinoEn, int pinoA, int pinoB, int pwm) {
+  if (pwm > 0) {
+    digitalWrite(pinoA, HIGH); digitalWrite(pinoB, LOW);
+  } else if (pwm < 0) {
+    digitalWrite(pinoA, LOW); digitalWrite(pinoB, HIGH);
+  } else {
+    digitalWrite(pinoA, LOW); digitalWrite(pinoB, LOW);
+  }
+  analogWrite(pinoEn, abs(pwm));
+}
+
+// Motor A (ENA, IN1, IN2) = roda esquerda, motor B (ENB, IN3, IN4) = roda direita.
+void aplicarRodas(int esquerda, int direita) {
+  acionarMotor(pinoEna, pinoIn1, pinoIn2, esquerda);
+  acionarMotor(pinoEnb, pinoIn3, pinoIn4, direita);
+}
 
 void setup() {
-  bluetooth.begin(9600);
+  bluetooth.begin(velocidadeSerial);
   pinMode(pinoEna, OUTPUT);
   pinMode(pinoEnb, OUTPUT);
   pinMode(pinoIn1, OUTPUT);
@@ -20,58 +52,24 @@ void setup() {
   pinMode(pinoIn4, OUTPUT);
 
   // velocidade inicial = 0
-  analogWrite(pinoEna, 0);
-  analogWrite(pinoEnb, 0);
+  iniciarControle(controle, millis());
+  aplicarRodas(0, 0);
 }
 
 void loop() {
-  if (bluetooth.available() > 0) {
-    // Lê até encontrar '\n' (enviado pelo Python)
-    String comando = bluetooth.readStringUntil('\n');
+  uint32_t agora = millis();
 
-    if (comando.length() > 0) {
-      char direcao = comando.charAt(0);           // ex: 'F'
-      int velocidade = comando.substring(1).toInt(); // ex: "5" → 5
-
-      // Escala 0–9 (do Python) para 0–255 (PWM do Arduino)
-      int pwm = map(velocidade, 0, 9, 0, 255);
-
-      switch (direcao) {
-        case 'F': // Frente
-          analogWrite(pinoEna, pwm);
-          analogWrite(pinoEnb, pwm);
-          digitalWrite(pinoIn1, HIGH); digitalWrite(pinoIn2, LOW);
-          digitalWrite(pinoIn3, HIGH); digitalWrite(pinoIn4, LOW);
-          break;
-
-        case 'B': // Trás
-          analogWrite(pinoEna, pwm);
-          analogWrite(pinoEnb, pwm);
-          digitalWrite(pinoIn1, LOW); digitalWrite(pinoIn2, HIGH);
-          digitalWrite(pinoIn3, LOW); digitalWrite(pinoIn4, HIGH);
-          break;
-
-        case 'L': // Esquerda
-          analogWrite(pinoEna, pwm);
-          analogWrite(pinoEnb, pwm);
-          digitalWrite(pinoIn1, LOW); digitalWrite(pinoIn2, HIGH);
-          digitalWrite(pinoIn3, HIGH); digitalWrite(pinoIn4, LOW);
-          break;
-
-        case 'R': // Direita
-          analogWrite(pinoEna, pwm);
-          analogWrite(pinoEnb, pwm);
-          digitalWrite(pinoIn1, HIGH); digitalWrite(pinoIn2, LOW);
-          digitalWrite(pinoIn3, LOW); digitalWrite(pinoIn4, HIGH);
-          break;
-
-        default: // Parado
-          analogWrite(pinoEna, 0);
-          analogWrite(pinoEnb, 0);
-          digitalWrite(pinoIn1, LOW); digitalWrite(pinoIn2, LOW);
-          digitalWrite(pinoIn3, LOW); digitalWrite(pinoIn4, LOW);
-          break;
-      }
+  // Consome tudo o que chegou sem bloquear (sem readStringUntil e sem String no heap).
+  // O comando so muda o alvo; os motores sao atualizados no tick.
+  while (bluetooth.available() > 0) {
+    byte seq;
+    if (receberByte(controle, bluetooth.read(), agora, &seq)) {
+      enviarAck(seq, STATUS_OK);
     }
   }
+
+  // Tick em taxa fixa: rampa ate o alvo e watchdog
+  if (tickControle(controle, agora)) {
+    aplicarRodas(controle.pwmEsquerda, controle.pwmDireita);
+  }
 }
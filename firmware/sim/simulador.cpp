@@ -0,0 +1,222 @@
+// Simulador do nucleo do firmware (firmware/arduino/controle.h) no PC, sem placa.
+// Roda o parser, o tick, a rampa e o watchdog com um relogio simulado, confere o comportamento
+// e mede quanto tempo de CPU cada parte gasta.
+//
+//   make -C firmware/sim          (compila e roda)
+//   ./firmware/sim/simulador --trace   (imprime o PWM de cada tick de um cenario com queda do link)
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <vector>
+
+#include "../arduino/controle.h"
+
+static int falhas = 0;
+
+#define CONFERE(condicao)                                               \
+  do {                                                                  \
+    if (!(condicao)) {                                                  \
+      std::printf("FALHOU linha %d: %s\n", __LINE__, #condicao);        \
+      falhas++;                                                         \
+    }                                                                   \
+  } while (0)
+
+// Mesmo formato de software/protocol.py: encode_command
+static void montarComando(uint8_t *q, uint8_t seq, int16_t esquerda, int16_t direita) {
+  q[0] = SYNC;
+  q[1] = (VERSAO << 4) | TIPO_COMANDO;
+  q[2] = seq;
+  q[3] = (uint8_t)(esquerda & 0xFF);
+  q[4] = (uint8_t)((uint16_t)esquerda >> 8);
+  q[5] = (uint8_t)(direita & 0xFF);
+  q[6] = (uint8_t)((uint16_t)direita >> 8);
+  q[7] = crc8(q + 1, TAMANHO_COMANDO - 2);
+}
+
+// Entrega os bytes ao parser e devolve quantos comandos validos fecharam
+static int alimentar(Controle &c, const uint8_t *dados, size_t n, uint32_t agora) {
+  int validos = 0;
+  uint8_t seq;
+  for (size_t i = 0; i < n; i++) {
+    if (receberByte(c, dados[i], agora, &seq)) validos++;
+  }
+  return validos;
+}
+
+// Avanca o relogio simulado ms a ms rodando o tick, como o loop() faria
+static void avancar(Controle &c, uint32_t &agora, uint32_t ms) {
+  for (uint32_t i = 0; i < ms; i++) {
+    agora++;
+    tickControle(c, agora);
+  }
+}
+
+static void testeParser() {
+  Controle c;
+  iniciarControle(c, 0);
+  uint8_t q[TAMANHO_COMANDO];
+
+  montarComando(q, 7, 200, -150);
+  uint8_t seq = 0;
+  bool fechou = false;
+  for (int i = 0; i < TAMANHO_COMANDO; i++) fechou = receberByte(c, q[i], 0, &seq);
+  CONFERE(fechou && seq == 7);
+  CONFERE(c.alvoEsquerda == 200 && c.alvoDireita == -150);
+
+  // CRC errado e rejeitado
+  montarComando(q, 8, 100, 100);
+  q[7] ^= 0xFF;
+  CONFERE(alimentar(c, q, sizeof(q), 0) == 0);
+  CONFERE(c.errosCrc == 1 && c.alvoEsquerda == 200);
+
+  // Lixo (incluindo um SYNC solto) antes de um quadro bom: o parser se ressincroniza
+  uint8_t fluxo[3 + TAMANHO_COMANDO] = {0x00, SYNC, 0x42};
+  montarComando(fluxo + 3, 9, -255, 255);
+  CONFERE(alimentar(c, fluxo, sizeof(fluxo), 0) == 1);
+  CONFERE(c.alvoEsquerda == -255 && c.alvoDireita == 255);
+
+  // SYNC seguido de outro SYNC (o segundo inicia o quadro)
+  uint8_t duplo[1 + TAMANHO_COMANDO] = {SYNC};
+  montarComando(duplo + 1, 10, 5, 6);
+  CONFERE(alimentar(c, duplo, sizeof(duplo), 0) == 1);
+
+  // Quadro com um byte perdido seguido de um quadro bom: o quadro curto falha no CRC com o SYNC do
+  // proximo dentro dele, e o parser recomeca nesse SYNC em vez de perder o quadro bom tambem
+  uint8_t perdido[2 * TAMANHO_COMANDO - 1];
+  montarComando(perdido, 12, 30, 40);
+  std::memmove(perdido + 4, perdido + 5, TAMANHO_COMANDO - 5);
+  montarComando(perdido + TAMANHO_COMANDO - 1, 13, -30, -40);
+  uint32_t errosAntes = c.errosCrc;
+  CONFERE(alimentar(c, perdido, sizeof(perdido), 0) == 1);
+  CONFERE(c.errosCrc == errosAntes + 1 && c.alvoEsquerda == -30 && c.alvoDireita == -40);
+
+  // Valores fora da faixa sao limitados a +-255
+  montarComando(q, 11, 1000, -1000);
+  alimentar(c, q, sizeof(q), 0);
+  CONFERE(c.alvoEsquerda == PWM_MAX && c.alvoDireita == -PWM_MAX);
+}
+
+static void testeTickRampaWatchdog() {
+  Controle c;
+  uint32_t agora = 0;
+  iniciarControle(c, agora, 10, 15, 500);
+  uint8_t q[TAMANHO_COMANDO];
+
+  // Taxa fixa: 1 s de relogio = 100 ticks
+  avancar(c, agora, 1000);
+  CONFERE(c.ticks == 100);
+
+  // Rampa: de 0 a 255 em passos de 15 (17 ticks), rodas independentes
+  montarComando(q, 1, 255, 60);
+  alimentar(c, q, sizeof(q), agora);
+  avancar(c, agora, 10);
+  CONFERE(c.pwmEsquerda == 15 && c.pwmDireita == 15);
+  avancar(c, agora, 160);
+  CONFERE(c.pwmEsquerda == 255 && c.pwmDireita == 60);
+
+  // Troca de sentido passa pelo zero na rampa
+  montarComando(q, 2, -255, 60);
+  alimentar(c, q, sizeof(q), agora);
+  avancar(c, agora, 170);
+  CONFERE(c.pwmEsquerda == 0);
+  avancar(c, agora, 170);
+  CONFERE(c.pwmEsquerda == -255);
+
+  // Com o comando repetido a cada 200 ms o watchdog nao dispara
+  for (int i = 0; i < 10; i++) {
+    montarComando(q, (uint8_t)(3 + i), -255, 60);
+    alimentar(c, q, sizeof(q), agora);
+    avancar(c, agora, 200);
+  }
+  CONFERE(c.disparosWatchdog == 0 && c.pwmEsquerda == -255);
+
+  // Link mudo: parada imediata depois do timeout (sem rampa)
+  avancar(c, agora, 250);  // 450 ms desde o ultimo comando
+  CONFERE(c.pwmEsquerda == -255);
+  avancar(c, agora, 100);
+  CONFERE(c.disparosWatchdog == 1 && c.pwmEsquerda == 0 && c.pwmDireita == 0);
+
+  // Loop atrasado (ex: 35 ms travado): um tick so, e a grade e reiniciada
+  uint32_t ticks = c.ticks;
+  agora += 35;
+  CONFERE(tickControle(c, agora));
+  CONFERE(!tickControle(c, agora));
+  CONFERE(c.ticks == ticks + 1);
+
+  // Relogio dando a volta (millis() estoura em ~49 dias)
+  iniciarControle(c, 0xFFFFFFF0u);
+  agora = 0xFFFFFFF0u;
+  avancar(c, agora, 100);
+  CONFERE(c.ticks == 10);
+}
+
+// Cenario impresso com --trace: um unico comando e depois o link cai (watchdog em ~500 ms)
+static void trace() {
+  Controle c;
+  uint32_t agora = 0;
+  iniciarControle(c, agora);
+  uint8_t q[TAMANHO_COMANDO];
+  montarComando(q, 1, 255, 120);
+  alimentar(c, q, sizeof(q), agora);
+  std::printf("ms,alvo_esq,alvo_dir,pwm_esq,pwm_dir\n");
+  for (uint32_t ms = 1; ms <= 1200; ms++) {
+    agora = ms;
+    if (tickControle(c, agora)) {
+      std::printf("%u,%d,%d,%d,%d\n", (unsigned)ms, c.alvoEsquerda, c.alvoDireita, c.pwmEsquerda, c.pwmDireita);
+    }
+  }
+}
+
+static double nanossegundos(std::chrono::steady_clock::time_point inicio, size_t n) {
+  auto fim = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(fim - inicio).count() / (double)n;
+}
+
+static void benchmark() {
+  // 200 mil quadros com 1 byte de lixo a cada 10 quadros
+  const size_t quadros = 200000;
+  std::vector<uint8_t> fluxo;
+  fluxo.reserve(quadros * (TAMANHO_COMANDO + 1));
+  uint8_t q[TAMANHO_COMANDO];
+  std::srand(1);
+  for (size_t i = 0; i < quadros; i++) {
+    montarComando(q, (uint8_t)i, (int16_t)(std::rand() % 511 - 255), (int16_t)(std::rand() % 511 - 255));
+    fluxo.insert(fluxo.end(), q, q + TAMANHO_COMANDO);
+    if (i % 10 == 0) fluxo.push_back((uint8_t)std::rand());
+  }
+
+  Controle c;
+  iniciarControle(c, 0);
+  auto inicio = std::chrono::steady_clock::now();
+  int validos = alimentar(c, fluxo.data(), fluxo.size(), 0);
+  double porByte = nanossegundos(inicio, fluxo.size());
+  std::printf("parser: %zu bytes, %d quadros validos, %.1f ns/byte\n", fluxo.size(), validos, porByte);
+
+  const size_t ticks = 10000000;
+  uint32_t agora = 0;
+  iniciarControle(c, agora);
+  inicio = std::chrono::steady_clock::now();
+  for (size_t i = 0; i < ticks; i++) {
+    agora += c.periodoTickMs;
+    if ((i & 63) == 0) {
+      c.alvoEsquerda = (int16_t)((i >> 6) % 511 - 255);
+      c.ultimoComandoMs = agora;
+      c.paradoPeloWatchdog = false;
+    }
+    tickControle(c, agora);
+  }
+  std::printf("tick: %.1f ns/tick (pwm final %d)\n", nanossegundos(inicio, ticks), c.pwmEsquerda);
+}
+
+int main(int argc, char **argv) {
+  if (argc > 1 && std::strcmp(argv[1], "--trace") == 0) {
+    trace();
+    return 0;
+  }
+  testeParser();
+  testeTickRampaWatchdog();
+  std::printf(falhas ? "%d verificacoes falharam\n" : "todas as verificacoes passaram\n", falhas);
+  benchmark();
+  return falhas ? 1 : 0;
+}
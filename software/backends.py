@@ -0,0 +1,286 @@
+# --- Backends de Inferência do Modelo de Pose ---
+# Antes o YOLO("yolo11n-pose.pt") era sempre PyTorch em modo eager: importar o ultralytics (e o torch)
+# deixava a partida lenta e a primeira inferência, bem mais lenta que as outras, acontecia dentro do loop
+# de controle, dando um tranco no carrinho no primeiro frame.
+# Aqui o modelo pode rodar exportado para ONNX Runtime ou OpenVINO, que na CPU são bem mais rápidos.
+# O modelo exportado fica em cache no disco, com o hash do .pt e o imgsz no nome, então a exportação
+# só acontece uma vez. Se o runtime não estiver instalado ou a exportação falhar, volta para o Ultralytics.
+# Todos os imports pesados são feitos só quando o backend é criado, e warmup() roda inferências de
+# aquecimento antes da câmera abrir.
+#
+# Todos os backends têm a mesma interface:
+#   infer(frame, imgsz) -> (keypoints (P, 17, 2), caixas (P, 4) em xyxy), em coordenadas do frame,
+#   ordenados pela confiança. Keypoints não detectados ficam em (0, 0), como no Ultralytics.
+#   infer_batch(frames, imgsz) -> lista com o resultado de infer() de cada frame (usado na análise offline).
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import shutil
+
+import numpy as np
+import cv2
+
+
+BACKENDS = ('auto', 'onnx', 'openvino', 'ultralytics')
+MODELO_PADRAO = "yolo11n-pose.pt"
+CACHE_PADRAO = os.path.join(os.path.expanduser("~"), ".cache", "ufrbots", "modelos")
+
+NUM_KEYPOINTS = 17
+
+
+def _vazio():
+    return np.zeros((0, NUM_KEYPOINTS, 2), dtype=np.float32), np.zeros((0, 4), dtype=np.float32)
+
+
+# Hash do arquivo do modelo (primeiros 16 dígitos do sha256): um .pt novo com o mesmo nome gera outra exportação.
+def model_hash(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:16]
+
+
+# Caminho local dos pesos do modelo. Se o arquivo não existe (ex: primeira execução numa máquina nova), os pesos
+# oficiais com esse nome (ex: yolo11n-pose.pt) são baixados pelo Ultralytics, como o YOLO(modelo) faria.
+def resolve_model(modelo):
+    if os.path.exists(modelo):
+        return modelo
+    from ultralytics.utils.downloads import attempt_download_asset
+    return str(attempt_download_asset(modelo))
+
+
+class UltralyticsBackend:
+    # O caminho original: PyTorch pelo Ultralytics. Aceita qualquer imgsz.
+    nome = 'ultralytics'
+
+    # threads: limite de threads da CPU do torch (None = padrão, todos os núcleos).
+    def __init__(self, modelo=MODELO_PADRAO, threads=None):
+        from ultralytics import YOLO  # Importa o torch; só acontece quando este backend é usado.
+        self.model = YOLO(modelo)
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+    @staticmethod
+    def _converter(resultado):
+        if len(resultado.boxes) == 0:
+            return _vazio()
+        keypoints = resultado.keypoints.xy.cpu().numpy()
+        caixas = resultado.boxes.xyxy.cpu().numpy()
+        return keypoints, caixas
+
+    def infer(self, frame, imgsz):
+        results = self.model(frame, imgsz=imgsz, verbose=False) # verbose=False para não poluir o terminal.
+        return self._converter(results[0])
+
+    # Vários frames numa única chamada do modelo (um lote só na GPU/CPU).
+    def infer_batch(self, frames, imgsz):
+        results = self.model(list(frames), imgsz=imgsz, verbose=False)
+        return [self._converter(resultado) for resultado in results]
+
+    # Roda 'repeticoes' inferências num frame preto para cada imgsz (compilação, alocação de memória, caches).
+    def warmup(self, imgsz_opcoes, formato=(480, 640, 3), repeticoes=2):
+        frame = np.zeros(formato, dtype=np.uint8)
+        for imgsz in imgsz_opcoes:
+            for _ in range(repeticoes):
+                self.infer(frame, imgsz)
+
+
+class _ExportedBackend(ABC):
+    # Base dos modelos exportados (entrada fixa imgsz x imgsz): faz o letterbox, a decodificação da saída
+    # (1, 56, N) = caixa cx,cy,w,h + confiança + 17 x (x, y, visibilidade) e o NMS, que o Ultralytics fazia.
+    # Cada imgsz usado pelo agendador tem o seu modelo exportado, carregado na primeira vez que aparece.
+    nome = None
+    formato_exportacao = None
+    extensao = None
+
+    # threads: limite de threads da CPU do runtime (None = padrão do runtime, em geral todos os núcleos).
+    def __init__(self, modelo=MODELO_PADRAO, cache=CACHE_PADRAO, conf=0.25, iou=0.7, threads=None):
+        # O hash precisa do .pt no disco: baixa os pesos antes, senão o 'auto' cairia sempre para o Ultralytics.
+        self.modelo = resolve_model(modelo)
+        self.cache = cache
+        self.threads = threads
+        self.conf = conf  # Confiança mínima de uma pessoa (mesmo padrão do Ultralytics).
+        self.iou = iou    # IoU do NMS.
+        self._hash = model_hash(self.modelo)
+        self._sessoes = {}
+
+    # Caminho do modelo exportado no cache, ex: ~/.cache/ufrbots/modelos/yolo11n-pose-<hash>-320.onnx
+    def caminho_cache(self, imgsz):
+        base = os.path.splitext(os.path.basename(self.modelo))[0]
+        return os.path.join(self.cache, f"{base}-{self._hash}-{imgsz}{self.extensao}")
+
+    # Exporta o modelo de um imgsz para o cache (se ainda não estiver lá) e retorna o caminho.
+    def export(self, imgsz):
+        destino = self.caminho_cache(imgsz)
+        if os.path.exists(destino):
+            return destino
+        from ultralytics import YOLO  # Só para exportar, uma única vez por modelo e imgsz.
+        print(f"Exportando {self.modelo} para {self.nome} com imgsz={imgsz} (só na primeira vez)...")
+        exportado = YOLO(self.modelo).export(format=self.formato_exportacao, imgsz=imgsz, verbose=False)
+        os.makedirs(self.cache, exist_ok=True)
+        shutil.move(str(exportado), destino)
+        return destino
+
+    def _sessao(self, imgsz):
+        sessao = self._sessoes.get(imgsz)
+        if sessao is None:
+            sessao = self._carregar(self.export(imgsz))
+            self._sessoes[imgsz] = sessao
+        return sessao
+
+    # Abre o modelo exportado em 'caminho' no runtime e retorna a sessão usada por _executar.
+    @abstractmethod
+    def _carregar(self, caminho):
+        ...
+
+    # Roda a entrada (1, 3, imgsz, imgsz) na sessão e retorna a saída (1, 56, N).
+    @abstractmethod
+    def _executar(self, sessao, entrada):
+        ...
+
+    def infer(self, frame, imgsz):
+        altura, largura = frame.shape[:2]
+        # Letterbox: redimensiona mantendo a proporção e completa com cinza até imgsz x imgsz.
+        escala = min(imgsz / altura, imgsz / largura)
+        nova_largura, nova_altura = int(round(largura * escala)), int(round(altura * escala))
+        pad_x, pad_y = (imgsz - nova_largura) // 2, (imgsz - nova_altura) // 2
+        quadro = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+        quadro[pad_y:pad_y + nova_altura, pad_x:pad_x + nova_largura] = cv2.resize(
+            frame, (nova_largura, nova_altura), interpolation=cv2.INTER_LINEAR)
+        # BGR -> RGB, 0-1, NCHW float32.
+        entrada = cv2.dnn.blobFromImage(quadro, 1.0 / 255.0, swapRB=True)
+
+        saida = self._executar(self._sessao(imgsz), entrada)[0].T  # (N, 56)
+        saida = saida[saida[:, 4] > self.conf]
+        if len(saida) == 0:
+            return _vazio()
+
+        cx, cy, w, h = saida[:, 0], saida[:, 1], saida[:, 2], saida[:, 3]
+        caixas_xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        indices = cv2.dnn.NMSBoxes(caixas_xywh.tolist(), saida[:, 4].tolist(), self.conf, self.iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)  # Já vêm ordenados pela confiança.
+        saida = saida[indices]
+        caixas_xywh = caixas_xywh[indices]
+
+        # Volta do letterbox para as coordenadas do frame.
+        deslocamento = np.array([pad_x, pad_y], dtype=np.float32)
+        caixas = np.concatenate([caixas_xywh[:, :2], caixas_xywh[:, :2] + caixas_xywh[:, 2:]], axis=1)
+        caixas = (caixas - np.tile(deslocamento, 2)) / escala
+        kp = saida[:, 5:].reshape(-1, NUM_KEYPOINTS, 3)
+        keypoints = (kp[..., :2] - deslocamento) / escala
+        # Pontos pouco visíveis vão para (0, 0), como o Ultralytics faz com keypoints.xy.
+        keypoints[kp[..., 2] < 0.5] = 0
+        return keypoints.astype(np.float32), caixas.astype(np.float32)
+
+    # Os modelos exportados têm lote fixo de 1 frame: o lote é processado frame a frame, na mesma sessão.
+    def infer_batch(self, frames, imgsz):
+        return [self.infer(frame, imgsz) for frame in frames]
+
+    # Exporta/carrega o modelo de cada imgsz e roda 'repeticoes' inferências num frame preto.
+    def warmup(self, imgsz_opcoes, formato=(480, 640, 3), repeticoes=2):
+        frame = np.zeros(formato, dtype=np.uint8)
+        for imgsz in imgsz_opcoes:
+            for _ in range(repeticoes):
+                self.infer(frame, imgsz)
+
+
+class OnnxBackend(_ExportedBackend):
+    nome = 'onnx'
+    formato_exportacao = 'onnx'
+    extensao = '.onnx'
+
+    def __init__(self, modelo=MODELO_PADRAO, cache=CACHE_PADRAO, conf=0.25, iou=0.7, threads=None):
+        import onnxruntime  # Falha aqui (e cai para o próximo backend) se não estiver instalado.
+        self._ort = onnxruntime
+        super().__init__(modelo, cache, conf, iou, threads)
+
+    def _carregar(self, caminho):
+        opcoes = self._ort.SessionOptions()
+        opcoes.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            # O ONNX Runtime ignora OMP_NUM_THREADS: o limite precisa estar nas opções da sessão.
+            opcoes.intra_op_num_threads = self.threads
+            opcoes.inter_op_num_threads = 1
+        sessao = self._ort.InferenceSession(caminho, opcoes, providers=self._ort.get_available_providers())
+        return sessao, sessao.get_inputs()[0].name
+
+    def _executar(self, sessao, entrada):
+        sessao, nome_entrada = sessao
+        return sessao.run(None, {nome_entrada: entrada})[0]
+
+
+class OpenVINOBackend(_ExportedBackend):
+    # O Ultralytics exporta o OpenVINO como um diretório com o .xml e o .bin.
+    nome = 'openvino'
+    formato_exportacao = 'openvino'
+    extensao = '_openvino_model'
+
+    def __init__(self, modelo=MODELO_PADRAO, cache=CACHE_PADRAO, conf=0.25, iou=0.7, threads=None):
+        import openvino  # Falha aqui (e cai para o próximo backend) se não estiver instalado.
+        self._core = openvino.Core()
+        super().__init__(modelo, cache, conf, iou, threads)
+
+    def _carregar(self, caminho):
+        xml = next(os.path.join(caminho, nome) for nome in os.listdir(caminho) if nome.endswith('.xml'))
+        configuracao = {'PERFORMANCE_HINT': 'LATENCY'}
+        if self.threads:
+            configuracao['INFERENCE_NUM_THREADS'] = self.threads
+        return self._core.compile_model(xml, 'CPU', configuracao)
+
+    def _executar(self, sessao, entrada):
+        return sessao(entrada)[0]
+
+
+_CLASSES = {'onnx': OnnxBackend, 'openvino': OpenVINOBackend, 'ultralytics': UltralyticsBackend}
+
+
+def _candidatos(nome):
+    if nome not in BACKENDS:
+        raise ValueError(f"backend desconhecido: {nome!r} (opções: {', '.join(BACKENDS)})")
+    return ['onnx', 'openvino'] if nome == 'auto' else [nome]
+
+
+# Tenta os backends exportados de 'nome' na ordem e devolve preparar(backend) do primeiro que funcionar,
+# ou None se todos falharem (ou se 'nome' é o próprio Ultralytics).
+def _primeiro_exportado(nome, modelo, cache, threads, preparar):
+    for candidato in _candidatos(nome):
+        if candidato == 'ultralytics':
+            break
+        try:
+            return preparar(_CLASSES[candidato](modelo, cache, threads=threads))
+        except ImportError as erro:  # Runtime não instalado: no modo 'auto' só passa para o próximo.
+            if nome != 'auto':
+                print(f"Backend {candidato} indisponível ({erro}); usando o Ultralytics.")
+        except Exception as erro:  # Falha na exportação ou no carregamento do modelo.
+            print(f"Backend {candidato} falhou ({erro}); tentando o próximo.")
+    return None
+
+
+# Cria o backend pedido. 'auto' tenta ONNX Runtime, depois OpenVINO, e por fim o Ultralytics.
+# Se um backend exportado não puder ser usado (runtime ausente, exportação falhou), cai para o Ultralytics.
+# imgsz_opcoes: se informado, o modelo de cada imgsz já é exportado/carregado e aquecido aqui.
+# threads: limite de threads da CPU do backend (ex: vários processos dividindo a máquina).
+def load_backend(nome='auto', modelo=MODELO_PADRAO, imgsz_opcoes=None, cache=CACHE_PADRAO, formato=(480, 640, 3),
+                 threads=None):
+    def aquecer(backend):
+        if imgsz_opcoes:
+            backend.warmup(imgsz_opcoes, formato)
+        return backend
+
+    backend = _primeiro_exportado(nome, modelo, cache, threads, aquecer)
+    if backend is None:
+        backend = aquecer(UltralyticsBackend(modelo, threads))
+    return backend
+
+
+# Escolhe o backend como load_backend e deixa o modelo de cada imgsz exportado no cache, mas sem carregá-lo
+# nem aquecê-lo. Retorna o nome do backend escolhido, para load_backend(nome) em outro processo.
+def prepare_backend(nome='auto', modelo=MODELO_PADRAO, imgsz_opcoes=(), cache=CACHE_PADRAO):
+    def exportar(backend):
+        for imgsz in imgsz_opcoes:
+            backend.export(imgsz)
+        return backend.nome
+
+    return _primeiro_exportado(nome, modelo, cache, None, exportar) or 'ultralytics'
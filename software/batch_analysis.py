@@ -0,0 +1,244 @@
+# --- Análise Offline de Sessões de Treino em Lote ---
+# O visamcomp_teste.py só analisa a webcam ao vivo, um frame por vez, e o compute_angle calcula um ângulo
+# de cada vez. Aqui um diretório inteiro de vídeos é processado o mais rápido que a máquina permitir:
+#   - Um processo por vídeo (ProcessPoolExecutor), cada um com o seu modelo carregado uma única vez.
+#   - Inferência em lotes: 'lote' frames por chamada do modelo.
+#   - compute_angles: os ângulos de todas as articulações de todos os frames de um lote em poucas operações NumPy.
+#   - Os resultados são gravados em blocos (chunks) de 'tamanho_chunk' frames, em .npy ou Parquet, sem
+#     guardar o vídeo inteiro na memória. O progresso de cada vídeo fica em progresso.json:
+#     se a análise for interrompida, rodar de novo continua do último bloco gravado.
+#
+# Saída, para cada vídeo: <saida>/<nome do vídeo>/
+#   analise_00000.npy ...   array estruturado DTYPE_ANALISE (abre com np.load(..., mmap_mode='r'))
+#   analise_00000.parquet   (com --formato parquet) colunas frame, pessoas, kp<i>_x, kp<i>_y e um ângulo por coluna
+#   progresso.json          frames já gravados, blocos gravados e se o vídeo terminou
+#
+# Exemplo:
+#   python batch_analysis.py sessoes/videos --saida analises --processos 4 --lote 16
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import cv2
+
+from backends import BACKENDS, MODELO_PADRAO, prepare_backend
+
+
+EXTENSOES_VIDEO = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Articulações analisadas: (início, meio, fim) em índices COCO, como nos argumentos de compute_angle.
+TRIPLAS_ANGULOS = {
+    'cotovelo_esq': (5, 7, 9),
+    'cotovelo_dir': (6, 8, 10),
+    'ombro_esq': (7, 5, 11),
+    'ombro_dir': (8, 6, 12),
+    'quadril_esq': (5, 11, 13),
+    'quadril_dir': (6, 12, 14),
+    'joelho_esq': (11, 13, 15),
+    'joelho_dir': (12, 14, 16),
+}
+
+DTYPE_ANALISE = np.dtype([
+    ('frame', np.int64),
+    ('pessoas', np.int16),                                 # Pessoas detectadas no frame.
+    ('keypoints', np.float32, (17, 2)),                    # Pessoa mais confiante; (0, 0) = não detectado.
+    ('angulos', np.float32, (len(TRIPLAS_ANGULOS),)),      # Graus, na ordem de TRIPLAS_ANGULOS; NaN = indefinido.
+])
+
+
+# Versão vetorizada do compute_angle (visamcomp_teste.py), com a mesma fórmula:
+# o ângulo entre (meio - início) e (fim - meio), em graus.
+# keypoints: (..., 17, 2); triplas: (T, 3). Retorna (..., T), com NaN onde algum dos pontos não foi detectado.
+def compute_angles(keypoints, triplas=tuple(TRIPLAS_ANGULOS.values())):
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    triplas = np.asarray(triplas, dtype=np.intp)
+    start = keypoints[..., triplas[:, 0], :]
+    middle = keypoints[..., triplas[:, 1], :]
+    end = keypoints[..., triplas[:, 2], :]
+    vector1 = middle - start
+    vector2 = end - middle
+    dot_product = np.einsum('...i,...i->...', vector1, vector2)
+    magnitudes = np.linalg.norm(vector1, axis=-1) * np.linalg.norm(vector2, axis=-1)
+    detectados = np.all(keypoints[..., triplas, :] > 0, axis=(-1, -2)) & (magnitudes > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_angle = dot_product / magnitudes
+    angle_deg = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+    return np.where(detectados, angle_deg, np.nan).astype(np.float32)
+
+
+def _escrever_atomico(caminho, escrever):
+    # Escreve num arquivo temporário e renomeia: um bloco interrompido no meio nunca fica pela metade no disco.
+    temporario = caminho + '.tmp'
+    escrever(temporario)
+    os.replace(temporario, caminho)
+
+
+def _gravar_npy(caminho, registros):
+    def escrever(temporario):
+        with open(temporario, 'wb') as arquivo:
+            np.save(arquivo, registros)
+    _escrever_atomico(caminho, escrever)
+
+
+def _gravar_parquet(caminho, registros):
+    import pyarrow as pa  # Opcional: só necessário com --formato parquet.
+    import pyarrow.parquet as pq
+
+    colunas = {'frame': registros['frame'], 'pessoas': registros['pessoas']}
+    for i in range(17):
+        colunas[f'kp{i}_x'] = registros['keypoints'][:, i, 0]
+        colunas[f'kp{i}_y'] = registros['keypoints'][:, i, 1]
+    for j, nome in enumerate(TRIPLAS_ANGULOS):
+        colunas[nome] = registros['angulos'][:, j]
+    _escrever_atomico(caminho, lambda temporario: pq.write_table(pa.table(colunas), temporario))
+
+
+GRAVADORES = {'npy': _gravar_npy, 'parquet': _gravar_parquet}
+
+
+class _Progresso:
+    # progresso.json de um vídeo: quantos frames já estão gravados em blocos completos.
+    def __init__(self, diretorio):
+        self.caminho = os.path.join(diretorio, 'progresso.json')
+        self.dados = {'frames': 0, 'blocos': 0, 'concluido': False}
+        if os.path.exists(self.caminho):
+            with open(self.caminho) as arquivo:
+                self.dados = json.load(arquivo)
+
+    def salvar(self):
+        def escrever(temporario):
+            with open(temporario, 'w') as arquivo:
+                json.dump(self.dados, arquivo)
+        _escrever_atomico(self.caminho, escrever)
+
+
+# Modelo de cada processo do pool, carregado uma vez em _iniciar_processo.
+_backend = None
+
+
+def _iniciar_processo(backend, modelo, threads, imgsz):
+    global _backend
+    # Cada processo usa poucas threads: o paralelismo vem dos processos, não de threads brigando pela CPU.
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    cv2.setNumThreads(threads)
+    from backends import load_backend
+    # O modelo exportado já está no cache (run_batch exporta antes de criar o pool): aqui ele só é carregado.
+    _backend = load_backend(backend, modelo, imgsz_opcoes=(imgsz,), threads=threads)
+
+
+# Analisa um vídeo (roda dentro de um processo do pool). Retorna (caminho, frames analisados agora, segundos).
+def analisar_video(caminho, saida, imgsz=640, lote=16, tamanho_chunk=512, formato='npy'):
+    diretorio = os.path.join(saida, os.path.splitext(os.path.basename(caminho))[0])
+    os.makedirs(diretorio, exist_ok=True)
+    progresso = _Progresso(diretorio)
+    if progresso.dados['concluido']:
+        return caminho, 0, 0.0
+
+    gravar = GRAVADORES[formato]
+    inicio = time.perf_counter()
+    cam = cv2.VideoCapture(caminho)
+    # Retoma depois do último bloco gravado. grab() avança sem converter a imagem (mais barato que read()).
+    for _ in range(progresso.dados['frames']):
+        if not cam.grab():
+            break
+
+    registros = np.zeros(tamanho_chunk, dtype=DTYPE_ANALISE)
+    preenchidos = 0
+    analisados = 0
+    fim = False
+    while not fim:
+        frames = []
+        # O lote nunca passa do fim do bloco atual.
+        while len(frames) < min(lote, tamanho_chunk - preenchidos):
+            ret, frame = cam.read()
+            if not ret:
+                fim = True
+                break
+            frames.append(frame)
+        if frames:
+            resultados = _backend.infer_batch(frames, imgsz)
+            bloco = registros[preenchidos:preenchidos + len(frames)]
+            bloco['frame'] = progresso.dados['frames'] + preenchidos + np.arange(len(frames))
+            for registro, (keypoints, caixas) in zip(bloco, resultados):
+                registro['pessoas'] = len(caixas)
+                registro['keypoints'] = keypoints[0] if len(caixas) else 0
+            preenchidos += len(frames)
+            analisados += len(frames)
+
+        # Bloco cheio (ou fim do vídeo): calcula os ângulos de todos os frames de uma vez e grava.
+        if preenchidos == tamanho_chunk or (fim and preenchidos):
+            prontos = registros[:preenchidos]
+            prontos['angulos'] = compute_angles(prontos['keypoints'])
+            nome = f"analise_{progresso.dados['blocos']:05d}.{formato}"
+            gravar(os.path.join(diretorio, nome), prontos)
+            progresso.dados['frames'] += preenchidos
+            progresso.dados['blocos'] += 1
+            progresso.salvar()
+            preenchidos = 0
+
+    cam.release()
+    progresso.dados['concluido'] = True
+    progresso.salvar()
+    return caminho, analisados, time.perf_counter() - inicio
+
+
+def listar_videos(diretorio):
+    return sorted(os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+                  if nome.lower().endswith(EXTENSOES_VIDEO))
+
+
+def run_batch(diretorio, saida, processos=None, lote=16, imgsz=640, tamanho_chunk=512, formato='npy',
+              backend='auto', modelo=MODELO_PADRAO):
+    videos = listar_videos(diretorio)
+    if not videos:
+        print(f"Nenhum vídeo em {diretorio}")
+        return
+    processos = processos or os.cpu_count() or 1
+    processos = min(processos, len(videos))
+    threads = max(1, (os.cpu_count() or 1) // processos)
+    print(f"{len(videos)} vídeos, {processos} processos com {threads} thread(s) cada")
+
+    # Escolhe o backend e exporta o modelo uma única vez, aqui, antes dos processos: assim uma falha na
+    # exportação cai para o Ultralytics e os processos não exportam o mesmo arquivo ao mesmo tempo.
+    # O modelo não é carregado neste processo: cada processo do pool carrega o seu em _iniciar_processo.
+    backend = prepare_backend(backend, modelo, imgsz_opcoes=(imgsz,))
+    print(f"Backend: {backend}")
+
+    inicio = time.perf_counter()
+    total = 0
+    # 'spawn' em vez do fork padrão do Linux: um fork depois que o torch/OpenMP ou o ONNX Runtime
+    # criaram as suas threads (a exportação acima importa o torch) pode travar os processos filhos.
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_iniciar_processo, initargs=(backend, modelo, threads, imgsz)) as pool:
+        tarefas = [pool.submit(analisar_video, video, saida, imgsz, lote, tamanho_chunk, formato)
+                   for video in videos]
+        for tarefa in as_completed(tarefas):
+            caminho, frames, segundos = tarefa.result()
+            total += frames
+            if frames:
+                print(f"{os.path.basename(caminho)}: {frames} frames em {segundos:.1f} s ({frames / segundos:.1f} fps)")
+            else:
+                print(f"{os.path.basename(caminho)}: já analisado")
+    duracao = time.perf_counter() - inicio
+    if total:
+        print(f"Total: {total} frames em {duracao:.1f} s ({total / duracao:.1f} fps)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Análise offline de pose (keypoints e ângulos) de um diretório de vídeos.")
+    parser.add_argument('diretorio', help="diretório com os vídeos")
+    parser.add_argument('--saida', default='analises', help="diretório onde gravar os resultados")
+    parser.add_argument('--processos', type=int, default=None, help="processos em paralelo (padrão: um por núcleo)")
+    parser.add_argument('--lote', type=int, default=16, help="frames por chamada do modelo")
+    parser.add_argument('--imgsz', type=int, default=640, help="resolução de entrada do modelo")
+    parser.add_argument('--chunk', type=int, default=512, help="frames por bloco gravado")
+    parser.add_argument('--formato', choices=tuple(GRAVADORES), default='npy', help="formato dos blocos")
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help="onde o modelo roda")
+    parser.add_argument('--modelo', default=MODELO_PADRAO, help="arquivo .pt do modelo de pose")
+    args = parser.parse_args()
+    run_batch(args.diretorio, args.saida, args.processos, args.lote, args.imgsz, args.chunk, args.formato,
+              args.backend, args.modelo)
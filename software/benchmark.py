@@ -0,0 +1,123 @@
+# --- Benchmark do Loop de Controle ---
+# Roda o controle por pose (PoseEstimation) sobre uma sessão gravada e o loop do joystick sobre uma
+# trajetória sintética dos eixos, os dois enviando para uma porta serial falsa (pty), sem webcam e sem carrinho.
+# Cada mudança pode ser medida com números reais: p50/p95/p99 de cada etapa e fps.
+#
+# Exemplos:
+#   python benchmark.py pose --replay sessoes/treino1 --saida pose.json
+#   python benchmark.py pose --replay sessoes/treino1 --keypoints   (só o controle, sem o modelo)
+#   python benchmark.py joystick --amostras 2000 --taxa 200 --saida joystick.csv
+import argparse
+import math
+import time
+
+from backends import BACKENDS
+from metrics import LatencyMonitor
+from transport import FakeSerialPort, SerialTransport
+
+
+def _esperar_conexao(transporte, timeout=5.0):
+    limite = time.perf_counter() + timeout
+    while not transporte.conectado and time.perf_counter() < limite:
+        time.sleep(0.01)
+
+
+def _imprimir(titulo, resumo):
+    print(f"\n{titulo}: {resumo['frames']} frames, {resumo['fps']:.1f} fps")
+    print(f"{'etapa':<15}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'n':>8}")
+    for etapa, p in resumo['etapas'].items():
+        print(f"{etapa:<15}{p['p50']:9.3f}{p['p95']:9.3f}{p['p99']:9.3f}{p['n']:8d}")
+
+
+# PoseEstimation alimentado por uma sessão gravada (recorder.py), o mais rápido possível.
+# headless: mede o loop sem os desenhos, como no computador de bordo.
+# backend: onde o modelo roda (ver backends.py), para comparar o tempo de inferência entre eles.
+# Numa sessão com imagens o modelo, o agendador e o rastreador rodam de verdade (detectar_pose);
+# keypoints=True usa os keypoints gravados no lugar deles e mede só o controle.
+def benchmark_pose(replay, limite_frames=None, headless=False, backend='auto', keypoints=False):
+    from yolo_visaocomp_control_ard import PoseEstimation  # Carrega o YOLO; só importa quando usado.
+    from recorder import ReplayCapture
+
+    with FakeSerialPort() as porta:
+        pe = PoseEstimation(None, porta=porta.port, headless=headless, backend=backend)
+        _esperar_conexao(pe.transporte)  # Inclui a pausa de estabilização da conexão (2 s).
+        cam = ReplayCapture(replay, velocidade=0, usar_keypoints=keypoints or None)
+        if cam.usar_keypoints:
+            pe.replay = cam
+        else:
+            print("Rodando o modelo sobre as imagens gravadas")
+
+        frames = 0
+        try:
+            while cam.isOpened() and (limite_frames is None or frames < limite_frames):
+                instante_captura = pe.metricas.tic()
+                ret, frame = cam.read()
+                if not ret:
+                    break
+                pe.metricas.toc('captura', instante_captura)
+                comando_final, _ = pe.processar_frame(frame)
+                pe.enviar_comando(comando_final, instante_captura)
+                frames += 1
+        finally:
+            pe.transporte.close()
+        print(f"Quadros recebidos pela porta falsa: {len(porta.recebidos)}")
+    return pe.metricas
+
+
+# Controle do joystick_control.py (mistura dos eixos + decisão de envio) sobre eixos sintéticos.
+# A trajetória gira o manche em círculo com raio variando, passando por todas as direções e velocidades.
+# taxa: eventos de eixo por segundo (0 = o mais rápido possível, útil para medir só o custo da CPU).
+def benchmark_joystick(amostras=2000, taxa=200):
+    from joystick_control import JoystickController
+
+    metricas = LatencyMonitor()
+    with FakeSerialPort() as porta:
+        transporte = SerialTransport(porta.port, espera_conexao=0, metricas=metricas)
+        transporte.start()
+        _esperar_conexao(transporte)
+        controle = JoystickController(transporte, metricas=metricas)
+
+        periodo = 1.0 / taxa if taxa > 0 else 0.0
+        proxima = time.perf_counter()
+        enviados = 0
+        try:
+            for i in range(amostras):
+                if periodo:
+                    proxima += periodo
+                    espera = proxima - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                angulo = 2 * math.pi * i / 500
+                raio = 0.5 + 0.5 * math.sin(2 * math.pi * i / 3000)
+                enviados += controle.update(raio * math.cos(angulo), raio * math.sin(angulo))
+        finally:
+            transporte.close()
+        time.sleep(0.1)  # Deixa a porta falsa ler os últimos quadros.
+        print(f"Comandos enviados: {enviados}; quadros recebidos pela porta falsa: {len(porta.recebidos)} "
+              f"(comandos substituídos antes da escrita: {transporte.coalescidos})")
+    return metricas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do loop de controle com porta serial falsa.")
+    sub = parser.add_subparsers(dest='alvo', required=True)
+    pose = sub.add_parser('pose', help="PoseEstimation sobre uma sessão gravada")
+    pose.add_argument('--replay', required=True, help="diretório gravado com --gravar")
+    pose.add_argument('--frames', type=int, default=None, help="limita o número de frames")
+    pose.add_argument('--headless', action='store_true', help="pula os desenhos do feedback visual")
+    pose.add_argument('--backend', choices=BACKENDS, default='auto', help="onde o modelo roda")
+    pose.add_argument('--keypoints', action='store_true',
+                      help="usa os keypoints gravados em vez do modelo (mede só o controle)")
+    joystick = sub.add_parser('joystick', help="loop do joystick sobre eixos sintéticos")
+    joystick.add_argument('--amostras', type=int, default=2000)
+    joystick.add_argument('--taxa', type=float, default=200, help="leituras por segundo (0 = sem pausa)")
+    for sub_parser in (pose, joystick):
+        sub_parser.add_argument('--saida', default=None, help="arquivo .json ou .csv com o resultado")
+    args = parser.parse_args()
+
+    if args.alvo == 'pose':
+        metricas = benchmark_pose(args.replay, args.frames, args.headless, args.backend, args.keypoints)
+    else:
+        metricas = benchmark_joystick(args.amostras, args.taxa)
+    resumo = metricas.export(args.saida) if args.saida else metricas.summary()
+    _imprimir(args.alvo, resumo)
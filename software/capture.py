@@ -0,0 +1,137 @@
+# --- Captura de Vídeo de Várias Fontes com Buffers Reutilizáveis ---
+# O cv2.VideoCapture(0) estava fixo no código, e cada cam.read() alocava um frame novo
+# (mais uma cópia inteira no cv2.flip). No computador de bordo isso é pressão de memória e de GC a cada frame.
+# Capture aceita índice de webcam, arquivo de vídeo, URL RTSP ou diretório de imagens, com a mesma
+# interface do cv2.VideoCapture (isOpened / read / release), e lê em buffers NumPy reaproveitados:
+# depois dos primeiros frames, read() não aloca mais nada.
+#
+# Um buffer só volta a ser usado depois que quem consumiu o frame o devolve com recycle(frame)
+# (o loop sequencial devolve no fim de cada iteração, o pipeline depois da exibição ou de um descarte).
+# Enquanto um frame não é devolvido a captura nunca escreve nele; se não houver buffer livre, ela aloca outro.
+# Um frame que nunca é devolvido só deixa de ser reaproveitado.
+import os
+import threading
+import weakref
+
+import numpy as np
+import cv2
+
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+# Espelha keypoints (..., 2) na horizontal, para um frame de largura 'largura', sem mexer na imagem.
+# Pontos não detectados (0, 0) continuam em (0, 0).
+def mirror_keypoints(keypoints, largura):
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    detectados = np.all(keypoints > 0, axis=-1)
+    espelhados = keypoints.copy()
+    espelhados[..., 0] = np.where(detectados, largura - keypoints[..., 0], 0)
+    return espelhados
+
+
+# Espelha caixas (N, 4) em xyxy na horizontal.
+def mirror_boxes(caixas, largura):
+    caixas = np.asarray(caixas, dtype=np.float32)
+    return np.stack([largura - caixas[:, 2], caixas[:, 1], largura - caixas[:, 0], caixas[:, 3]], axis=1)
+
+
+class FramePool:
+    # Lista de buffers livres do mesmo formato. Um buffer emprestado por lend() só volta a ficar
+    # livre quando é devolvido com release(); arrays que não foram emprestados pela lista são ignorados.
+    # tamanho: quantos buffers livres no máximo ficam guardados.
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._livres = []
+        # id(array) -> array. Referências fracas: um frame nunca devolvido não fica preso aqui.
+        self._emprestados = weakref.WeakValueDictionary()
+        self._trava = threading.Lock()  # No pipeline, read() e release() rodam em threads diferentes.
+
+    # Um buffer livre do formato pedido, ou None. Buffers de outro formato (a resolução mudou) são descartados.
+    def acquire(self, formato=None):
+        with self._trava:
+            while self._livres:
+                buffer = self._livres.pop()
+                if formato is None or buffer.shape == formato:
+                    return buffer
+            return None
+
+    def lend(self, frame):
+        with self._trava:
+            self._emprestados[id(frame)] = frame
+
+    def release(self, frame):
+        with self._trava:
+            if self._emprestados.pop(id(frame), None) is not None and len(self._livres) < self.tamanho:
+                self._livres.append(frame)
+
+
+class Capture:
+    # fonte: índice da webcam (0 ou "0"), arquivo de vídeo, URL (rtsp://, http://) ou diretório de imagens.
+    # largura / altura / fps: pedidos à câmera ao vivo (ela pode não aceitar e usar o mais próximo).
+    # buffer: frames guardados pelo driver; 1 = sempre o mais novo (menos latência em câmeras ao vivo).
+    # tamanho_pool: quantos buffers devolvidos ficam guardados para as próximas leituras.
+    def __init__(self, fonte=0, largura=None, altura=None, fps=None, buffer=1, tamanho_pool=6):
+        self.fonte = fonte
+        self.pool = FramePool(tamanho_pool)
+        self.formato = None
+        self.realocacoes = 0  # Leituras que precisaram de um array novo (nenhum buffer livre, ou mudança de tamanho).
+        self._imagens = None
+        self._cap = None
+
+        if isinstance(fonte, str) and fonte.isdigit():
+            fonte = int(fonte)
+        if isinstance(fonte, str) and os.path.isdir(fonte):
+            self._imagens = sorted(os.path.join(fonte, nome) for nome in os.listdir(fonte)
+                                   if nome.lower().endswith(EXTENSOES_IMAGEM))
+            self._proxima_imagem = 0
+            return
+
+        self._cap = cv2.VideoCapture(fonte)
+        ao_vivo = isinstance(fonte, int) or '://' in str(fonte)
+        if ao_vivo:
+            if largura:
+                self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, largura)
+            if altura:
+                self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, altura)
+            if fps:
+                self._cap.set(cv2.CAP_PROP_FPS, fps)
+            if buffer:
+                self._cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer)
+
+    def isOpened(self):
+        if self._imagens is not None:
+            return self._proxima_imagem < len(self._imagens)
+        return self._cap.isOpened()
+
+    def read(self):
+        if self._imagens is not None:
+            # cv2.imread não escreve num buffer existente; as imagens de um diretório são lidas normalmente.
+            while self._proxima_imagem < len(self._imagens):
+                frame = cv2.imread(self._imagens[self._proxima_imagem])
+                self._proxima_imagem += 1
+                if frame is not None:
+                    return True, frame
+            return False, None
+
+        buffer = self.pool.acquire(self.formato)
+        # Com um buffer livre do formato certo o OpenCV decodifica direto nele, sem alocar.
+        ret, frame = self._cap.read(buffer) if buffer is not None else self._cap.read()
+        if not ret:
+            return False, None
+        if frame is not buffer:
+            self.realocacoes += 1
+            self.formato = frame.shape
+        self.pool.lend(frame)
+        return True, frame
+
+    # Devolve um frame lido por read() quando ninguém mais vai usá-lo; o buffer volta para as próximas leituras.
+    def recycle(self, frame):
+        if frame is not None:
+            self.pool.release(frame)
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+        elif self._imagens is not None:
+            self._proxima_imagem = len(self._imagens)
@@ -0,0 +1,304 @@
+# --- Carrinho Simulado e Teste de Carga do Caminho de Comandos ---
+# Sem porta COM e sem carrinho não dava para exercitar o joystick_control.py nem o PoseEstimation:
+# um chamava exit() e o outro caía no "modo de teste visual".
+# SimulatedCar é um carrinho de software num pseudo-terminal (pty), falando o protocolo de firmware/arduino/controle.h:
+#   - O link Bluetooth é modelado pela taxa de transmissão: cada byte leva 10 bits / baud para "chegar".
+#   - O tick de 10 ms, a rampa de PWM e o watchdog reproduzem os de controle.h, com os mesmos valores padrão.
+#     Os quadros, porém, são lidos pelo FrameParser do PC, não pelo parser em C++ do firmware: esse é testado
+#     pelo simulador do firmware (make -C firmware/sim).
+#   - O movimento segue a cinemática de tração diferencial (velocidade de cada roda proporcional ao PWM).
+# E mede, do lado do carrinho:
+#   - Latência comando -> movimento: do 'instante' passado a SerialTransport.send() (a origem do comando, ex:
+#     a leitura do frame) até o primeiro tick em que as rodas começam a ir para o novo alvo (e até chegarem ao
+#     alvo). Assim a coalescência, a espera e a escrita do transporte também entram na conta.
+#     O instante vem de protocol.CommandLink.origens, pela sequência do quadro; sem ele, conta da leitura na porta.
+#   - Comandos perdidos (buracos na sequência), sobrescritos (chegaram mas outro mais novo chegou antes do tick)
+#     e quadros com erro.
+#   - Profundidade da fila do link (quadros já escritos pelo PC mas ainda "no ar").
+#
+# O teste de carga alimenta o transporte com entrada sintética (joystick girando ou um pulso em círculo no
+# joystick em anel) em taxa alta e falha (código de saída 1) se o p95 da latência passar do limite:
+#   python car_sim.py joystick --taxa 500 --duracao 5 --limite-p95 20
+#   python car_sim.py pose --taxa 60 --duracao 10 --baud 9600
+import argparse
+import math
+import os
+import random
+import select
+import time
+from collections import deque
+
+import numpy as np
+
+from protocol import BAUD_PADRAO, PWM_MAX, TAMANHO_COMANDO, TIPO_COMANDO, encode_ack
+from transport import FakeSerialPort, SerialTransport
+
+
+# Mesmos valores padrão de iniciarControle() em firmware/arduino/controle.h.
+PERIODO_TICK = 0.010
+RAMPA_POR_TICK = 15
+TIMEOUT_WATCHDOG = 0.5
+
+
+def _rampa(atual, alvo, passo):
+    if alvo > atual + passo:
+        return atual + passo
+    if alvo < atual - passo:
+        return atual - passo
+    return alvo
+
+
+class SimulatedCar(FakeSerialPort):
+    # baud: taxa do link simulado (o tempo de cada quadro é TAMANHO_COMANDO * 10 / baud).
+    # velocidade_max: m/s de uma roda com PWM 255; bitola: distância entre as rodas (m).
+    # perda: probabilidade de um quadro se perder no link (para testar o watchdog e a recuperação).
+    # origem(seq): instante de origem do comando com essa sequência, ou None (ver load_test).
+    def __init__(self, baud=BAUD_PADRAO, periodo_tick=PERIODO_TICK, rampa_por_tick=RAMPA_POR_TICK,
+                 timeout_watchdog=TIMEOUT_WATCHDOG, velocidade_max=0.6, bitola=0.13, perda=0.0, semente=None,
+                 origem=None):
+        # Atributos definidos antes do super().__init__, que já inicia a thread de simulação.
+        self.baud = baud
+        self.periodo_tick = periodo_tick
+        self.rampa_por_tick = rampa_por_tick
+        self.timeout_watchdog = timeout_watchdog
+        self.velocidade_max = velocidade_max
+        self.bitola = bitola
+        self.perda = perda
+        self.origem = origem
+        self._aleatorio = random.Random(semente)
+
+        # Estado do firmware
+        self.alvo = (0, 0)
+        self.pwm = (0, 0)
+        self._ultimo_comando = None
+        self.parado_pelo_watchdog = True
+        # Pose do carrinho (m, m, rad)
+        self.x = self.y = self.theta = 0.0
+        self.distancia = 0.0
+
+        # Link: quadros (instante_chegada, instante_origem, seq, esquerda, direita) ainda "no ar"
+        self._fila = deque()
+        self._chegados = deque()  # Quadros que já chegaram (e foram confirmados), esperando o próximo tick.
+        self._link_livre_em = 0.0
+        self._ultimo_seq = None
+        self._medindo = None  # (instante_origem, alvo, já começou a mover)
+
+        # Estatísticas
+        self.perdidos = 0
+        self.descartados_link = 0
+        self.sobrescritos = 0
+        self.ticks = 0
+        self.disparos_watchdog = 0
+        self.latencias_movimento = []
+        self.latencias_alvo = []
+        self._profundidades = []
+        super().__init__(auto_ack=True)
+
+    # Chegada simulada de um quadro lido agora: o link transmite um quadro por vez, na taxa 'baud'.
+    def _enfileirar(self, agora, seq, esquerda, direita):
+        if self.perda and self._aleatorio.random() < self.perda:
+            self.descartados_link += 1
+            return
+        inicio = max(agora, self._link_livre_em)
+        self._link_livre_em = inicio + TAMANHO_COMANDO * 10.0 / self.baud
+        origem = self.origem(seq) if self.origem is not None else None
+        self._fila.append((self._link_livre_em, agora if origem is None else origem, seq, esquerda, direita))
+
+    # Quadros cujo último byte já "chegou" ao carrinho: como o neward.ino, o ack sai assim que o quadro
+    # fecha no parser; o comando só é aplicado no próximo tick.
+    def _entregar(self, agora):
+        while self._fila and self._fila[0][0] <= agora:
+            quadro = self._fila.popleft()
+            if self.auto_ack:
+                os.write(self._mestre, encode_ack(quadro[2]))
+            self._chegados.append(quadro)
+
+    def _ler(self):
+        proximo_tick = time.perf_counter() + self.periodo_tick
+        while not self._parar.is_set():
+            # Acorda no próximo tick ou na chegada do próximo quadro, o que vier primeiro.
+            prazo = min(proximo_tick, self._fila[0][0]) if self._fila else proximo_tick
+            espera = max(prazo - time.perf_counter(), 0.0)
+            prontos, _, _ = select.select([self._mestre], [], [], espera)
+            agora = time.perf_counter()
+            if prontos:
+                try:
+                    dados = os.read(self._mestre, 4096)
+                except OSError:
+                    break
+                for tipo, seq, rodas in self.parser.feed(dados):
+                    if tipo == TIPO_COMANDO:
+                        self.recebidos.append((agora, seq, *rodas))
+                        self._enfileirar(agora, seq, *rodas)
+            self._entregar(agora)
+            if agora >= proximo_tick:
+                proximo_tick += self.periodo_tick
+                if agora >= proximo_tick:  # Atrasou mais de um período: reinicia a grade, como o firmware.
+                    proximo_tick = agora + self.periodo_tick
+                self._tick(agora)
+
+    # Um tick do firmware: aplica os quadros que já chegaram, watchdog, rampa e cinemática.
+    def _tick(self, agora):
+        self.ticks += 1
+        self._profundidades.append(len(self._fila))
+        while self._chegados:
+            _, origem, seq, esquerda, direita = self._chegados.popleft()
+            if self._ultimo_seq is not None:
+                self.perdidos += (seq - self._ultimo_seq - 1) % 256
+            self._ultimo_seq = seq
+            esquerda = max(-PWM_MAX, min(PWM_MAX, esquerda))
+            direita = max(-PWM_MAX, min(PWM_MAX, direita))
+            if (esquerda, direita) != self.alvo:
+                if self._medindo is not None and not self._medindo[2]:
+                    self.sobrescritos += 1  # O alvo anterior nem chegou a mexer as rodas.
+                self._medindo = [origem, (esquerda, direita), False]
+            self.alvo = (esquerda, direita)
+            self._ultimo_comando = agora
+            self.parado_pelo_watchdog = False
+
+        if not self.parado_pelo_watchdog and agora - self._ultimo_comando > self.timeout_watchdog:
+            self.parado_pelo_watchdog = True
+            self.disparos_watchdog += 1
+            self.alvo = self.pwm = (0, 0)
+            self._medindo = None
+        else:
+            anterior = self.pwm
+            self.pwm = (_rampa(self.pwm[0], self.alvo[0], self.rampa_por_tick),
+                        _rampa(self.pwm[1], self.alvo[1], self.rampa_por_tick))
+            if self._medindo is not None:
+                origem, alvo, moveu = self._medindo
+                if not moveu and self.pwm != anterior:
+                    self.latencias_movimento.append(agora - origem)
+                    self._medindo[2] = True
+                if self.pwm == alvo:
+                    self.latencias_alvo.append(agora - origem)
+                    self._medindo = None
+
+        # Tração diferencial: v = (ve + vd) / 2, w = (vd - ve) / bitola.
+        roda_esq = self.pwm[0] / PWM_MAX * self.velocidade_max
+        roda_dir = self.pwm[1] / PWM_MAX * self.velocidade_max
+        v = (roda_esq + roda_dir) / 2.0
+        w = (roda_dir - roda_esq) / self.bitola
+        self.x += v * math.cos(self.theta) * self.periodo_tick
+        self.y += v * math.sin(self.theta) * self.periodo_tick
+        self.theta = (self.theta + w * self.periodo_tick + math.pi) % (2 * math.pi) - math.pi
+        self.distancia += abs(v) * self.periodo_tick
+
+    @staticmethod
+    def _percentis(valores):
+        if not valores:
+            return None
+        p50, p95, p99 = np.percentile(np.asarray(valores) * 1000.0, (50, 95, 99))
+        return {'p50': p50, 'p95': p95, 'p99': p99, 'n': len(valores)}
+
+    def report(self):
+        profundidades = np.asarray(self._profundidades or [0])
+        return {
+            'recebidos': len(self.recebidos),
+            'perdidos': self.perdidos,
+            'descartados_link': self.descartados_link,
+            'sobrescritos': self.sobrescritos,
+            'erros_quadro': self.parser.erros,
+            'disparos_watchdog': self.disparos_watchdog,
+            'ticks': self.ticks,
+            'fila_max': int(profundidades.max()),
+            'fila_media': float(profundidades.mean()),
+            'latencia_movimento': self._percentis(self.latencias_movimento),
+            'latencia_alvo': self._percentis(self.latencias_alvo),
+            'pose': (self.x, self.y, self.theta),
+            'distancia': self.distancia,
+        }
+
+
+# Gera entrada sintética e entrega ao transporte, 'taxa' vezes por segundo, durante 'duracao' segundos.
+# fonte 'joystick': JoystickController com o manche girando em círculo (raio variando).
+# fonte 'pose': pulso girando em volta do centro do joystick em anel, mapeado como no PoseEstimation.
+def load_test(fonte='joystick', taxa=200, duracao=5.0, baud=BAUD_PADRAO, perda=0.0):
+    with SimulatedCar(baud=baud, perda=perda, semente=0) as carro:
+        transporte = SerialTransport(carro.port, baud, espera_conexao=0)
+        # A latência é medida desde o send() do transporte (o link muda a cada reconexão).
+        carro.origem = lambda seq: transporte.link.origens.get(seq) if transporte.link is not None else None
+        transporte.start()
+        limite = time.perf_counter() + 5.0
+        while not transporte.conectado and time.perf_counter() < limite:
+            time.sleep(0.01)
+
+        if fonte == 'joystick':
+            from joystick_control import JoystickController
+            controle = JoystickController(transporte)
+
+            def entrada(i):
+                angulo = 2 * math.pi * i / (taxa * 2)
+                raio = 0.5 + 0.5 * math.sin(2 * math.pi * i / (taxa * 6))
+                controle.update(raio * math.cos(angulo), raio * math.sin(angulo))
+        else:
+            from pose_mapper import PoseCommandMapper
+            mapper = PoseCommandMapper()
+            centro = np.array([320.0, 240.0], dtype=np.float32)
+            keypoints = np.zeros((17, 2), dtype=np.float32)
+            ultimo = [""]
+
+            def entrada(i):
+                inicio = time.perf_counter()
+                angulo = 2 * math.pi * i / (taxa * 3)
+                raio = 40 + 180 * (0.5 + 0.5 * math.sin(2 * math.pi * i / (taxa * 5)))
+                keypoints[mapper.keypoint] = centro + raio * np.array([math.cos(angulo), -math.sin(angulo)])
+                direcao, velocidade, _ = mapper.map_one(keypoints, centro)
+                comando = f"{direcao}{velocidade}"
+                if comando != ultimo[0]:
+                    transporte.send_direction(direcao, velocidade, instante=inicio)
+                    ultimo[0] = comando
+                else:
+                    transporte.keepalive()
+
+        periodo = 1.0 / taxa
+        proxima = time.perf_counter()
+        amostras = int(duracao * taxa)
+        try:
+            for i in range(amostras):
+                proxima += periodo
+                espera = proxima - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                entrada(i)
+        finally:
+            transporte.close()
+        time.sleep(max(0.1, carro.periodo_tick * 3))  # Deixa os últimos quadros chegarem e passarem por um tick.
+        relatorio = carro.report()
+        relatorio['coalescidos_transporte'] = transporte.coalescidos
+        relatorio['repetidos_transporte'] = transporte.repetidos
+        return relatorio
+
+
+def _imprimir(relatorio):
+    print(f"Quadros recebidos: {relatorio['recebidos']}  perdidos: {relatorio['perdidos']}  "
+          f"descartados no link: {relatorio['descartados_link']}  sobrescritos: {relatorio['sobrescritos']}  "
+          f"com erro: {relatorio['erros_quadro']}")
+    print(f"Transporte: {relatorio['coalescidos_transporte']} coalescidos, "
+          f"{relatorio['repetidos_transporte']} repetidos  watchdog: {relatorio['disparos_watchdog']} disparos")
+    print(f"Fila do link: máx {relatorio['fila_max']}, média {relatorio['fila_media']:.2f} quadros")
+    for chave, titulo in (('latencia_movimento', 'comando -> movimento'), ('latencia_alvo', 'comando -> alvo')):
+        p = relatorio[chave]
+        if p:
+            print(f"{titulo:<22} p50 {p['p50']:6.1f}  p95 {p['p95']:6.1f}  p99 {p['p99']:6.1f} ms  (n={p['n']})")
+    x, y, theta = relatorio['pose']
+    print(f"Pose final: x={x:.2f} m y={y:.2f} m theta={math.degrees(theta):.0f}°  "
+          f"distância percorrida {relatorio['distancia']:.2f} m")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga do caminho de comandos com um carrinho simulado.")
+    parser.add_argument('fonte', choices=('joystick', 'pose'), help="entrada sintética usada")
+    parser.add_argument('--taxa', type=float, default=200, help="amostras de entrada por segundo")
+    parser.add_argument('--duracao', type=float, default=5.0, help="segundos de teste")
+    parser.add_argument('--baud', type=int, default=BAUD_PADRAO, help="taxa do link Bluetooth simulado")
+    parser.add_argument('--perda', type=float, default=0.0, help="probabilidade de perder um quadro no link")
+    parser.add_argument('--limite-p95', type=float, default=None,
+                        help="falha (código 1) se o p95 da latência comando -> movimento passar deste valor (ms)")
+    args = parser.parse_args()
+    relatorio = load_test(args.fonte, args.taxa, args.duracao, args.baud, args.perda)
+    _imprimir(relatorio)
+    latencia = relatorio['latencia_movimento']
+    if args.limite_p95 is not None and (latencia is None or latencia['p95'] > args.limite_p95):
+        print(f"FALHOU: p95 acima de {args.limite_p95} ms")
+        raise SystemExit(1)
@@ -0,0 +1,58 @@
+# --- Exibição e Desenhos Estáticos ---
+# O anel do joystick e as diagonais eram redesenhados com várias chamadas cv2.circle/cv2.line em todo frame,
+# e a janela era redimensionada (cv2.resizeWindow) em todo frame, mesmo sem mudar de tamanho.
+# StaticOverlay desenha a parte fixa uma única vez numa camada com máscara e só a copia por cima de cada frame.
+# Display cria a janela só quando necessário e só a redimensiona quando o tamanho do frame muda.
+# No computador de bordo, sem monitor, o modo headless simplesmente não usa nenhum dos dois.
+import numpy as np
+import cv2
+
+
+class StaticOverlay:
+    # 'desenhar(camada, largura, altura)' desenha os elementos fixos numa imagem preta do tamanho do frame.
+    # A camada é refeita só quando o tamanho do frame muda. Pixels pretos da camada são transparentes.
+    def __init__(self, desenhar):
+        self.desenhar = desenhar
+        self._formato = None
+        self._camada = None
+        self._mascara = None
+
+    def apply(self, frame):
+        if frame.shape != self._formato:
+            altura, largura = frame.shape[:2]
+            camada = np.zeros(frame.shape, dtype=frame.dtype)
+            self.desenhar(camada, largura, altura)
+            self._camada = camada
+            self._mascara = np.any(camada != 0, axis=2, keepdims=True)
+            self._formato = frame.shape
+        np.copyto(frame, self._camada, where=self._mascara)
+        return frame
+
+
+class Display:
+    # nome: título da janela. scale: fator de escala do tamanho da janela em relação ao frame.
+    def __init__(self, nome, scale=1.0):
+        self.nome = nome
+        self.scale = scale
+        self._criada = False
+        self._tamanho = None
+
+    # Mostra o frame. Retorna False quando o usuário aperta 'q'.
+    def show(self, frame):
+        if not self._criada:
+            # O WINDOW_NORMAL permite redimensionar a janela.
+            cv2.namedWindow(self.nome, cv2.WINDOW_NORMAL)
+            self._criada = True
+        height, width = frame.shape[:2]
+        tamanho = (int(width * self.scale), int(height * self.scale))
+        if tamanho != self._tamanho:
+            cv2.resizeWindow(self.nome, *tamanho)
+            self._tamanho = tamanho
+        cv2.imshow(self.nome, frame)
+        # Espera por 1 milissegundo. Se a tecla 'q' for pressionada, pede para encerrar.
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    def close(self):
+        if self._criada:
+            cv2.destroyWindow(self.nome)
+            self._criada = False
@@ -0,0 +1,211 @@
+# --- Frota: Uma Câmera e Um Modelo Controlando Vários Carrinhos ---
+# O controle normal usa só o pulso da primeira pessoa detectada e uma única porta serial.
+# Aqui cada pessoa rastreada dirige o seu próprio carrinho, com a mesma inferência por frame:
+#   - A imagem é dividida em N faixas verticais, uma por carrinho, cada uma com o seu joystick em anel.
+#   - Quem entra na imagem recebe o carrinho livre mais próximo e fica com ele enquanto for rastreado
+#     (o ID do PoseTracker), mesmo andando para outra faixa. Quando a pessoa some, o carrinho para e fica livre.
+#   - Os keypoints de todas as pessoas são mapeados em comandos numa única chamada vetorizada (map_batch).
+#   - Cada carrinho tem o seu SerialTransport (uma thread por porta): as escritas acontecem em paralelo
+#     e nunca travam o loop, então o custo por frame quase não cresce com N.
+#
+# Exemplo:
+#   python fleet.py --portas COM7 COM8 COM9 --pipeline
+import argparse
+
+import numpy as np
+import cv2
+
+from backends import BACKENDS
+from pose_mapper import PoseCommandMapper
+from transport import SerialTransport
+from yolo_visaocomp_control_ard import PoseEstimation
+
+
+# Cor (BGR) do anel e do esqueleto de cada carrinho; repete se houver mais carrinhos que cores.
+CORES_CARROS = ((0, 255, 0), (255, 128, 0), (0, 128, 255), (255, 0, 255), (0, 255, 255), (255, 255, 0))
+
+
+class FleetAssigner:
+    # Mantém a associação ID da pessoa -> índice do carrinho entre os frames.
+    def __init__(self, n_carros):
+        self.n_carros = n_carros
+        self.carro_de = {}  # ID do track -> índice do carrinho.
+
+    # ids: (P,) IDs dos tracks; posicoes: (P, 2) onde cada pessoa está; centros: (N, 2) centro de cada faixa.
+    # perdidos: IDs de tracks ainda vivos mas não encontrados na última inferência; continuam donos do carrinho
+    # (para recuperá-lo quando reaparecerem), mas não recebem um novo.
+    # Retorna (P,) com o carrinho de cada pessoa, ou -1 se todos os carrinhos já estão ocupados.
+    def update(self, ids, posicoes, centros, perdidos=()):
+        ids = [int(i) for i in ids]
+        presentes = set(ids) | {int(i) for i in perdidos}
+        # Libera os carrinhos de quem saiu.
+        self.carro_de = {i: carro for i, carro in self.carro_de.items() if i in presentes}
+        livres = set(range(self.n_carros)) - set(self.carro_de.values())
+        # Os IDs mais antigos (menores) escolhem primeiro, como em PoseTracker.principal().
+        for indice in np.argsort(ids):
+            track_id = ids[indice]
+            if track_id in self.carro_de or not livres:
+                continue
+            candidatos = sorted(livres)
+            distancias = np.hypot(*(centros[candidatos] - posicoes[indice]).T)
+            carro = candidatos[int(np.argmin(distancias))]
+            self.carro_de[track_id] = carro
+            livres.discard(carro)
+        return np.array([self.carro_de.get(i, -1) for i in ids], dtype=np.intp)
+
+
+class FleetController(PoseEstimation):
+    # portas: uma porta serial por carrinho (ex: ['COM7', 'COM8']). A ordem define o número do carrinho.
+    # As outras opções são as mesmas do PoseEstimation (fps_alvo, backend, headless, ...).
+    def __init__(self, portas, video_name=None, **opcoes):
+        if not portas:
+            raise ValueError("a frota precisa de pelo menos uma porta")
+        super().__init__(video_name, porta=portas[0], **opcoes)
+        self.n_carros = len(portas)
+        # O transporte da classe base é o do carrinho 0; cada outro carrinho ganha a sua própria thread.
+        self.transportes = [self.transporte] + [SerialTransport(porta, metricas=self.metricas)
+                                                for porta in portas[1:]]
+        for transporte in self.transportes[1:]:
+            transporte.start()
+        self.atribuicao = FleetAssigner(self.n_carros)
+        self.ultimos_comandos = [""] * self.n_carros
+        # Com várias pessoas o recorte em volta de uma só (ROI) deixaria as outras de fora.
+        self.scheduler.usar_roi = False
+        self._layout_para = None
+        self.centros = None
+
+    # Centro do joystick de cada faixa e raios do anel que cabem na faixa. Só muda quando o tamanho do frame muda.
+    def _layout(self, width, height):
+        if self._layout_para == (width, height):
+            return self.centros
+        largura_faixa = width / self.n_carros
+        self.centros = np.stack([(np.arange(self.n_carros) + 0.5) * largura_faixa,
+                                 np.full(self.n_carros, height / 2)], axis=1).astype(np.float32)
+        outer_radius = int(min(self.mapper.outer_radius, largura_faixa / 2 - 5, height / 2 - 5))
+        inner_radius = max(1, outer_radius * self.mapper.inner_radius // self.mapper.outer_radius)
+        self.mapper = PoseCommandMapper(outer_radius, inner_radius, self.mapper.keypoint, self.mapper.velocidade_max)
+        self._layout_para = (width, height)
+        return self.centros
+
+    # Desenha um anel por carrinho, na cor dele e com o número; chamado pelo StaticOverlay só quando o tamanho muda.
+    def desenhar_joystick(self, camada, width, height):
+        centros = self._layout(width, height)
+        for carro, (center_x, center_y) in enumerate(centros.astype(int)):
+            cor = CORES_CARROS[carro % len(CORES_CARROS)]
+            cv2.circle(camada, (center_x, center_y), self.mapper.outer_radius, cor, 2)
+            cv2.circle(camada, (center_x, center_y), self.mapper.inner_radius, (0, 0, 255), 2)
+            cv2.putText(camada, str(carro), (center_x - 8, center_y - self.mapper.outer_radius - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, cor, 2, cv2.LINE_AA)
+
+    # IDs e keypoints (P, 17, 2) das pessoas encontradas na última inferência, e os IDs dos tracks perdidos.
+    # Como no controle de um carrinho só (_keypoints_principal), a previsão de um track perdido não dirige:
+    # o carrinho dele recebe S0 na hora, mas continua reservado enquanto o track existir.
+    def _pessoas(self, keypoints_principal):
+        nenhuma = np.zeros(0, dtype=np.intp), np.zeros((0, 17, 2), dtype=np.float32)
+        if self.replay is not None:
+            # O replay só guarda a pessoa principal.
+            if keypoints_principal is None:
+                return nenhuma + ([],)
+            return np.zeros(1, dtype=np.intp), np.asarray(keypoints_principal, dtype=np.float32)[None], []
+        visiveis = [trk for trk in self.tracker.tracks if trk.perdidos == 0]
+        perdidos = [trk.id for trk in self.tracker.tracks if trk.perdidos > 0]
+        if not visiveis:
+            return nenhuma + (perdidos,)
+        return (np.array([trk.id for trk in visiveis], dtype=np.intp),
+                np.stack([trk.keypoints for trk in visiveis]).astype(np.float32), perdidos)
+
+    # Igual a PoseEstimation.processar_frame, mas para todas as pessoas. Retorna (lista de N comandos, frame).
+    def processar_frame(self, frame):
+        t = self.metricas.tic()
+        original = frame
+        if self.gravador is not None and self.gravador.salvar_frames:
+            original = frame.copy()  # O espelho e os desenhos são feitos no próprio buffer da captura.
+        if self.espelhar_imagem:
+            frame = cv2.flip(frame, 1, dst=frame)
+        height, width, _ = frame.shape
+
+        # Roda o YOLO (ou a previsão do rastreador); todas as pessoas ficam em self.tracker.tracks.
+        keypoints_principal = self.detectar_pose(frame)
+        ids, keypoints, perdidos = self._pessoas(keypoints_principal)
+        t = self.metricas.toc('inferencia', t)
+
+        centros = self._layout(width, height)
+        # Posição de cada pessoa: média dos pontos detectados.
+        detectados = np.all(keypoints > 0, axis=-1, keepdims=True)
+        posicoes = (keypoints * detectados).sum(axis=1) / np.maximum(detectados.sum(axis=1), 1)
+        carros = self.atribuicao.update(ids, posicoes, centros, perdidos)
+
+        # Todos os comandos de uma vez: cada pessoa é medida em relação ao centro da faixa do seu carrinho.
+        comandos = ["S0"] * self.n_carros
+        com_carro = carros >= 0
+        ativos = np.zeros(len(carros), dtype=bool)
+        if np.any(com_carro):
+            direcoes, velocidades, ativos_carro = self.mapper.map_batch(keypoints[com_carro],
+                                                                       centros[carros[com_carro]])
+            ativos[com_carro] = ativos_carro
+            for carro, comando in zip(carros[com_carro], PoseCommandMapper.to_commands(direcoes, velocidades)):
+                comandos[carro] = str(comando)
+        t = self.metricas.toc('mapeamento', t)
+
+        if not self.headless:
+            self.overlay_joystick.apply(frame)
+            for pessoa, carro in enumerate(carros):
+                if carro < 0:
+                    continue
+                cor = CORES_CARROS[carro % len(CORES_CARROS)]
+                if ativos[pessoa]:
+                    pulso_x, pulso_y = keypoints[pessoa, self.mapper.keypoint]
+                    cv2.circle(frame, (int(pulso_x), int(pulso_y)), 10, cor, -1)
+                self.mapper.draw_skeleton(frame, keypoints[pessoa], color=cor)
+            self.metricas.toc('desenho', t)
+
+        if self.gravador is not None:
+            # A sessão gravada guarda o carrinho 0 (mesmo formato do controle de um carrinho só).
+            pessoa_0 = np.flatnonzero(carros == 0)
+            kp_0 = keypoints[pessoa_0[0]] if len(pessoa_0) else None
+            self.gravador.record_frame(original, kp_0, comandos[0][0], int(comandos[0][1:]))
+        return comandos, frame
+
+    # Entrega o comando de cada carrinho ao seu transporte, só quando muda. Nenhuma chamada bloqueia.
+    def enviar_comando(self, comandos, instante_captura=None):
+        t = self.metricas.tic()
+        for carro, comando in enumerate(comandos):
+            if comando != self.ultimos_comandos[carro]:
+                self.transportes[carro].send_direction(comando[0], int(comando[1:]), instante=instante_captura)
+                if self.verbose:
+                    print(f"Carrinho {carro}: {comando}")
+                self.ultimos_comandos[carro] = comando
+            else:
+                self.transportes[carro].keepalive()
+        self.metricas.toc('serial', t)
+        if instante_captura is not None:
+            self.metricas.toc('total', instante_captura)
+        self.metricas.frame_done()
+
+    def analyze_pose_and_control(self, pipelined=False, fonte=None):
+        try:
+            super().analyze_pose_and_control(pipelined=pipelined, fonte=fonte)
+        finally:
+            # A classe base já parou o carrinho 0; para e fecha os outros.
+            for transporte in self.transportes[1:]:
+                transporte.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Uma câmera controlando vários carrinhos, um por pessoa.")
+    parser.add_argument('--portas', nargs='+', required=True, help="uma porta serial por carrinho (ex: COM7 COM8)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="roda captura, inferência e envio serial em threads separadas")
+    parser.add_argument('--fps-alvo', type=int, default=25,
+                        help="taxa de frames que o agendador adaptativo tenta manter")
+    parser.add_argument('--video', default=None,
+                        help="índice da webcam, arquivo de vídeo, URL RTSP ou diretório de imagens (padrão: webcam 0)")
+    parser.add_argument('--metricas', default=None,
+                        help="arquivo .json ou .csv onde salvar os tempos de cada etapa ao sair")
+    parser.add_argument('--verbose', action='store_true', help="imprime cada comando enviado")
+    parser.add_argument('--headless', action='store_true', help="não desenha nem abre janela")
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help="onde o modelo roda")
+    args = parser.parse_args()
+    frota = FleetController(args.portas, args.video, fps_alvo=args.fps_alvo, verbose=args.verbose,
+                            arquivo_metricas=args.metricas, headless=args.headless, backend=args.backend)
+    frota.analyze_pose_and_control(pipelined=args.pipeline)
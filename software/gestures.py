@@ -0,0 +1,266 @@
+# --- Vocabulário de Gestos Sobre o Histórico de Keypoints ---
+# O controle usava só a posição instantânea de um keypoint (o pulso 9) dentro do joystick em anel.
+# Este módulo guarda um histórico curto dos 17 keypoints de cada pessoa rastreada (um anel NumPy de tamanho fixo)
+# e reconhece gestos ao longo do tempo:
+#   - volante: as duas mãos seguram um "volante"; a inclinação da linha entre os pulsos vira para a esquerda
+#     ou para a direita, e a altura das mãos em relação aos ombros define a velocidade para a frente.
+#   - parada: mão levantada acima da cabeça por 'tempo' segundos para o carrinho (parada de emergência),
+#     em qualquer modo, enquanto a mão continuar levantada.
+#   - swipe: um movimento rápido da mão para o lado troca o modo de controle (anel <-> volante).
+# Cada frame custa O(1) por pessoa: as médias são mantidas somando o valor novo e subtraindo o que sai do anel,
+# e a janela do swipe avança um ponteiro em vez de percorrer o histórico.
+#
+# As distâncias são medidas em "larguras de ombro" (média do histórico), então os gestos funcionam
+# com a pessoa perto ou longe da câmera.
+import math
+
+import numpy as np
+
+
+# Índices COCO usados. Com o espelho, o pulso 9 fica no lado direito da tela e é o cursor do anel;
+# por isso a parada e o swipe usam o outro pulso (10) por padrão.
+NARIZ = 0
+OMBRO_ESQ, OMBRO_DIR = 5, 6
+PULSO_ESQ, PULSO_DIR = 9, 10
+
+MODOS = ('anel', 'volante')
+
+
+class KeypointHistory:
+    # Anel com os últimos 'tamanho' conjuntos de keypoints (17, 2) de uma pessoa e os seus instantes.
+    # As amostras são numeradas de 0 em diante ('total' = quantas já entraram); a amostra n fica na
+    # posição n % tamanho e continua disponível enquanto n >= total - tamanho.
+    def __init__(self, tamanho=32):
+        self.tamanho = tamanho
+        self.keypoints = np.zeros((tamanho, 17, 2), dtype=np.float32)
+        self.validos = np.zeros((tamanho, 17), dtype=bool)
+        self.tempos = np.zeros(tamanho)
+        self.larguras = np.zeros(tamanho)  # Largura dos ombros de cada amostra (0 = ombros não detectados).
+        self.total = 0
+        self._soma_larguras = 0.0
+        self._n_larguras = 0
+
+    def push(self, keypoints, t):
+        i = self.total % self.tamanho
+        # A amostra que sai do anel deixa a média da largura dos ombros.
+        if self.total >= self.tamanho and self.larguras[i] > 0:
+            self._soma_larguras -= self.larguras[i]
+            self._n_larguras -= 1
+
+        self.keypoints[i] = keypoints
+        validos = self.validos[i]
+        np.all(self.keypoints[i] > 0, axis=-1, out=validos)
+        self.tempos[i] = t
+        largura = 0.0
+        if validos[OMBRO_ESQ] and validos[OMBRO_DIR]:
+            (xe, ye), (xd, yd) = self.keypoints[i, OMBRO_ESQ], self.keypoints[i, OMBRO_DIR]
+            largura = math.hypot(float(xd - xe), float(yd - ye))
+        self.larguras[i] = largura
+        if largura > 0:
+            self._soma_larguras += largura
+            self._n_larguras += 1
+        self.total += 1
+
+    # Keypoints, pontos detectados e instante da amostra n (padrão: a mais nova).
+    def sample(self, n=None):
+        i = (self.total - 1 if n is None else n) % self.tamanho
+        return self.keypoints[i], self.validos[i], self.tempos[i]
+
+    def time(self, n):
+        return self.tempos[n % self.tamanho]
+
+    # Primeira amostra ainda guardada no anel.
+    @property
+    def oldest(self):
+        return max(self.total - self.tamanho, 0)
+
+    # Largura média dos ombros no histórico (pixels), ou None se eles não apareceram.
+    @property
+    def scale(self):
+        return self._soma_larguras / self._n_larguras if self._n_larguras else None
+
+
+class GestureState:
+    # Resultado dos gestos de uma pessoa no frame atual.
+    # modo: modo de controle atual (um de MODOS); parada: parada de emergência ativa;
+    # swipe: -1 (para a esquerda da tela), 1 (para a direita) ou 0 neste frame;
+    # volante: (direcao, velocidade) do gesto do volante, ou None se as duas mãos não estão visíveis.
+    def __init__(self, modo):
+        self.modo = modo
+        self.parada = False
+        self.swipe = 0
+        self.volante = None
+
+
+class SteeringGesture:
+    # angulo_morto: inclinação (graus) abaixo da qual o volante está "reto" e o carrinho vai para a frente.
+    # angulo_max: inclinação com a velocidade máxima de giro.
+    # altura_min / altura_max: altura média dos pulsos acima da linha dos ombros, em larguras de ombro,
+    # que corresponde à velocidade 0 e à máxima para a frente.
+    # suavizacao: constante de tempo (s) da média exponencial do ângulo e da altura.
+    def __init__(self, angulo_morto=15.0, angulo_max=45.0, altura_min=-1.5, altura_max=0.0, suavizacao=0.15,
+                 velocidade_max=9):
+        self.angulo_morto = angulo_morto
+        self.angulo_max = angulo_max
+        self.altura_min = altura_min
+        self.altura_max = altura_max
+        self.suavizacao = suavizacao
+        self.velocidade_max = velocidade_max
+        self._angulo = None
+        self._altura = None
+        self._t = None
+
+    def update(self, historico, estado):
+        kp, validos, t = historico.sample()
+        escala = historico.scale
+        if escala is None or not (validos[PULSO_ESQ] and validos[PULSO_DIR]
+                                  and validos[OMBRO_ESQ] and validos[OMBRO_DIR]):
+            self._angulo = None
+            return
+
+        # Inclinação da linha entre os pulsos, da mão mais à esquerda da tela para a mais à direita.
+        # Positiva quando a mão da direita está mais baixa (volante girado para a direita).
+        (xa, ya), (xb, yb) = sorted((kp[PULSO_ESQ].tolist(), kp[PULSO_DIR].tolist()))
+        angulo = math.degrees(math.atan2(yb - ya, xb - xa))
+        ombros_y = (kp[OMBRO_ESQ, 1] + kp[OMBRO_DIR, 1]) / 2
+        altura = float(ombros_y - (ya + yb) / 2) / escala
+
+        if self._angulo is None:
+            self._angulo, self._altura = angulo, altura
+        else:
+            alpha = 1.0 - math.exp(-max(t - self._t, 0.0) / self.suavizacao)
+            self._angulo += alpha * (angulo - self._angulo)
+            self._altura += alpha * (altura - self._altura)
+        self._t = t
+
+        if abs(self._angulo) >= self.angulo_morto:
+            fracao = (abs(self._angulo) - self.angulo_morto) / (self.angulo_max - self.angulo_morto)
+            direcao = 'R' if self._angulo > 0 else 'L'
+            velocidade = max(1, round(min(fracao, 1.0) * self.velocidade_max))
+        else:
+            fracao = (self._altura - self.altura_min) / (self.altura_max - self.altura_min)
+            velocidade = round(min(max(fracao, 0.0), 1.0) * self.velocidade_max)
+            direcao = 'F' if velocidade > 0 else 'S'
+        estado.volante = (direcao, velocidade)
+
+
+class RaisedHandStop:
+    # pulsos: mãos que acionam a parada; margem: quanto acima do nariz (em larguras de ombro) a mão precisa estar;
+    # tempo: segundos com a mão levantada até a parada, para um movimento de passagem não parar o carrinho.
+    def __init__(self, pulsos=(PULSO_DIR,), margem=0.2, tempo=0.3):
+        self.pulsos = pulsos
+        self.margem = margem
+        self.tempo = tempo
+        self._desde = None
+
+    def update(self, historico, estado):
+        kp, validos, t = historico.sample()
+        levantada = False
+        if validos[NARIZ]:
+            limite = kp[NARIZ, 1] - self.margem * (historico.scale or 0.0)
+            levantada = any(validos[p] and kp[p, 1] < limite for p in self.pulsos)
+        if not levantada:
+            self._desde = None
+            return
+        if self._desde is None:
+            self._desde = t
+        estado.parada = t - self._desde >= self.tempo
+
+
+class SwipeGesture:
+    # pulsos: mãos que fazem o swipe; janela: duração máxima do movimento (s);
+    # distancia: deslocamento horizontal mínimo, em larguras de ombro; intervalo: espera até aceitar outro swipe.
+    def __init__(self, pulsos=(PULSO_DIR,), janela=0.4, distancia=1.5, intervalo=0.8):
+        self.pulsos = pulsos
+        self.janela = janela
+        self.distancia = distancia
+        self.intervalo = intervalo
+        self._inicio = 0  # Amostra mais antiga dentro da janela.
+        self._bloqueado_ate = -math.inf
+
+    def update(self, historico, estado):
+        kp, validos, t = historico.sample()
+        # Cada amostra entra e sai da janela uma única vez: O(1) amortizado por frame.
+        self._inicio = max(self._inicio, historico.oldest)
+        ultima = historico.total - 1
+        while self._inicio < ultima and historico.time(self._inicio) < t - self.janela:
+            self._inicio += 1
+
+        escala = historico.scale
+        if t < self._bloqueado_ate or escala is None:
+            return
+        kp0, validos0, _ = historico.sample(self._inicio)
+        for p in self.pulsos:
+            if not (validos[p] and validos0[p]):
+                continue
+            dx = float(kp[p, 0] - kp0[p, 0])
+            dy = float(kp[p, 1] - kp0[p, 1])
+            if abs(dx) >= self.distancia * escala and abs(dy) < abs(dx) / 2:
+                estado.swipe = 1 if dx > 0 else -1
+                self._bloqueado_ate = t + self.intervalo
+                self._inicio = ultima  # O mesmo movimento não conta de novo.
+                return
+
+
+GESTOS = {'volante': SteeringGesture, 'parada': RaisedHandStop, 'swipe': SwipeGesture}
+
+
+class _Pessoa:
+    def __init__(self, tamanho, gestos, modo):
+        self.historico = KeypointHistory(tamanho)
+        self.gestos = gestos
+        self.estado = GestureState(modo)
+
+
+class GestureEngine:
+    # gestos: nomes de GESTOS reconhecidos; opcoes: parâmetros de cada um (ex: {'parada': {'tempo': 0.5}}).
+    # tamanho: amostras no histórico de cada pessoa (precisa cobrir a janela do swipe no fps da câmera).
+    # modos: modos percorridos pelo swipe; o primeiro é o inicial. None = os de MODOS que os gestos permitem
+    # (o modo 'volante' só existe com o gesto 'volante').
+    def __init__(self, gestos=tuple(GESTOS), opcoes=None, tamanho=32, modos=None):
+        desconhecidos = set(gestos) - set(GESTOS)
+        if desconhecidos:
+            raise ValueError(f"gestos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        if modos is None:
+            modos = tuple(modo for modo in MODOS if modo != 'volante' or 'volante' in gestos)
+        if 'volante' in modos and 'volante' not in gestos:
+            raise ValueError("o modo 'volante' precisa do gesto 'volante'")
+        if 'swipe' in gestos and len(modos) < 2:
+            raise ValueError("o gesto 'swipe' troca de modo: use-o junto com o gesto 'volante'")
+        self.gestos = tuple(gestos)
+        self.opcoes = opcoes or {}
+        self.tamanho = tamanho
+        self.modos = modos
+        self._pessoas = {}
+
+    # Estado atual de cada pessoa, por ID.
+    @property
+    def estados(self):
+        return {pessoa_id: pessoa.estado for pessoa_id, pessoa in self._pessoas.items()}
+
+    # Adiciona os keypoints (17, 2) de uma pessoa no instante t e retorna o GestureState dela.
+    def update(self, pessoa_id, keypoints, t):
+        pessoa = self._pessoas.get(pessoa_id)
+        if pessoa is None:
+            gestos = [GESTOS[nome](**self.opcoes.get(nome, {})) for nome in self.gestos]
+            pessoa = self._pessoas[pessoa_id] = _Pessoa(self.tamanho, gestos, self.modos[0])
+        pessoa.historico.push(keypoints, t)
+
+        estado = pessoa.estado
+        estado.parada, estado.swipe, estado.volante = False, 0, None
+        for gesto in pessoa.gestos:
+            gesto.update(pessoa.historico, estado)
+        if estado.swipe:
+            indice = self.modos.index(estado.modo)
+            estado.modo = self.modos[(indice + estado.swipe) % len(self.modos)]
+        return estado
+
+    # Atualiza todas as pessoas de tracker.PoseTracker.tracks e esquece as que saíram.
+    def update_tracks(self, tracks, t=None):
+        for trk in tracks:
+            self.update(trk.id, trk.keypoints, trk.t if t is None else t)
+        ativos = {trk.id for trk in tracks}
+        for pessoa_id in list(self._pessoas):
+            if pessoa_id not in ativos:
+                del self._pessoas[pessoa_id]
+        return self.estados
@@ -1,78 +1,177 @@
-import pygame
-import serial 
+import argparse
 import time
+from protocol import BAUD_PADRAO, PWM_MAX
+from transport import SerialTransport
 
-#A porta bluetooth, identificar nas configuracoes bluetooth do dispositivo
-porta_bluetooth = 'COM7'
-velocidade_serial = 9600
-
-try:
-    arduino = serial.Serial(porta_bluetooth, velocidade_serial, timeout=1)
-    print(f"Conectado ao Arduino na porta {porta_bluetooth}")
-    time.sleep(2)
-except serial.SerialException as e:
-    print(f"Erro ao conectar{e}")
-    print("Verifique o numero da porta COM e se o carrinho esta ligado e pareado")
-    exit()
-
-#Inicializa o Pygame e o Joystick
-pygame.init()
-if pygame.joystick.get_count() == 0:
-    print("Falta o joystick")
-    exit()
-joystick = pygame.joystick.Joystick(0)
-joystick.init()
-print(f"Joystick'{joystick.get_name()}' inicializado ")
-
-#Para nao enviar comandos repetidos
-ultimo_comando =""
-
-try:
-    while True:
-        pygame.event.pump() #Atualiza estado
-
-        #le os eixos
-        eixo_y = joystick.get_axis(1)
-        eixo_x = joystick.get_axis(0)
-
-        # Logica para comandos
-        # 1. Define a direcao com base no eixo
-        if eixo_y < -0.5:
-            direcao = 'F' # Frente
-        elif eixo_y > 0.5:
-            direcao = 'B' # Tras
-        elif eixo_x < -0.5:
-            direcao = 'L' # Esquerda
-        elif eixo_x > 0.5:
-            direcao = 'R' # Direita
-        else:
-            direcao = 'S' # Parado 
+# Eixos do manche usados no controle (0 = horizontal, 1 = vertical; para frente o eixo vertical e negativo)
+EIXO_X = 0
+EIXO_Y = 1
+
+
+# Aplica a zona morta e a curva exponencial em um eixo (-1 a 1)
+# Dentro da zona morta o valor e 0; fora dela o curso restante e reescalado para 0-1, sem salto na borda.
+# expo = 0 e linear; expo = 1 e cubico (mais precisao perto do centro, mesma velocidade maxima no fim do curso)
+def aplicar_curva(valor, deadzone=0.08, expo=0.3):
+    magnitude = abs(valor)
+    if magnitude <= deadzone:
+        return 0.0
+    magnitude = min((magnitude - deadzone) / (1.0 - deadzone), 1.0)
+    magnitude = (1.0 - expo) * magnitude + expo * magnitude ** 3
+    return magnitude if valor > 0 else -magnitude
+
+
+class DifferentialMixer:
+    # Mistura os dois eixos do manche em velocidades independentes para as rodas esquerda e direita.
+    # Antes os eixos viravam so 5 direcoes e 10 velocidades; agora diagonais (ex: frente virando a direita)
+    # saem como PWM diferente em cada roda, na resolucao cheia do protocolo (-255 a 255).
+    # deadzone/expo: por eixo (ver aplicar_curva). A curva do giro costuma ser mais suave que a da aceleracao.
+    def __init__(self, deadzone=0.08, expo=0.3, deadzone_giro=None, expo_giro=None, pwm_max=PWM_MAX):
+        self.deadzone = deadzone
+        self.expo = expo
+        self.deadzone_giro = deadzone if deadzone_giro is None else deadzone_giro
+        self.expo_giro = expo if expo_giro is None else expo_giro
+        self.pwm_max = pwm_max
+
+    # Retorna (esquerda, direita) em PWM com sinal
+    def mix(self, eixo_x, eixo_y):
+        frente = -aplicar_curva(eixo_y, self.deadzone, self.expo)  # Para frente o eixo y e negativo
+        giro = aplicar_curva(eixo_x, self.deadzone_giro, self.expo_giro)
+        esquerda = frente + giro
+        direita = frente - giro
+        # Se a soma passar de 1 numa das rodas, reduz as duas na mesma proporcao para manter a curva
+        maior = max(abs(esquerda), abs(direita), 1.0)
+        return (int(round(esquerda / maior * self.pwm_max)),
+                int(round(direita / maior * self.pwm_max)))
 
-        #  Define a velocidade com base na inclinacao do eixo
-        if direcao in ['F', 'B']:
-            velocidade = int(abs(eixo_y) * 9)
-        elif direcao in ['L', 'R']:
-            velocidade = int(abs(eixo_x) * 9)
+
+class JoystickController:
+    # Decide quando mandar um comando para o carrinho.
+    # Um comando sai assim que a leitura muda de forma significativa (mais de 'limiar' de PWM em alguma roda)
+    # ou chega exatamente a parado; mudancas menores (ruido do potenciometro) sao ignoradas.
+    # Se nada mudar, o comando atual e repetido a cada 'intervalo_repeticao' segundos para o carrinho saber
+    # que o controle continua ligado (e para a leitura final, abaixo do limiar, tambem chegar).
+    # Botao 'botao_parada': trava/destrava o carrinho parado (parada de emergencia).
+    def __init__(self, transporte, mixer=None, limiar=4, intervalo_repeticao=0.25, botao_parada=0,
+                 metricas=None, verbose=False):
+        self.transporte = transporte
+        self.mixer = mixer or DifferentialMixer()
+        self.limiar = limiar
+        self.intervalo_repeticao = intervalo_repeticao
+        self.botao_parada = botao_parada
+        self.metricas = metricas
+        self.verbose = verbose
+        self.travado = False
+        self.ultimo_enviado = None
+        self.ultimo_envio = 0.0
+
+    # Segundos ate a proxima repeticao obrigatoria (usado como prazo da espera por eventos)
+    def tempo_ate_repeticao(self, agora=None):
+        agora = time.perf_counter() if agora is None else agora
+        return max(self.ultimo_envio + self.intervalo_repeticao - agora, 0.0)
+
+    def _mudou(self, rodas):
+        if self.ultimo_enviado is None:
+            return True
+        if rodas == (0, 0):
+            return self.ultimo_enviado != (0, 0)
+        return max(abs(rodas[0] - self.ultimo_enviado[0]), abs(rodas[1] - self.ultimo_enviado[1])) >= self.limiar
+
+    # Calcula as rodas para os eixos atuais e envia se precisar. Retorna True se enviou.
+    def update(self, eixo_x, eixo_y, agora=None):
+        inicio = time.perf_counter()
+        agora = inicio if agora is None else agora
+        rodas = (0, 0) if self.travado else self.mixer.mix(eixo_x, eixo_y)
+        t = inicio
+        if self.metricas is not None:
+            t = self.metricas.toc('mapeamento', inicio)
+        enviar = self._mudou(rodas) or agora - self.ultimo_envio >= self.intervalo_repeticao
+        if enviar:
+            self.transporte.send(*rodas, instante=inicio)
+            if self.verbose and rodas != self.ultimo_enviado:
+                print(f"Rodas: esquerda {rodas[0]:4d} direita {rodas[1]:4d}") # O print tambem custa tempo no loop
+            self.ultimo_enviado = rodas
+            self.ultimo_envio = agora
         else:
-            velocidade = 0
-        velocidade = min(velocidade, 9) # Garante que o valor nunca passe de 9
-
-        # Monta o comando final
-        comando_final = f"{direcao}{velocidade}"
-
-        #Envia o comando para o carrinho (apenas se for diferente do anterior)
-        if comando_final != ultimo_comando:
-            arduino.write((comando_final + "\n").encode()) # Envia os dados pela porta serial Bluetooth
-            print(f"Comando enviado: {comando_final}")
-            ultimo_comando = comando_final
-
-        time.sleep(0.05) # Pausa de 50ms para nao sobrecarregar
-
-except KeyboardInterrupt:
-    print("\nPrograma encerrado pelo usuario.")
-finally:
-    # Garante que o carro pare quando o programa for fechado
-    print("Enviando comando de parada final...")
-    arduino.write(b'S0')
-    arduino.close()
-    print("Conexao encerrada.")
+            self.transporte.keepalive()  # O loop continua vivo: o transporte pode seguir repetindo o comando.
+        if self.metricas is not None:
+            self.metricas.toc('serial', t)
+            self.metricas.toc('total', inicio)
+            self.metricas.frame_done()
+        return enviar
+
+    def button(self, botao):
+        if botao == self.botao_parada:
+            self.travado = not self.travado
+            print("Carrinho travado (parada)" if self.travado else "Carrinho destravado")
+
+    # Loop principal: dorme ate chegar um evento do joystick ou vencer o prazo da repeticao.
+    # Substitui o pump() + sleep(0.05), que limitava a leitura a 20 Hz e gastava CPU acordando a toa.
+    def run(self, joystick):
+        import pygame
+
+        while True:
+            prazo_ms = int(self.tempo_ate_repeticao() * 1000)
+            evento = pygame.event.wait(max(prazo_ms, 1))
+            # Junta todos os eventos que chegaram juntos: so a posicao final dos eixos importa
+            eventos = [evento] + pygame.event.get()
+            for evento in eventos:
+                if evento.type == pygame.QUIT:
+                    return
+                if evento.type == pygame.JOYBUTTONDOWN:
+                    self.button(evento.button)
+            self.update(joystick.get_axis(EIXO_X), joystick.get_axis(EIXO_Y))
+
+
+def main():
+    import pygame # Importado aqui para o benchmark poder usar o controle sem o pygame instalado
+
+    parser = argparse.ArgumentParser(description="Controle do carrinho com joystick (rodas independentes).")
+    #A porta bluetooth, identificar nas configuracoes bluetooth do dispositivo (ex: python joystick_control.py COM7)
+    #Sem porta, procura automaticamente
+    parser.add_argument('porta', nargs='?', default=None, help="porta serial do carrinho (ex: COM7)")
+    parser.add_argument('--verbose', action='store_true', help="imprime cada comando enviado")
+    parser.add_argument('--deadzone', type=float, default=0.08, help="zona morta dos eixos (0-1)")
+    parser.add_argument('--expo', type=float, default=0.3, help="curva exponencial da aceleracao (0 = linear)")
+    parser.add_argument('--expo-giro', type=float, default=None, help="curva exponencial do giro")
+    parser.add_argument('--limiar', type=int, default=4, help="mudanca minima de PWM para enviar um comando")
+    parser.add_argument('--repeticao', type=float, default=0.25,
+                        help="segundos entre repeticoes do comando quando nada muda")
+    args = parser.parse_args()
+    velocidade_serial = BAUD_PADRAO # Mesma velocidade configurada no firmware e no HC-05
+
+    #Conecta (e reconecta se o Bluetooth cair) em segundo plano; o envio nunca trava o loop
+    transporte = SerialTransport(args.porta, velocidade_serial)
+    transporte.start()
+    print("Procurando o carrinho... (verifique se ele esta ligado e pareado)")
+
+    #Inicializa o Pygame e o Joystick
+    pygame.init()
+    if pygame.joystick.get_count() == 0:
+        print("Falta o joystick")
+        transporte.close()
+        exit()
+    joystick = pygame.joystick.Joystick(0)
+    joystick.init()
+    print(f"Joystick'{joystick.get_name()}' inicializado ")
+    #So os eventos do joystick acordam o loop
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([pygame.JOYAXISMOTION, pygame.JOYBUTTONDOWN, pygame.QUIT])
+
+    mixer = DifferentialMixer(deadzone=args.deadzone, expo=args.expo, expo_giro=args.expo_giro)
+    controle = JoystickController(transporte, mixer, limiar=args.limiar, intervalo_repeticao=args.repeticao,
+                                  verbose=args.verbose)
+
+    try:
+        controle.run(joystick)
+    except KeyboardInterrupt:
+        print("\nPrograma encerrado pelo usuario.")
+    finally:
+        # Garante que o carro pare quando o programa for fechado
+        print("Enviando comando de parada final...")
+        transporte.close()
+        pygame.quit()
+        print("Conexao encerrada.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# --- Medição de Latência por Etapa ---
+# Não havia como saber quanto tempo um frame leva do cam.read() até a escrita na serial.
+# LatencyMonitor guarda as últimas N medidas de cada etapa (captura, inferência, mapeamento, desenho,
+# serial, exibição, total) em buffers circulares pré-alocados: registrar uma medida é só escrever num array,
+# sem alocação e sem print no caminho crítico. Os percentis (p50/p95/p99) e o fps são calculados
+# só quando alguém pede (overlay na tela, exportação ou benchmark).
+import json
+import threading
+import time
+
+import numpy as np
+import cv2
+
+
+# 'serial' é o tempo de entregar o comando ao transporte; 'escrita_serial' é a escrita real na porta (thread do transporte).
+# 'total' vai do cam.read() até o comando ser entregue; 'ponta_a_ponta' vai do cam.read() até o fim da escrita na porta.
+ETAPAS = ('captura', 'inferencia', 'mapeamento', 'desenho', 'serial', 'escrita_serial', 'exibicao', 'total',
+          'ponta_a_ponta')
+
+
+class LatencyMonitor:
+    # capacidade: quantas medidas recentes cada etapa guarda (a janela dos percentis).
+    def __init__(self, capacidade=512, etapas=ETAPAS):
+        self.capacidade = capacidade
+        self._amostras = {etapa: np.zeros(capacidade, dtype=np.float64) for etapa in etapas}
+        self._contagem = {etapa: 0 for etapa in etapas}
+        self._frames = np.zeros(capacidade, dtype=np.float64)  # Instantes dos últimos frames, para o fps.
+        self._total_frames = 0
+        self._trava = threading.Lock()  # As etapas podem rodar em threads diferentes (modo --pipeline).
+        self._linhas_overlay = []
+        self._overlay_em = 0.0
+
+    @staticmethod
+    def tic():
+        return time.perf_counter()
+
+    # Registra o tempo desde 'inicio' (retornado por tic()) na etapa. Retorna o instante atual,
+    # para encadear etapas: t = monitor.toc('captura', t); ...; t = monitor.toc('inferencia', t)
+    def toc(self, etapa, inicio):
+        agora = time.perf_counter()
+        self.record(etapa, agora - inicio)
+        return agora
+
+    def record(self, etapa, segundos):
+        with self._trava:
+            if etapa not in self._amostras:
+                self._amostras[etapa] = np.zeros(self.capacidade, dtype=np.float64)
+                self._contagem[etapa] = 0
+            n = self._contagem[etapa]
+            self._amostras[etapa][n % self.capacidade] = segundos
+            self._contagem[etapa] = n + 1
+
+    # Marca o fim de um frame (usado no cálculo do fps).
+    def frame_done(self):
+        with self._trava:
+            self._frames[self._total_frames % self.capacidade] = time.perf_counter()
+            self._total_frames += 1
+
+    def fps(self):
+        with self._trava:
+            n = min(self._total_frames, self.capacidade)
+            if n < 2:
+                return 0.0
+            instantes = self._frames[:n]
+            duracao = instantes.max() - instantes.min()
+        return (n - 1) / duracao if duracao > 0 else 0.0
+
+    # Percentis da janela atual de uma etapa, em milissegundos: {'p50': ..., 'p95': ..., 'p99': ..., 'n': ...}.
+    def percentiles(self, etapa):
+        with self._trava:
+            n = min(self._contagem.get(etapa, 0), self.capacidade)
+            if n == 0:
+                return None
+            janela = self._amostras[etapa][:n].copy()
+        p50, p95, p99 = np.percentile(janela, (50, 95, 99)) * 1000.0
+        return {'p50': p50, 'p95': p95, 'p99': p99, 'n': self._contagem[etapa]}
+
+    def summary(self):
+        resumo = {'fps': self.fps(), 'frames': self._total_frames, 'etapas': {}}
+        for etapa in list(self._amostras):
+            percentis = self.percentiles(etapa)
+            if percentis is not None:
+                resumo['etapas'][etapa] = percentis
+        return resumo
+
+    # Escreve o resumo num arquivo .json; com extensão .csv escreve uma linha por etapa.
+    def export(self, caminho):
+        resumo = self.summary()
+        if caminho.endswith('.csv'):
+            with open(caminho, 'w') as arquivo:
+                arquivo.write("etapa,p50_ms,p95_ms,p99_ms,n\n")
+                for etapa, p in resumo['etapas'].items():
+                    arquivo.write(f"{etapa},{p['p50']:.3f},{p['p95']:.3f},{p['p99']:.3f},{p['n']}\n")
+                arquivo.write(f"fps,{resumo['fps']:.2f},,,{resumo['frames']}\n")
+        else:
+            with open(caminho, 'w') as arquivo:
+                json.dump(resumo, arquivo, indent=2)
+        return resumo
+
+    # Texto compacto com fps e p50/p95/p99 de cada etapa, uma linha por etapa.
+    def format_lines(self):
+        linhas = [f"fps {self.fps():5.1f}"]
+        for etapa in list(self._amostras):
+            p = self.percentiles(etapa)
+            if p is not None:
+                linhas.append(f"{etapa:<13} {p['p50']:6.1f} {p['p95']:6.1f} {p['p99']:6.1f} ms")
+        return linhas
+
+    # Escreve as estatísticas no canto inferior esquerdo do frame.
+    # Os percentis são recalculados no máximo a cada 'intervalo' segundos; nos outros frames o texto é reaproveitado.
+    def draw_overlay(self, frame, cor=(0, 255, 255), intervalo=0.5):
+        agora = time.perf_counter()
+        if agora - self._overlay_em >= intervalo:
+            self._linhas_overlay = self.format_lines()
+            self._overlay_em = agora
+        linhas = self._linhas_overlay
+        y = frame.shape[0] - 10 - 16 * (len(linhas) - 1)
+        for linha in linhas:
+            cv2.putText(frame, linha, (10, y), cv2.FONT_HERSHEY_PLAIN, 1.0, cor, 1, cv2.LINE_AA)
+            y += 16
+        return frame
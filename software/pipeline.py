@@ -0,0 +1,193 @@
+# --- Pipeline de Captura / Inferência / Envio em Threads Separadas ---
+# No modo sequencial o loop faz cam.read(), YOLO, desenho, envio serial e imshow um depois do outro,
+# então a taxa de comandos nunca passa da etapa mais lenta e frames velhos se acumulam no buffer da câmera.
+# Aqui cada etapa roda na sua própria thread, ligadas por filas de tamanho 1 onde "o mais novo vence":
+# se a etapa seguinte ainda está ocupada, o item antigo é descartado e substituído pelo novo.
+# Assim a latência do gesto até o motor fica em torno de um tempo de inferência, e não da soma das etapas.
+# Com uma captura que reaproveita buffers (capture.Capture), cada frame é devolvido com cam.recycle() só quando
+# nenhuma etapa vai mais usá-lo: depois da exibição (ou da inferência, sem exibição) ou ao ser descartado numa fila.
+import threading
+import time
+
+
+class LatestQueue:
+    # Fila com no máximo um item. Um put() com a fila cheia substitui o item antigo (política "latest-wins").
+    # ao_descartar(item): chamada com cada item substituído antes de ser consumido (ex: devolver o frame).
+    def __init__(self, ao_descartar=None):
+        self.ao_descartar = ao_descartar
+        self._cond = threading.Condition()
+        self._item = None
+        self._tem_item = False
+        self._fechada = False
+        self.descartados = 0  # Quantos itens foram sobrescritos antes de serem consumidos.
+
+    def put(self, item):
+        descartado = None
+        with self._cond:
+            if self._tem_item:
+                self.descartados += 1
+                descartado = self._item
+            self._item = item
+            self._tem_item = True
+            self._cond.notify()
+        if descartado is not None and self.ao_descartar is not None:
+            self.ao_descartar(descartado)
+
+    def get(self, timeout=None):
+        # Retorna o item mais recente, ou None se o tempo acabar ou a fila for fechada.
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._tem_item or self._fechada, timeout):
+                return None
+            if not self._tem_item:
+                return None
+            item = self._item
+            self._item = None
+            self._tem_item = False
+            return item
+
+    def close(self):
+        # Acorda quem estiver esperando em get() para que as threads possam terminar.
+        with self._cond:
+            self._fechada = True
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    # Lê a câmera o mais rápido possível e guarda apenas o frame mais novo.
+    # Isso esvazia o buffer interno da câmera, evitando processar imagens atrasadas.
+    def __init__(self, cam, saida, parar, metricas=None):
+        super().__init__(name="captura", daemon=True)
+        self.erro = None  # Exceção que encerrou a thread (ver PosePipeline.check).
+        self.cam = cam
+        self.saida = saida
+        self.parar = parar
+        self.metricas = metricas
+
+    def run(self):
+        try:
+            while not self.parar.is_set() and self.cam.isOpened():
+                instante_captura = time.perf_counter()
+                ret, frame = self.cam.read()
+                if not ret:  # Fim do vídeo ou câmera desconectada: encerra todo o pipeline.
+                    break
+                if self.metricas is not None:
+                    self.metricas.toc('captura', instante_captura)
+                self.saida.put((instante_captura, frame))
+        except BaseException as erro:
+            self.erro = erro
+        finally:
+            self.parar.set()
+            self.saida.close()
+
+
+class InferenceWorker(threading.Thread):
+    # Pega o frame mais novo, roda 'processar' (YOLO + lógica do joystick) e
+    # distribui o resultado: o comando vai para o envio e o frame desenhado vai para a exibição.
+    # reciclar(frame): devolve o frame à captura quando não há exibição para usá-lo depois.
+    def __init__(self, entrada, processar, saida_comandos, saida_exibicao, parar, reciclar=None):
+        super().__init__(name="inferencia", daemon=True)
+        self.erro = None
+        self.entrada = entrada
+        self.processar = processar
+        self.reciclar = reciclar
+        self.saida_comandos = saida_comandos
+        self.saida_exibicao = saida_exibicao
+        self.parar = parar
+
+    def run(self):
+        try:
+            while not self.parar.is_set():
+                item = self.entrada.get(timeout=0.1)
+                if item is None:
+                    continue
+                instante_captura, frame = item
+                comando, frame_desenhado = self.processar(frame)
+                self.saida_comandos.put((instante_captura, comando))
+                if self.saida_exibicao is not None:
+                    self.saida_exibicao.put(frame_desenhado)
+                elif self.reciclar is not None:
+                    self.reciclar(frame_desenhado)
+        except BaseException as erro:
+            self.erro = erro
+        finally:
+            self.parar.set()
+            self.saida_comandos.close()
+            if self.saida_exibicao is not None:
+                self.saida_exibicao.close()
+
+
+class CommandSender(threading.Thread):
+    # Envia apenas o comando mais recente. Uma escrita lenta no Bluetooth não trava a inferência,
+    # e comandos que ficaram velhos enquanto a escrita acontecia são simplesmente descartados.
+    # 'enviar(comando, instante_captura)' recebe também o instante da leitura do frame, para medir latência.
+    def __init__(self, entrada, enviar, parar):
+        super().__init__(name="envio", daemon=True)
+        self.erro = None
+        self.entrada = entrada
+        self.enviar = enviar
+        self.parar = parar
+        self.ultima_latencia = 0.0  # Segundos entre a captura do frame e o fim da escrita do comando.
+
+    def run(self):
+        try:
+            while not self.parar.is_set():
+                item = self.entrada.get(timeout=0.1)
+                if item is None:
+                    continue
+                instante_captura, comando = item
+                self.enviar(comando, instante_captura)
+                self.ultima_latencia = time.perf_counter() - instante_captura
+        except BaseException as erro:
+            self.erro = erro
+        finally:
+            self.parar.set()
+
+
+class PosePipeline:
+    # Junta as três threads e as filas entre elas.
+    # 'processar(frame)' deve retornar (comando, frame_desenhado) e 'enviar(comando, instante_captura)' faz o envio.
+    # A exibição (cv2.imshow) fica na thread principal, pois o OpenCV exige isso em vários sistemas.
+    # 'metricas' (opcional, metrics.LatencyMonitor) recebe o tempo de captura.
+    # Quem consome 'fila_exibicao' deve chamar recycle(frame) depois de exibir cada frame.
+    def __init__(self, cam, processar, enviar, exibir=True, metricas=None):
+        self.parar = threading.Event()
+        # Sem recycle (ex: recorder.ReplayCapture) cada leitura já é um frame novo e nada precisa ser devolvido.
+        self._reciclar = getattr(cam, 'recycle', None)
+        self.fila_frames = LatestQueue(ao_descartar=lambda item: self.recycle(item[1]))
+        self.fila_comandos = LatestQueue()
+        self.fila_exibicao = LatestQueue(ao_descartar=self.recycle) if exibir else None
+
+        self.captura = CaptureThread(cam, self.fila_frames, self.parar, metricas)
+        self.inferencia = InferenceWorker(self.fila_frames, processar, self.fila_comandos,
+                                          self.fila_exibicao, self.parar, reciclar=self.recycle)
+        self.envio = CommandSender(self.fila_comandos, enviar, self.parar)
+
+    def start(self):
+        self.envio.start()
+        self.inferencia.start()
+        self.captura.start()
+
+    # Devolve um frame à captura; a partir daqui ela pode escrever o próximo frame nele.
+    def recycle(self, frame):
+        if self._reciclar is not None:
+            self._reciclar(frame)
+
+    def rodando(self):
+        return not self.parar.is_set()
+
+    # Se uma das threads morreu com uma exceção, ela é relançada aqui (na thread que chamar, ex: a principal).
+    # Qualquer erro numa etapa já encerra o pipeline inteiro: a thread que falhou sinaliza 'parar' ao sair.
+    def check(self):
+        for thread in (self.captura, self.inferencia, self.envio):
+            if thread.erro is not None:
+                raise thread.erro
+
+    def stop(self):
+        self.parar.set()
+        self.fila_frames.close()
+        self.fila_comandos.close()
+        if self.fila_exibicao is not None:
+            self.fila_exibicao.close()
+        for thread in (self.captura, self.inferencia, self.envio):
+            if thread.is_alive():
+                thread.join(timeout=2)
@@ -0,0 +1,82 @@
+# --- Mapeamento Vetorizado de Keypoints para Comandos ---
+# A lógica do joystick em anel de analyze_pose_and_control, reescrita com operações NumPy sobre
+# um array (N, 17, 2) de keypoints (vários frames ou várias pessoas de uma vez).
+# Nos jobs de replay e ajuste offline o custo de um 'if' em Python por frame dominava o tempo total;
+# aqui um lote inteiro é resolvido em poucas operações vetorizadas.
+import numpy as np
+import cv2
+
+
+# Pares de índices de keypoints (formato COCO) conectados por uma linha no desenho do esqueleto.
+CONNECTIONS = np.array([
+    (6, 4), (4, 2), (2, 0), (0, 1), (1, 3), (10, 8), (8, 6), (6, 5),
+    (5, 7), (7, 9), (6, 12), (11, 5), (11, 12), (11, 13), (13, 15),
+    (12, 14), (14, 16)
+])
+
+# Direção de cada cone de 90 graus, começando em -45° e girando no sentido anti-horário:
+# [-45, 45) direita, [45, 135) frente, [135, 225) esquerda, [225, 315) trás.
+DIRECOES_CONES = np.array(['R', 'F', 'L', 'B'])
+
+
+class PoseCommandMapper:
+    # outer_radius / inner_radius: raios do anel do joystick virtual (em pixels).
+    # keypoint: índice do ponto usado como cursor (9 = pulso esquerdo no COCO, que vira o direito com o espelho).
+    # velocidade_max: maior nível de velocidade do protocolo (0-9).
+    def __init__(self, outer_radius=200, inner_radius=60, keypoint=9, velocidade_max=9):
+        self.outer_radius = outer_radius
+        self.inner_radius = inner_radius
+        self.keypoint = keypoint
+        self.velocidade_max = velocidade_max
+
+    # Calcula direção e velocidade para cada linha do lote.
+    # keypoints: array (N, 17, 2); centers: (2,) para um centro comum ou (N, 2) para um centro por linha.
+    # Retorna (direcoes, velocidades, ativos): arrays (N,) com 'S' e 0 nas linhas fora do anel.
+    def map_batch(self, keypoints, centers):
+        keypoints = np.asarray(keypoints, dtype=np.float32)
+        centers = np.asarray(centers, dtype=np.float32)
+
+        delta = keypoints[:, self.keypoint, :] - centers
+        delta_x = delta[:, 0]
+        delta_y = delta[:, 1]
+        distancia = np.hypot(delta_x, delta_y)
+        ativos = (distancia > self.inner_radius) & (distancia <= self.outer_radius)
+
+        # O eixo Y do OpenCV cresce para baixo, por isso o -delta_y (mesma convenção do código original).
+        angulo = np.degrees(np.arctan2(-delta_y, delta_x))
+        cone = np.floor((angulo + 45.0) / 90.0).astype(np.intp) % 4
+        direcoes = np.where(ativos, DIRECOES_CONES[cone], 'S')
+
+        fracao = (distancia - self.inner_radius) / (self.outer_radius - self.inner_radius)
+        velocidades = np.clip((fracao * self.velocidade_max).astype(np.int32), 0, self.velocidade_max)
+        velocidades = np.where(ativos, velocidades, 0)
+        return direcoes, velocidades, ativos
+
+    # Conveniência para um único conjunto de keypoints (17, 2): retorna (direcao, velocidade, ativo).
+    def map_one(self, keypoints, center):
+        direcoes, velocidades, ativos = self.map_batch(np.asarray(keypoints)[None], center)
+        return str(direcoes[0]), int(velocidades[0]), bool(ativos[0])
+
+    # Junta direções e velocidades nas strings do protocolo serial (ex: "F7", "S0").
+    @staticmethod
+    def to_commands(direcoes, velocidades):
+        return np.char.add(direcoes.astype(str), velocidades.astype(str))
+
+    # Monta todos os segmentos do esqueleto de uma vez: array (M, 2, 2) de int32 pronto para cv2.polylines.
+    # Só entram os ossos cujos dois pontos foram detectados (coordenadas > 0), como no laço original.
+    @staticmethod
+    def skeleton_segments(keypoints):
+        keypoints = np.asarray(keypoints)
+        if keypoints.ndim == 2:
+            keypoints = keypoints[None]
+        segmentos = keypoints[:, CONNECTIONS]  # (N, 17 conexões, 2 pontos, 2 coordenadas)
+        validos = np.all(segmentos > 0, axis=(-2, -1))
+        return segmentos[validos].astype(np.int32)
+
+    # Desenha o esqueleto de uma ou várias pessoas com uma única chamada ao OpenCV.
+    @classmethod
+    def draw_skeleton(cls, frame, keypoints, color=(255, 255, 0), thickness=2):
+        segmentos = cls.skeleton_segments(keypoints)
+        if len(segmentos):
+            cv2.polylines(frame, segmentos, False, color, thickness)
+        return frame
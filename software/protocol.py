@@ -0,0 +1,194 @@
+# --- Protocolo Binário de Comandos (versão 1) ---
+# Substitui as linhas ASCII "F7\n": elas só permitiam 10 níveis de velocidade, a mesma velocidade nas duas
+# rodas, e um '\n' perdido travava o parser do Arduino até o timeout de 1 s.
+# Cada comando agora é um quadro de tamanho fixo, com PWM separado e com sinal para cada roda:
+#
+#   Comando (PC -> carrinho), 8 bytes:
+#     [0] SYNC (0xA5)   [1] versão << 4 | tipo (0x11)   [2] sequência (0-255)
+#     [3..4] PWM da roda esquerda, int16 little-endian (-255 a 255)
+#     [5..6] PWM da roda direita,  int16 little-endian (-255 a 255)
+#     [7] CRC-8 (polinômio 0x07) dos bytes 1 a 6
+#
+#   Ack (carrinho -> PC), 5 bytes:
+#     [0] SYNC (0xA5)   [1] versão << 4 | tipo (0x12)   [2] sequência do comando   [3] status   [4] CRC-8 dos bytes 1 a 3
+#
+# O mesmo formato está implementado em firmware/arduino/controle.h (usado pelo neward.ino).
+import struct
+import time
+
+
+SYNC = 0xA5
+VERSAO = 1
+TIPO_COMANDO = 0x1
+TIPO_ACK = 0x2
+TAMANHO_COMANDO = 8
+TAMANHO_ACK = 5
+STATUS_OK = 0
+
+PWM_MAX = 255
+# Com quadros binários curtos dá para subir a velocidade do link. O módulo HC-05 precisa ser
+# configurado uma vez para a mesma velocidade (comando AT+UART=38400,0,0).
+BAUD_PADRAO = 38400
+
+_TAMANHOS = {TIPO_COMANDO: TAMANHO_COMANDO, TIPO_ACK: TAMANHO_ACK}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+# Tabela do CRC-8 (polinômio 0x07, valor inicial 0), calculada uma vez na importação.
+def _tabela_crc8():
+    tabela = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        tabela.append(crc)
+    return bytes(tabela)
+
+
+_TABELA_CRC8 = _tabela_crc8()
+
+
+def crc8(dados):
+    crc = 0
+    for byte in dados:
+        crc = _TABELA_CRC8[crc ^ byte]
+    return crc
+
+
+def _cabecalho(tipo):
+    return (VERSAO << 4) | tipo
+
+
+def encode_command(seq, esquerda, direita):
+    esquerda = max(-PWM_MAX, min(PWM_MAX, int(esquerda)))
+    direita = max(-PWM_MAX, min(PWM_MAX, int(direita)))
+    corpo = struct.pack('<BBhh', _cabecalho(TIPO_COMANDO), seq & 0xFF, esquerda, direita)
+    return bytes((SYNC,)) + corpo + bytes((crc8(corpo),))
+
+
+def encode_ack(seq, status=STATUS_OK):
+    corpo = bytes((_cabecalho(TIPO_ACK), seq & 0xFF, status & 0xFF))
+    return bytes((SYNC,)) + corpo + bytes((crc8(corpo),))
+
+
+# Decodifica um quadro completo. Retorna (tipo, seq, dados):
+# dados = (esquerda, direita) para comandos e status para acks.
+def decode_frame(quadro):
+    if len(quadro) < 2 or quadro[0] != SYNC:
+        raise ProtocolError("quadro sem byte de sincronismo")
+    versao, tipo = quadro[1] >> 4, quadro[1] & 0x0F
+    if versao != VERSAO or tipo not in _TAMANHOS:
+        raise ProtocolError(f"versão/tipo desconhecido: 0x{quadro[1]:02X}")
+    if len(quadro) != _TAMANHOS[tipo]:
+        raise ProtocolError(f"tamanho inválido para o tipo {tipo}: {len(quadro)}")
+    if crc8(quadro[1:-1]) != quadro[-1]:
+        raise ProtocolError("CRC inválido")
+    if tipo == TIPO_COMANDO:
+        _, seq, esquerda, direita = struct.unpack('<BBhh', quadro[1:-1])
+        return tipo, seq, (esquerda, direita)
+    return tipo, quadro[2], quadro[3]
+
+
+class FrameParser:
+    # Parser incremental: recebe bytes em pedaços de qualquer tamanho e devolve os quadros válidos completos.
+    # Bytes perdidos ou corrompidos só custam a ressincronização no próximo SYNC, sem esperar timeout.
+    def __init__(self):
+        self._buffer = bytearray()
+        self.erros = 0  # Quadros descartados por CRC, versão ou tipo inválido.
+
+    def feed(self, dados):
+        self._buffer.extend(dados)
+        quadros = []
+        while True:
+            inicio = self._buffer.find(SYNC)
+            if inicio < 0:
+                self._buffer.clear()
+                break
+            del self._buffer[:inicio]
+            if len(self._buffer) < 2:
+                break
+            tamanho = _TAMANHOS.get(self._buffer[1] & 0x0F)
+            if self._buffer[1] >> 4 != VERSAO or tamanho is None:
+                self.erros += 1
+                del self._buffer[0]
+                continue
+            if len(self._buffer) < tamanho:
+                break
+            quadro = bytes(self._buffer[:tamanho])
+            try:
+                quadros.append(decode_frame(quadro))
+                del self._buffer[:tamanho]
+            except ProtocolError:
+                # Provavelmente um SYNC falso no meio dos dados: tenta a partir do próximo byte.
+                self.erros += 1
+                del self._buffer[0]
+        return quadros
+
+
+# Converte o comando antigo (direção + velocidade 0-9) em PWM das rodas esquerda e direita,
+# com a mesma escala e o mesmo sentido de giro que o firmware usava (map(velocidade, 0, 9, 0, 255)).
+def direcao_para_rodas(direcao, velocidade):
+    pwm = int(velocidade) * PWM_MAX // 9
+    return {
+        'F': (pwm, pwm),
+        'B': (-pwm, -pwm),
+        'L': (-pwm, pwm),
+        'R': (pwm, -pwm),
+    }.get(direcao, (0, 0))
+
+
+class CommandLink:
+    # Numera os comandos, monta os quadros e confere os acks que o carrinho devolve.
+    # 'porta' é qualquer objeto com write(), read() e in_waiting (ex: serial.Serial).
+    # 'gravador' (opcional, um recorder.SessionRecorder) registra todos os bytes enviados e recebidos.
+    def __init__(self, porta, gravador=None):
+        self.porta = porta
+        self.gravador = gravador
+        self.parser = FrameParser()
+        self.seq = 0
+        self.pendentes = {}  # seq -> instante do envio, para medir o tempo de ida e volta.
+        # seq -> 'instante' de origem passado a send() (ex: leitura do frame), ou None. Guardado antes da escrita,
+        # para quem está do outro lado (ex: car_sim.SimulatedCar) medir a latência desde a origem do comando.
+        self.origens = {}
+        self.ultimo_rtt = None
+        self.enviados = 0
+        self.confirmados = 0
+
+    def send(self, esquerda, direita, instante=None):
+        quadro = encode_command(self.seq, esquerda, direita)
+        self.origens[self.seq] = instante  # No máximo 256 entradas: a sequência dá a volta.
+        self.porta.write(quadro)
+        if self.gravador is not None:
+            self.gravador.record_serial(quadro, 0)  # 0 = recorder.SAIDA
+        self.pendentes[self.seq] = time.perf_counter()
+        self.seq = (self.seq + 1) & 0xFF
+        self.enviados += 1
+        # Um ack perdido não pode fazer a tabela crescer sem limite.
+        if len(self.pendentes) > 64:
+            self.pendentes.pop(next(iter(self.pendentes)))
+        return quadro
+
+    def send_direction(self, direcao, velocidade):
+        return self.send(*direcao_para_rodas(direcao, velocidade))
+
+    # Lê sem bloquear o que já chegou na porta e processa os acks. Retorna as sequências confirmadas.
+    def poll_acks(self):
+        disponiveis = self.porta.in_waiting
+        if not disponiveis:
+            return []
+        dados = self.porta.read(disponiveis)
+        if self.gravador is not None:
+            self.gravador.record_serial(dados, 1)  # 1 = recorder.ENTRADA
+        confirmadas = []
+        for tipo, seq, status in self.parser.feed(dados):
+            if tipo != TIPO_ACK or status != STATUS_OK:
+                continue
+            enviado_em = self.pendentes.pop(seq, None)
+            if enviado_em is not None:
+                self.ultimo_rtt = time.perf_counter() - enviado_em
+                self.confirmados += 1
+                confirmadas.append(seq)
+        return confirmadas
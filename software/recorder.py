@@ -0,0 +1,305 @@
+# --- Gravação e Replay Determinístico de Sessões ---
+# Nenhuma execução podia ser reproduzida: a webcam era fixa e nada era salvo.
+# SessionRecorder grava, em segmentos .npy (que podem ser abertos com memmap, sem carregar tudo):
+#   - o instante e os keypoints de cada frame (e, opcionalmente, o próprio frame);
+#   - a direção/velocidade escolhida em cada frame;
+#   - os bytes trocados com o carrinho pela serial.
+# Os segmentos são salvos por uma thread própria, então o disco nunca trava o loop de controle, e o meta.json
+# é escrito no início e atualizado a cada segmento salvo: uma sessão interrompida no meio continua legível.
+# ReplayCapture lê uma sessão gravada com a mesma interface do cv2.VideoCapture (isOpened/read/release),
+# em tempo real ou o mais rápido possível, para testar mudanças no controle sem webcam e sem carrinho.
+#
+# Estrutura do diretório de uma sessão:
+#   meta.json                 formato do frame, tamanho dos segmentos, totais já salvos
+#   comandos_00000.npy ...    DTYPE_COMANDO, um registro por frame
+#   keypoints_00000.npy ...   float32 (n, 17, 2), zeros quando não havia pessoa
+#   frames_00000.npy ...      uint8 (n, altura, largura, 3), só com salvar_frames=True (segmentos de até ~16 MB)
+#   serial_00000.npy ...      DTYPE_SERIAL, um registro por pedaço de até 32 bytes
+import bisect
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+SAIDA = 0    # PC -> carrinho
+ENTRADA = 1  # carrinho -> PC
+
+DTYPE_COMANDO = np.dtype([('t', '<f8'), ('direcao', 'S1'), ('velocidade', 'i1'), ('tem_pessoa', '?')])
+DTYPE_SERIAL = np.dtype([('t', '<f8'), ('sentido', 'i1'), ('tamanho', 'u1'), ('dados', 'S32')])
+VERSAO_LOG = 1
+
+
+class _DiskWriter(threading.Thread):
+    # Salva os segmentos prontos em segundo plano, na ordem em que chegam.
+    # ao_salvar(nome, n) é chamado (nesta thread) depois de cada arquivo salvo.
+    # max_pendentes: segmentos esperando o disco; se ele não acompanhar, quem grava espera em vez de
+    # acumular memória sem limite.
+    def __init__(self, ao_salvar, max_pendentes=4):
+        super().__init__(daemon=True)
+        self.ao_salvar = ao_salvar
+        self.fila = queue.Queue(maxsize=max_pendentes)
+        self.erro = None
+
+    # caminho None só pede um novo ao_salvar (ex: para atualizar o meta.json).
+    def put(self, caminho, dados, nome):
+        self.fila.put((caminho, dados, nome))
+
+    def run(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                return
+            caminho, dados, nome = item
+            try:
+                if caminho is not None:
+                    np.save(caminho, dados)
+                self.ao_salvar(nome, 0 if dados is None else len(dados))
+            except Exception as erro:  # Disco cheio etc.: a gravação para, o controle não.
+                if self.erro is None:
+                    self.erro = erro
+                    print(f"Gravação da sessão falhou: {erro}")
+
+    def close(self):
+        self.fila.put(None)
+        self.join()
+
+
+class _SegmentWriter:
+    # Acumula registros num buffer pré-alocado e entrega um arquivo .npy ao _DiskWriter a cada 'tamanho' registros.
+    # O buffer cheio vai inteiro para a thread de escrita e um novo é alocado, sem cópia.
+    def __init__(self, diretorio, nome, tamanho, formato, dtype, escritor):
+        self.diretorio = diretorio
+        self.nome = nome
+        self.tamanho = tamanho
+        self.formato = tuple(formato)
+        self.dtype = dtype
+        self.escritor = escritor
+        self.buffer = np.zeros((tamanho,) + self.formato, dtype=dtype)
+        self.posicao = 0
+        self.segmento = 0
+        self.total = 0
+
+    def append(self, valor):
+        self.buffer[self.posicao] = valor
+        self.posicao += 1
+        self.total += 1
+        if self.posicao == self.tamanho:
+            self.flush()
+
+    def flush(self):
+        if self.posicao == 0:
+            return
+        caminho = os.path.join(self.diretorio, f"{self.nome}_{self.segmento:05d}.npy")
+        self.escritor.put(caminho, self.buffer[:self.posicao], self.nome)
+        self.buffer = np.zeros((self.tamanho,) + self.formato, dtype=self.dtype)
+        self.segmento += 1
+        self.posicao = 0
+
+
+class SessionRecorder:
+    # diretorio: onde a sessão é salva (criado se não existir).
+    # salvar_frames: grava também as imagens; sem isso só os keypoints (bem mais compacto).
+    # tamanho_segmento: registros por arquivo .npy de comandos, keypoints e serial.
+    # bytes_segmento_frames: tamanho máximo de um arquivo de frames (a 640x480 um frame tem ~0,9 MB).
+    def __init__(self, diretorio, salvar_frames=False, tamanho_segmento=256, bytes_segmento_frames=16 * 2**20):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.salvar_frames = salvar_frames
+        self.tamanho_segmento = tamanho_segmento
+        self.bytes_segmento_frames = bytes_segmento_frames
+        self.tamanho_segmento_frames = None
+        self.formato_frame = None
+        self.t0 = time.perf_counter()
+
+        # Registros já salvos em disco, por sequência (é o que o meta.json informa).
+        self._salvos = {'comandos': 0, 'keypoints': 0, 'frames': 0, 'serial': 0}
+        self._escrever_meta()
+        self._escritor = _DiskWriter(self._ao_salvar)
+        self._escritor.start()
+
+        self._comandos = _SegmentWriter(diretorio, 'comandos', tamanho_segmento, (), DTYPE_COMANDO, self._escritor)
+        self._keypoints = _SegmentWriter(diretorio, 'keypoints', tamanho_segmento, (17, 2), np.float32,
+                                         self._escritor)
+        self._frames = None  # Criado no primeiro frame, quando o formato da imagem é conhecido.
+        self._serial = _SegmentWriter(diretorio, 'serial', tamanho_segmento, (), DTYPE_SERIAL, self._escritor)
+        # Frames e serial são gravados por threads diferentes no modo --pipeline.
+        self._trava_frames = threading.Lock()
+        self._trava_serial = threading.Lock()
+
+    def _agora(self):
+        return time.perf_counter() - self.t0
+
+    # Escreve o meta.json num arquivo temporário e troca de uma vez, para nunca deixar um meta.json pela metade.
+    def _escrever_meta(self):
+        meta = {
+            'versao': VERSAO_LOG,
+            'formato_frame': list(self.formato_frame) if self.formato_frame else None,
+            'tem_frames': self.salvar_frames,
+            'tamanho_segmento': self.tamanho_segmento,
+            'tamanho_segmento_frames': self.tamanho_segmento_frames,
+            'total_frames': self._salvos['comandos'],
+            'total_serial': self._salvos['serial'],
+        }
+        caminho = os.path.join(self.diretorio, 'meta.json')
+        with open(caminho + '.tmp', 'w') as arquivo:
+            json.dump(meta, arquivo, indent=2)
+        os.replace(caminho + '.tmp', caminho)
+
+    # Chamado pela thread de escrita depois de cada segmento salvo.
+    def _ao_salvar(self, nome, n):
+        if nome is not None:
+            self._salvos[nome] += n
+        self._escrever_meta()
+
+    # Registra um frame processado. 'frame' é a imagem original da câmera (antes do espelho e dos desenhos)
+    # e 'keypoints' são os 17 pontos (17, 2) da pessoa que controla o carrinho, ou None.
+    def record_frame(self, frame, keypoints, direcao, velocidade):
+        t = self._agora()
+        with self._trava_frames:
+            if self.formato_frame is None:
+                self.formato_frame = frame.shape
+                if self.salvar_frames:
+                    self.tamanho_segmento_frames = max(1, self.bytes_segmento_frames // frame.nbytes)
+                    self._frames = _SegmentWriter(self.diretorio, 'frames', self.tamanho_segmento_frames,
+                                                  frame.shape, np.uint8, self._escritor)
+                self._escritor.put(None, None, None)  # O formato do frame já vai para o meta.json.
+            tem_pessoa = keypoints is not None
+            self._comandos.append((t, direcao.encode(), velocidade, tem_pessoa))
+            self._keypoints.append(keypoints if tem_pessoa else 0)
+            if self._frames is not None:
+                self._frames.append(frame)
+
+    # Registra bytes da serial. sentido: SAIDA (PC -> carrinho) ou ENTRADA (carrinho -> PC).
+    def record_serial(self, dados, sentido):
+        t = self._agora()
+        with self._trava_serial:
+            for inicio in range(0, len(dados), 32):
+                pedaco = bytes(dados[inicio:inicio + 32])
+                self._serial.append((t, sentido, len(pedaco), pedaco))
+
+    # Entrega o que ainda está nos buffers e espera a thread de escrita terminar (o meta.json final é escrito por ela).
+    def close(self):
+        with self._trava_frames, self._trava_serial:
+            for escritor in (self._comandos, self._keypoints, self._frames, self._serial):
+                if escritor is not None:
+                    escritor.flush()
+        self._escritor.close()
+
+
+class _SegmentReader:
+    # Acesso por índice a uma sequência gravada em vários .npy, abertos com memmap (só lê o que for usado).
+    def __init__(self, diretorio, nome):
+        self.segmentos = [np.load(caminho, mmap_mode='r')
+                          for caminho in sorted(glob.glob(os.path.join(diretorio, f"{nome}_*.npy")))]
+        self.inicios = []
+        total = 0
+        for segmento in self.segmentos:
+            self.inicios.append(total)
+            total += len(segmento)
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, indice):
+        if not 0 <= indice < self.total:
+            raise IndexError(indice)
+        s = bisect.bisect_right(self.inicios, indice) - 1
+        return self.segmentos[s][indice - self.inicios[s]]
+
+    # Junta tudo num único array (use só para sequências pequenas, como comandos e serial).
+    def todos(self):
+        if not self.segmentos:
+            return np.zeros(0)
+        return np.concatenate(self.segmentos)
+
+
+class SessionLog:
+    # Leitura de uma sessão gravada por SessionRecorder.
+    def __init__(self, diretorio):
+        with open(os.path.join(diretorio, 'meta.json')) as arquivo:
+            self.meta = json.load(arquivo)
+        if self.meta.get('versao') != VERSAO_LOG:
+            raise ValueError(f"versão de log não suportada: {self.meta.get('versao')}")
+        self.diretorio = diretorio
+        self.comandos = _SegmentReader(diretorio, 'comandos')
+        self.keypoints = _SegmentReader(diretorio, 'keypoints')
+        self.frames = _SegmentReader(diretorio, 'frames') if self.meta['tem_frames'] else None
+        self.serial = _SegmentReader(diretorio, 'serial')
+
+    # Frames completos: numa sessão interrompida as sequências podem ter parado em pontos diferentes.
+    def __len__(self):
+        return min(len(self.comandos), len(self.keypoints),
+                   len(self.comandos) if self.frames is None else len(self.frames))
+
+    # Strings de comando gravadas (ex: "F7"), na ordem dos frames.
+    def command_strings(self):
+        comandos = self.comandos.todos()
+        if len(comandos) == 0:
+            return []
+        return [f"{d.decode()}{v}" for d, v in zip(comandos['direcao'], comandos['velocidade'])]
+
+
+class ReplayCapture:
+    # Substitui o cv2.VideoCapture lendo uma sessão gravada.
+    # velocidade: 1.0 = tempo real, 4.0 = quatro vezes mais rápido, 0 = o mais rápido possível.
+    # Se a sessão não tem imagens, read() devolve um frame preto do tamanho original;
+    # os keypoints gravados do frame atual ficam em 'keypoints' (None quando não havia pessoa).
+    # usar_keypoints: se os keypoints gravados substituem o modelo. None (padrão) = só quando a sessão não tem
+    # imagens; com imagens o modelo roda de novo sobre elas, para medir mudanças no lado da visão.
+    def __init__(self, diretorio, velocidade=0.0, usar_keypoints=None):
+        self.log = SessionLog(diretorio)
+        self.velocidade = velocidade
+        self._usar_keypoints = usar_keypoints
+        self.indice = -1
+        self.keypoints = None
+        self.tempo = 0.0
+        self._aberta = True
+        self._inicio = None
+        formato = self.log.meta['formato_frame']
+        self._frame_vazio = np.zeros(formato, dtype=np.uint8) if formato else None
+
+    @property
+    def tem_keypoints(self):
+        return len(self.log.keypoints) > 0
+
+    # Se quem lê deve usar 'keypoints' no lugar do modelo (ver usar_keypoints no construtor).
+    @property
+    def usar_keypoints(self):
+        if self._usar_keypoints is not None:
+            return self._usar_keypoints and self.tem_keypoints
+        return self.log.frames is None and self.tem_keypoints
+
+    def isOpened(self):
+        return self._aberta
+
+    def read(self):
+        if not self._aberta or self.indice + 1 >= len(self.log):
+            self._aberta = False
+            return False, None
+        self.indice += 1
+        registro = self.log.comandos[self.indice]
+        self.tempo = float(registro['t'])
+
+        # Respeita o intervalo original entre os frames, dividido pela velocidade.
+        if self.velocidade > 0:
+            if self._inicio is None:
+                self._inicio = time.perf_counter() - self.tempo / self.velocidade
+            espera = self._inicio + self.tempo / self.velocidade - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+        self.keypoints = np.array(self.log.keypoints[self.indice]) if registro['tem_pessoa'] else None
+        if self.log.frames is not None:
+            frame = np.array(self.log.frames[self.indice])  # Cópia: o frame vai ser desenhado.
+        else:
+            frame = self._frame_vazio.copy()
+        return True, frame
+
+    def release(self):
+        self._aberta = False
@@ -0,0 +1,76 @@
+# --- Agendamento Adaptativo da Inferência ---
+# Nos notebooks de controle (só CPU) rodar o YOLO em todo frame na resolução cheia dá uns 8 fps.
+# O agendador mede a latência real do modelo e ajusta três coisas para manter o loop no fps desejado:
+#   1. Quantos frames pular entre uma inferência e outra (o antigo skip_factor, agora calculado).
+#   2. Uma região de interesse (ROI) com margem em volta da última pessoa detectada,
+#      voltando para o frame inteiro quando a pessoa some.
+#   3. O imgsz passado ao YOLO: diminui quando a inferência estoura o orçamento do frame
+#      e volta a subir quando sobra tempo.
+import math
+
+
+class AdaptiveScheduler:
+    # fps_alvo: taxa de frames que o loop deve manter.
+    # imgsz_opcoes: resoluções de entrada do modelo, da maior para a menor (múltiplos de 32, exigência do YOLO).
+    # padding: margem da ROI, como fração do tamanho da caixa da pessoa.
+    # suavizacao: peso da medida mais nova na média móvel exponencial da latência.
+    def __init__(self, fps_alvo=25, imgsz_opcoes=(640, 512, 416, 320, 256), padding=0.25,
+                 suavizacao=0.2, usar_roi=True):
+        self.orcamento = 1.0 / fps_alvo  # Tempo disponível por frame, em segundos.
+        self.imgsz_opcoes = tuple(imgsz_opcoes)
+        self.nivel_imgsz = 0
+        self.padding = padding
+        self.suavizacao = suavizacao
+        self.usar_roi = usar_roi
+
+        self.latencia = None   # Média móvel da latência de inferência (segundos).
+        self.skip_factor = 1   # Roda a inferência em 1 de cada 'skip_factor' frames.
+        self.ultima_caixa = None  # (x0, y0, x1, y1) da última pessoa detectada, em coordenadas do frame.
+        self._contador = 0
+
+    @property
+    def imgsz(self):
+        return self.imgsz_opcoes[self.nivel_imgsz]
+
+    # Chamado uma vez por frame: diz se este frame deve passar pelo modelo.
+    # O primeiro frame sempre passa, para termos uma medida de latência.
+    def should_infer(self):
+        infere = self._contador % self.skip_factor == 0
+        self._contador += 1
+        return infere
+
+    # Região do frame a ser enviada ao modelo: (x0, y0, x1, y1).
+    # Sem pessoa conhecida (ou com a ROI desligada) devolve o frame inteiro.
+    def roi(self, frame_shape):
+        height, width = frame_shape[:2]
+        if not self.usar_roi or self.ultima_caixa is None:
+            return 0, 0, width, height
+        x0, y0, x1, y1 = self.ultima_caixa
+        margem_x = (x1 - x0) * self.padding
+        margem_y = (y1 - y0) * self.padding
+        return (max(0, int(x0 - margem_x)), max(0, int(y0 - margem_y)),
+                min(width, int(math.ceil(x1 + margem_x))), min(height, int(math.ceil(y1 + margem_y))))
+
+    # Chamado depois de cada inferência com o tempo gasto e a caixa da pessoa (ou None se ninguém foi detectado).
+    def update(self, latencia, caixa=None):
+        if self.latencia is None:
+            self.latencia = latencia
+        else:
+            self.latencia += self.suavizacao * (latencia - self.latencia)
+
+        # Pessoa perdida: a próxima inferência volta a olhar o frame inteiro.
+        self.ultima_caixa = caixa
+
+        # Taxa de inferência: se o modelo leva mais que um frame, pula os frames que não dá tempo de processar.
+        self.skip_factor = max(1, math.ceil(self.latencia / self.orcamento))
+
+        # Resolução: desce um nível se a inferência sozinha já estoura o orçamento do frame,
+        # e sobe um nível quando sobra bastante folga (a faixa entre os dois evita ficar oscilando).
+        nivel_anterior = self.nivel_imgsz
+        if self.latencia > self.orcamento and self.nivel_imgsz < len(self.imgsz_opcoes) - 1:
+            self.nivel_imgsz += 1
+        elif self.latencia < 0.5 * self.orcamento and self.nivel_imgsz > 0:
+            self.nivel_imgsz -= 1
+        if self.nivel_imgsz != nivel_anterior:
+            # A média antiga foi medida em outra resolução: recomeça com a próxima medida.
+            self.latencia = None
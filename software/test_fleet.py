@@ -0,0 +1,47 @@
+# --- Testes da Atribuição de Carrinhos da Frota ---
+#   python -m pytest software
+import numpy as np
+
+from fleet import FleetAssigner
+
+# Três faixas de 200 px num frame de 600 px de largura.
+CENTROS = np.array([[100, 240], [300, 240], [500, 240]], dtype=np.float32)
+
+
+def posicoes(*xs):
+    return np.array([[x, 240] for x in xs], dtype=np.float32)
+
+
+def test_cada_pessoa_recebe_o_carrinho_livre_mais_proximo():
+    atribuicao = FleetAssigner(3)
+    assert atribuicao.update([0, 1], posicoes(480, 90), CENTROS).tolist() == [2, 0]
+
+
+def test_atribuicao_estavel_quando_a_pessoa_muda_de_faixa():
+    atribuicao = FleetAssigner(3)
+    atribuicao.update([0, 1], posicoes(90, 300), CENTROS)
+    # As duas trocam de lado: cada uma continua com o seu carrinho.
+    assert atribuicao.update([0, 1], posicoes(300, 90), CENTROS).tolist() == [0, 1]
+
+
+def test_ids_mais_antigos_escolhem_primeiro_e_sem_carrinho_fica_de_fora():
+    atribuicao = FleetAssigner(1)
+    assert atribuicao.update([5, 3], posicoes(100, 500), CENTROS[:1]).tolist() == [-1, 0]
+
+
+def test_carrinho_e_liberado_quando_o_track_some():
+    atribuicao = FleetAssigner(2)
+    atribuicao.update([0, 1], posicoes(100, 300), CENTROS[:2])
+    atribuicao.update([1], posicoes(300), CENTROS[:2])
+    assert atribuicao.carro_de == {1: 1}
+    # O carrinho 0 ficou livre para quem entrar.
+    assert atribuicao.update([1, 2], posicoes(300, 500), CENTROS[:2]).tolist() == [1, 0]
+
+
+def test_track_perdido_mantem_o_carrinho_reservado():
+    atribuicao = FleetAssigner(2)
+    atribuicao.update([0, 1], posicoes(100, 300), CENTROS[:2])
+    # A pessoa 0 não foi encontrada nesta inferência e alguém novo entrou perto do carrinho dela.
+    assert atribuicao.update([1, 2], posicoes(300, 100), CENTROS[:2], perdidos=[0]).tolist() == [1, -1]
+    # Quando ela reaparece, volta para o mesmo carrinho.
+    assert atribuicao.update([0, 1, 2], posicoes(100, 300, 100), CENTROS[:2]).tolist() == [0, 1, -1]
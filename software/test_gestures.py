@@ -0,0 +1,104 @@
+# --- Testes do Motor de Gestos ---
+# Sequências sintéticas de keypoints a 25 fps, com o tempo de cada frame passado explicitamente (como no replay).
+#   python -m pytest software
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from gestures import NARIZ, OMBRO_DIR, OMBRO_ESQ, PULSO_DIR, PULSO_ESQ, GestureEngine
+
+DT = 1 / 25  # 25 fps
+# Ombros 80 px separados: as distâncias dos gestos são medidas nessa escala.
+NARIZ_Y = 200
+
+
+def pessoa(pulso_dir=(340, 350), pulso_esq=None):
+    kp = np.zeros((17, 2), dtype=np.float32)
+    kp[NARIZ] = (300, NARIZ_Y)
+    kp[OMBRO_ESQ] = (260, 260)
+    kp[OMBRO_DIR] = (340, 260)
+    kp[PULSO_DIR] = pulso_dir
+    if pulso_esq is not None:
+        kp[PULSO_ESQ] = pulso_esq
+    return kp
+
+
+# O GestureState de uma pessoa é o mesmo objeto em todos os frames: guarda uma cópia do estado de cada frame.
+def alimentar(motor, sequencia, t0=0.0):
+    estados = []
+    for i, kp in enumerate(sequencia):
+        estado = motor.update(0, kp, t0 + i * DT)
+        estados.append(SimpleNamespace(modo=estado.modo, parada=bool(estado.parada), swipe=estado.swipe,
+                                       volante=estado.volante))
+    return estados
+
+
+def test_parada_precisa_da_mao_levantada_pelo_tempo_minimo():
+    motor = GestureEngine(gestos=('parada',))
+    estados = alimentar(motor, [pessoa()] * 3 + [pessoa(pulso_dir=(340, 100))] * 13)
+    paradas = [estado.parada for estado in estados]
+    # A mão sobe no frame 3; a parada vale a partir de 0,3 s depois (frame 3 + 8).
+    assert not any(paradas[:11])
+    assert all(paradas[11:])
+
+
+def test_parada_termina_quando_a_mao_desce():
+    motor = GestureEngine(gestos=('parada',))
+    estados = alimentar(motor, [pessoa(pulso_dir=(340, 100))] * 10 + [pessoa()])
+    assert estados[-2].parada and not estados[-1].parada
+
+
+def test_mao_levantada_por_pouco_tempo_nao_para():
+    motor = GestureEngine(gestos=('parada',))
+    estados = alimentar(motor, ([pessoa(pulso_dir=(340, 100))] * 5 + [pessoa()]) * 3)
+    assert not any(estado.parada for estado in estados)
+
+
+def test_swipe_rapido_troca_de_modo():
+    motor = GestureEngine()
+    parado = [pessoa()] * 5
+    # 160 px (2 larguras de ombro) para a direita em 0,2 s.
+    swipe = [pessoa(pulso_dir=(340 + 32 * i, 350)) for i in range(1, 6)]
+    estados = alimentar(motor, parado + swipe)
+    assert [estado.swipe for estado in estados].count(1) == 1
+    assert estados[-1].modo == 'volante'
+
+
+def test_movimento_lento_nao_e_swipe():
+    motor = GestureEngine()
+    # Os mesmos 160 px, mas em 2 s: dentro da janela de 0,4 s a mão anda bem menos que 1,5 ombro.
+    lento = [pessoa(pulso_dir=(340 + 3.2 * i, 350)) for i in range(51)]
+    estados = alimentar(motor, lento)
+    assert not any(estado.swipe for estado in estados)
+    assert estados[-1].modo == 'anel'
+
+
+def test_swipe_nao_repete_dentro_do_intervalo():
+    motor = GestureEngine()
+    ida = [pessoa(pulso_dir=(340 + 32 * i, 350)) for i in range(6)]
+    volta = ida[::-1]
+    estados = alimentar(motor, ida + volta)
+    # A volta começa logo depois do primeiro swipe, antes de 'intervalo' (0,8 s) passar.
+    assert [estado.swipe for estado in estados if estado.swipe] == [1]
+
+
+def test_volante_reto_com_as_maos_na_altura_dos_ombros():
+    motor = GestureEngine(gestos=('volante',))
+    estados = alimentar(motor, [pessoa(pulso_dir=(340, 260), pulso_esq=(260, 260))] * 5)
+    assert estados[-1].volante == ('F', 9)
+
+
+def test_modos_derivados_dos_gestos():
+    assert GestureEngine().modos == ('anel', 'volante')
+    assert GestureEngine(gestos=('parada',)).modos == ('anel',)
+
+
+@pytest.mark.parametrize("opcoes", [
+    {'gestos': ('parada', 'swipe')},                         # swipe sem um segundo modo para trocar
+    {'gestos': ('parada',), 'modos': ('anel', 'volante')},  # modo volante sem o gesto volante
+    {'gestos': ('aceno',)},                                  # gesto desconhecido
+])
+def test_configuracoes_invalidas(opcoes):
+    with pytest.raises(ValueError):
+        GestureEngine(**opcoes)
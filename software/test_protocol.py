@@ -0,0 +1,127 @@
+# --- Testes do Protocolo Binário e do Transporte Serial ---
+# Rodam sem carrinho: o transporte conversa com a FakeSerialPort (pty), que só existe em Linux/macOS.
+#   python -m pytest software
+import os
+import time
+
+import pytest
+
+from protocol import (PWM_MAX, SYNC, TAMANHO_ACK, TAMANHO_COMANDO, TIPO_ACK, TIPO_COMANDO, CommandLink,
+                      FrameParser, ProtocolError, crc8, decode_frame, direcao_para_rodas, encode_ack,
+                      encode_command)
+
+transport = pytest.importorskip("transport")  # Precisa do pyserial.
+if not hasattr(os, 'openpty'):
+    pytest.skip("FakeSerialPort precisa de pty", allow_module_level=True)
+
+
+def _esperar(condicao, timeout=2.0):
+    limite = time.perf_counter() + timeout
+    while not condicao():
+        if time.perf_counter() > limite:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_crc8_valor_conhecido():
+    # CRC-8/SMBUS (polinômio 0x07, início 0) de "123456789".
+    assert crc8(b"123456789") == 0xF4
+
+
+@pytest.mark.parametrize("esquerda, direita", [(0, 0), (255, -255), (-1, 1), (120, 37)])
+def test_comando_ida_e_volta(esquerda, direita):
+    quadro = encode_command(200, esquerda, direita)
+    assert len(quadro) == TAMANHO_COMANDO and quadro[0] == SYNC
+    assert decode_frame(quadro) == (TIPO_COMANDO, 200, (esquerda, direita))
+
+
+def test_comando_limita_pwm_e_sequencia():
+    assert decode_frame(encode_command(256 + 3, 1000, -1000)) == (TIPO_COMANDO, 3, (PWM_MAX, -PWM_MAX))
+
+
+def test_ack_ida_e_volta():
+    quadro = encode_ack(42)
+    assert len(quadro) == TAMANHO_ACK
+    assert decode_frame(quadro) == (TIPO_ACK, 42, 0)
+
+
+def test_crc_errado_e_rejeitado():
+    quadro = bytearray(encode_command(1, 10, 20))
+    quadro[4] ^= 0x01
+    with pytest.raises(ProtocolError):
+        decode_frame(bytes(quadro))
+
+
+def test_parser_ressincroniza_depois_de_lixo():
+    parser = FrameParser()
+    ruim = bytearray(encode_command(5, 1, 1))
+    ruim[-1] ^= 0xFF
+    fluxo = (b"\x00\x13" + bytes((SYNC, 0x42)) + bytes(ruim) + encode_command(6, -100, 100)
+             + bytes((SYNC,)) + encode_ack(6))
+    quadros = parser.feed(fluxo)
+    assert quadros == [(TIPO_COMANDO, 6, (-100, 100)), (TIPO_ACK, 6, 0)]
+    assert parser.erros >= 2  # O SYNC com versão errada e o quadro com CRC errado.
+
+
+def test_parser_aceita_quadro_em_pedacos():
+    parser = FrameParser()
+    quadro = encode_command(9, 50, -50)
+    quadros = []
+    for byte in quadro:
+        quadros += parser.feed(bytes((byte,)))
+    assert quadros == [(TIPO_COMANDO, 9, (50, -50))]
+
+
+def test_direcao_para_rodas():
+    assert direcao_para_rodas('F', 9) == (255, 255)
+    assert direcao_para_rodas('B', 9) == (-255, -255)
+    assert direcao_para_rodas('L', 9) == (-255, 255)
+    assert direcao_para_rodas('R', 0) == (0, 0)
+    assert direcao_para_rodas('S', 5) == (0, 0)
+
+
+def test_command_link_recebe_acks_da_porta_falsa():
+    serial = pytest.importorskip("serial")
+    with transport.FakeSerialPort() as fake:
+        porta = serial.Serial(fake.port, timeout=0)
+        try:
+            link = CommandLink(porta)
+            for i in range(3):
+                link.send(10 * i, -10 * i)
+            assert _esperar(lambda: link.poll_acks() is not None and link.confirmados == 3)
+            assert link.pendentes == {} and link.ultimo_rtt is not None
+            assert [r[1:] for r in fake.recebidos] == [(0, 0, 0), (1, 10, -10), (2, 20, -20)]
+        finally:
+            porta.close()
+
+
+def test_transporte_coalesce_comandos_antes_da_escrita():
+    with transport.FakeSerialPort() as fake:
+        # Enquanto a conexão "estabiliza" (espera_conexao) nada é escrito: só o último comando deve sair.
+        transporte = transport.SerialTransport(fake.port, espera_conexao=0.2, intervalo_repeticao=10)
+        transporte.start()
+        for i in range(10):
+            transporte.send(i, -i)
+        assert _esperar(lambda: len(fake.recebidos) >= 1)
+        time.sleep(0.05)
+        transporte.close()
+        assert transporte.coalescidos == 9
+        # O último comando e a parada do close() (a porta falsa lê em outra thread).
+        assert _esperar(lambda: len(fake.recebidos) >= 2)
+        assert [r[2:] for r in fake.recebidos] == [(9, -9), (0, 0)]
+
+
+def test_transporte_para_de_repetir_sem_sinal_do_controle():
+    with transport.FakeSerialPort() as fake:
+        transporte = transport.SerialTransport(fake.port, espera_conexao=0, intervalo_repeticao=0.05,
+                                               validade_sinal=0.2)
+        transporte.start()
+        assert _esperar(lambda: transporte.conectado)
+        transporte.send(100, 100)
+        time.sleep(0.6)  # Nenhum keepalive(): as repetições param depois de validade_sinal.
+        recebidos = len(fake.recebidos)
+        time.sleep(0.3)
+        assert len(fake.recebidos) == recebidos
+        assert 1 <= transporte.repetidos <= 4
+        transporte.close()
@@ -0,0 +1,84 @@
+# --- Testes da Gravação e do Replay de Sessões ---
+#   python -m pytest software
+import json
+import os
+
+import numpy as np
+
+from recorder import ENTRADA, SAIDA, ReplayCapture, SessionLog, SessionRecorder
+
+FORMATO = (48, 64, 3)
+
+
+def _gravar(diretorio, n, salvar_frames):
+    # Segmentos pequenos para a sessão ocupar vários arquivos (3 frames de 48x64 por segmento de frames).
+    gravador = SessionRecorder(diretorio, salvar_frames=salvar_frames, tamanho_segmento=4,
+                               bytes_segmento_frames=3 * int(np.prod(FORMATO)))
+    for i in range(n):
+        frame = np.full(FORMATO, i, dtype=np.uint8)
+        keypoints = np.full((17, 2), i, dtype=np.float32) if i % 3 else None
+        gravador.record_frame(frame, keypoints, 'F' if i % 2 else 'S', i % 10)
+    gravador.record_serial(bytes(range(40)), SAIDA)
+    gravador.record_serial(b'\xa5\x12\x01\x00\x00', ENTRADA)
+    return gravador
+
+
+def test_gravacao_e_leitura_ida_e_volta(tmp_path):
+    diretorio = str(tmp_path / 'sessao')
+    _gravar(diretorio, 10, salvar_frames=True).close()
+
+    log = SessionLog(diretorio)
+    assert len(log) == 10
+    assert log.meta['formato_frame'] == list(FORMATO)
+    assert log.meta['total_frames'] == 10 and log.meta['total_serial'] == 3
+    assert len(os.listdir(diretorio)) > 4  # Vários segmentos de cada sequência.
+    assert log.command_strings() == [f"{'F' if i % 2 else 'S'}{i % 10}" for i in range(10)]
+    for i in range(10):
+        assert log.frames[i][0, 0, 0] == i
+        assert bool(log.comandos[i]['tem_pessoa']) == bool(i % 3)
+        if i % 3:
+            assert np.all(log.keypoints[i] == i)
+
+    serial = log.serial.todos()
+    assert serial['tamanho'].tolist() == [32, 8, 5]
+    assert serial['sentido'].tolist() == [SAIDA, SAIDA, ENTRADA]
+    assert b''.join(d[:n] for d, n in zip(serial['dados'][:2], serial['tamanho'][:2])) == bytes(range(40))
+
+
+def test_replay_devolve_frames_e_keypoints_gravados(tmp_path):
+    diretorio = str(tmp_path / 'sessao')
+    _gravar(diretorio, 6, salvar_frames=True).close()
+
+    replay = ReplayCapture(diretorio)
+    assert not replay.usar_keypoints  # Com imagens, o modelo roda de novo sobre elas.
+    lidos = []
+    while True:
+        ok, frame = replay.read()
+        if not ok:
+            break
+        lidos.append((int(frame[0, 0, 0]), replay.keypoints is not None))
+    assert lidos == [(i, bool(i % 3)) for i in range(6)]
+
+
+def test_sessao_sem_frames_usa_os_keypoints(tmp_path):
+    diretorio = str(tmp_path / 'sessao')
+    _gravar(diretorio, 5, salvar_frames=False).close()
+
+    replay = ReplayCapture(diretorio)
+    assert replay.usar_keypoints
+    ok, frame = replay.read()
+    assert ok and frame.shape == FORMATO and not frame.any()
+
+
+def test_sessao_interrompida_continua_legivel(tmp_path):
+    diretorio = str(tmp_path / 'sessao')
+    gravador = _gravar(diretorio, 10, salvar_frames=True)
+    # Sem close(): espera a thread de escrita salvar os segmentos que já estavam prontos.
+    gravador._escritor.close()
+
+    with open(os.path.join(diretorio, 'meta.json')) as arquivo:
+        assert json.load(arquivo)['total_frames'] == 8
+    log = SessionLog(diretorio)
+    # Comandos e keypoints foram salvos até o frame 8, os frames até o 9: só os frames completos contam.
+    assert len(log) == 8
+    assert log.frames[7][0, 0, 0] == 7
@@ -0,0 +1,77 @@
+# --- Testes do Agendador Adaptativo e da ROI ---
+#   python -m pytest software
+import numpy as np
+
+from scheduler import AdaptiveScheduler
+from tracker import PoseTracker
+from yolo_visaocomp_control_ard import PoseEstimation
+
+FRAME = (480, 640, 3)
+
+
+def test_roi_em_volta_da_caixa_com_margem():
+    scheduler = AdaptiveScheduler(padding=0.25)
+    scheduler.update(0.01, (100, 100, 200, 300))
+    assert scheduler.roi(FRAME) == (75, 50, 225, 350)
+
+
+def test_roi_volta_ao_frame_inteiro_quando_a_pessoa_some():
+    scheduler = AdaptiveScheduler()
+    scheduler.update(0.01, (100, 100, 200, 300))
+    scheduler.update(0.01, None)
+    assert scheduler.roi(FRAME) == (0, 0, 640, 480)
+
+
+def test_roi_desligada_usa_o_frame_inteiro():
+    scheduler = AdaptiveScheduler(usar_roi=False)
+    scheduler.update(0.01, (100, 100, 200, 300))
+    assert scheduler.roi(FRAME) == (0, 0, 640, 480)
+
+
+def test_pula_frames_e_reduz_imgsz_quando_a_inferencia_e_lenta():
+    scheduler = AdaptiveScheduler(fps_alvo=25)
+    scheduler.update(0.1)  # 100 ms com um orçamento de 40 ms por frame.
+    assert scheduler.skip_factor == 3
+    assert scheduler.imgsz == 512
+    assert [scheduler.should_infer() for _ in range(6)] == [True, False, False, True, False, False]
+
+
+class _BackendFalso:
+    # Devolve a próxima resposta da lista a cada inferência e guarda o tamanho de cada recorte recebido.
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.recortes = []
+
+    def infer(self, frame, imgsz):
+        self.recortes.append(frame.shape[:2])
+        return self.respostas.pop(0)
+
+
+def _controle(backend):
+    # Só as partes do PoseEstimation usadas por detectar_pose, sem câmera, serial nem modelo.
+    controle = object.__new__(PoseEstimation)
+    controle.replay = None
+    controle.espelhar_imagem = True
+    controle.scheduler = AdaptiveScheduler(fps_alvo=25)
+    controle.tracker = PoseTracker()
+    controle.backend = backend
+    return controle
+
+
+def test_pessoa_perdida_nao_dirige_e_a_roi_volta_ao_frame_inteiro():
+    kp = np.stack([np.linspace(110, 190, 17), np.linspace(110, 290, 17)], axis=1).astype(np.float32)
+    caixa = np.array([[100, 100, 200, 300]], dtype=np.float32)
+    nenhuma = (np.zeros((0, 17, 2), np.float32), np.zeros((0, 4), np.float32))
+    backend = _BackendFalso([(kp[None].copy(), caixa.copy()), nenhuma, nenhuma])
+    controle = _controle(backend)
+    frame = np.zeros(FRAME, dtype=np.uint8)
+
+    assert controle.detectar_pose(frame) is not None
+    # Perdida: o track ainda existe (para recuperar o ID), mas não gera keypoints nem recorte.
+    assert controle.detectar_pose(frame) is None
+    assert controle.tracker.principal() is not None
+    assert controle.scheduler.ultima_caixa is None
+    controle.detectar_pose(frame)
+    assert backend.recortes[0] == FRAME[:2]
+    assert backend.recortes[1] != FRAME[:2]  # Recorte em volta da pessoa.
+    assert backend.recortes[2] == FRAME[:2]  # De volta ao frame inteiro.
@@ -0,0 +1,68 @@
+# --- Testes do Rastreador de Keypoints ---
+#   python -m pytest software
+import numpy as np
+
+from tracker import PoseTracker, iou_matrix
+
+
+def pessoa(x0, y0=100, largura=100, altura=200):
+    # Keypoints espalhados dentro da caixa (x0, y0, x0 + largura, y0 + altura).
+    kp = np.stack([np.linspace(x0 + 10, x0 + largura - 10, 17),
+                   np.linspace(y0 + 10, y0 + altura - 10, 17)], axis=1).astype(np.float32)
+    return kp, np.array([x0, y0, x0 + largura, y0 + altura], dtype=np.float32)
+
+
+def detectar(*pessoas):
+    if not pessoas:
+        return np.zeros((0, 17, 2), np.float32), np.zeros((0, 4), np.float32)
+    keypoints, caixas = zip(*pessoas)
+    return np.stack(keypoints), np.stack(caixas)
+
+
+def test_iou_matrix():
+    iou = iou_matrix([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    assert np.allclose(iou, [[1.0, 1 / 3, 0.0]])
+
+
+def test_id_se_mantem_quando_outra_pessoa_entra():
+    tracker = PoseTracker()
+    tracker.update(*detectar(pessoa(100)), t=0.0)
+    controle = tracker.principal().id
+
+    # A segunda pessoa vem primeiro na lista do modelo (mais confiança), e a primeira andou um pouco.
+    for i in range(1, 6):
+        tracker.update(*detectar(pessoa(400), pessoa(100 + 5 * i)), t=i * 0.04)
+        assert len(tracker.tracks) == 2
+        assert tracker.principal().id == controle
+
+    por_id = {trk.id: trk for trk in tracker.tracks}
+    assert por_id[controle].caixa[0] == 125
+    assert {trk.id for trk in tracker.tracks} == {controle, controle + 1}
+
+
+def test_track_perdido_sobrevive_max_perdidos_inferencias():
+    tracker = PoseTracker(max_perdidos=2)
+    tracker.update(*detectar(pessoa(100)), t=0.0)
+    for i in range(1, 3):
+        tracker.update(*detectar(), t=i * 0.04)
+        assert tracker.principal().perdidos == i
+    tracker.update(*detectar(), t=0.12)
+    assert tracker.principal() is None
+
+
+def test_pessoa_que_volta_recupera_o_id():
+    tracker = PoseTracker()
+    tracker.update(*detectar(pessoa(100)), t=0.0)
+    tracker.update(*detectar(), t=0.04)
+    tracker.update(*detectar(pessoa(102)), t=0.08)
+    principal = tracker.principal()
+    assert principal.id == 0 and principal.perdidos == 0
+
+
+def test_predict_segue_a_velocidade():
+    tracker = PoseTracker(min_cutoff=100.0)  # Quase sem suavização: a velocidade estimada é a medida.
+    tracker.update(*detectar(pessoa(100)), t=0.0)
+    tracker.update(*detectar(pessoa(110)), t=0.1)
+    x_antes = tracker.principal().keypoints[0, 0]
+    tracker.predict(0.2)
+    assert tracker.principal().keypoints[0, 0] > x_antes
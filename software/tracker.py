@@ -0,0 +1,199 @@
+# --- Rastreamento de Keypoints Entre Inferências ---
+# Com o agendador (scheduler.py) o YOLO não roda em todo frame, e antes cada inferência recomeçava do zero
+# pegando a primeira pessoa da lista. Este módulo mantém um "track" por pessoa:
+#   - Um filtro One-Euro por keypoint suaviza o ruído sem atrasar movimentos rápidos e estima a velocidade.
+#   - As detecções são associadas aos tracks existentes pela sobreposição das caixas (IoU),
+#     então cada pessoa mantém o mesmo ID de um frame para o outro.
+#   - Nos frames sem inferência os keypoints são previstos, por velocidade constante ou
+#     (opcional) por fluxo óptico Lucas-Kanade no pulso e nos ombros.
+# Assim o comando é atualizado em todo frame e não fica trocando quando outra pessoa entra na imagem.
+import math
+
+import numpy as np
+import cv2
+
+
+class OneEuroFilter:
+    # Filtro One-Euro (Casiez et al., 2012) aplicado de uma vez a um array de pontos (ex: (17, 2)).
+    # min_cutoff: suavização com o ponto parado (menor = mais suave).
+    # beta: quanto a suavização diminui com a velocidade (maior = menos atraso em movimentos rápidos).
+    # Pontos não detectados (coordenadas <= 0, convenção do YOLO) saem como (0, 0) e reiniciam o filtro.
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.x_anterior = None
+        self.dx_anterior = None
+        self.t_anterior = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        x = np.asarray(x, dtype=np.float32)
+        detectados = np.all(x > 0, axis=-1)
+
+        if self.x_anterior is None:
+            self.x_anterior = np.where(detectados[..., None], x, 0).astype(np.float32)
+            self.dx_anterior = np.zeros_like(x)
+            self.t_anterior = t
+            return self.x_anterior.copy()
+
+        dt = max(t - self.t_anterior, 1e-3)
+        ja_tinha = np.all(self.x_anterior > 0, axis=-1)
+        continuos = detectados & ja_tinha
+
+        # Derivada filtrada com corte fixo; ela define o corte do filtro da posição.
+        dx = (x - self.x_anterior) / dt
+        dx_filtrado = self.dx_anterior + self._alpha(self.d_cutoff, dt) * (dx - self.dx_anterior)
+        cutoff = self.min_cutoff + self.beta * np.linalg.norm(dx_filtrado, axis=-1)
+        alpha = self._alpha(cutoff, dt)[..., None]
+        x_filtrado = self.x_anterior + alpha * (x - self.x_anterior)
+
+        # Ponto que acabou de aparecer começa na medida; ponto perdido volta a (0, 0).
+        x_filtrado = np.where(continuos[..., None], x_filtrado, np.where(detectados[..., None], x, 0))
+        dx_filtrado = np.where(continuos[..., None], dx_filtrado, 0)
+
+        self.x_anterior = x_filtrado.astype(np.float32)
+        self.dx_anterior = dx_filtrado.astype(np.float32)
+        self.t_anterior = t
+        return self.x_anterior.copy()
+
+    # Velocidade estimada de cada ponto (pixels por segundo).
+    @property
+    def velocidade(self):
+        return self.dx_anterior
+
+
+# IoU entre cada caixa de 'a' (A, 4) e cada caixa de 'b' (B, 4), no formato (x0, y0, x1, y1). Retorna (A, B).
+def iou_matrix(a, b):
+    a = np.asarray(a, dtype=np.float32)[:, None, :]
+    b = np.asarray(b, dtype=np.float32)[None, :, :]
+    largura = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    altura = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersecao = largura * altura
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersecao / np.maximum(area_a + area_b - intersecao, 1e-6)
+
+
+class Track:
+    # Uma pessoa acompanhada ao longo do tempo.
+    def __init__(self, track_id, keypoints, caixa, t, filtro):
+        self.id = track_id
+        self.filtro = filtro
+        self.keypoints = filtro(keypoints, t)
+        self.caixa = np.asarray(caixa, dtype=np.float32)
+        self.t = t
+        self.perdidos = 0  # Inferências seguidas em que a pessoa não foi encontrada.
+
+    def corrigir(self, keypoints, caixa, t):
+        self.keypoints = self.filtro(keypoints, t)
+        self.caixa = np.asarray(caixa, dtype=np.float32)
+        self.t = t
+        self.perdidos = 0
+
+    # Move os pontos detectados pelo deslocamento (17, 2), mantendo (0, 0) nos não detectados.
+    # A caixa acompanha o deslocamento médio dos pontos.
+    def deslocar(self, deslocamento, t):
+        detectados = np.all(self.keypoints > 0, axis=-1)
+        self.keypoints = np.where(detectados[..., None], self.keypoints + deslocamento, 0).astype(np.float32)
+        if np.any(detectados):
+            self.caixa = self.caixa + np.tile(deslocamento[detectados].mean(axis=0), 2)
+        self.t = t
+
+
+class PoseTracker:
+    # max_perdidos: por quantas inferências um track sem detecção continua existindo (sendo previsto).
+    # iou_min: sobreposição mínima para considerar que uma detecção é a mesma pessoa de um track.
+    # usar_fluxo: prevê os pontos de 'pontos_fluxo' com fluxo óptico em vez de só velocidade constante.
+    # pontos_fluxo: índices COCO seguidos pelo fluxo óptico (ombros 5 e 6, pulso 9).
+    def __init__(self, max_perdidos=3, iou_min=0.3, usar_fluxo=False, pontos_fluxo=(5, 6, 9),
+                 min_cutoff=1.0, beta=0.05):
+        self.max_perdidos = max_perdidos
+        self.iou_min = iou_min
+        self.usar_fluxo = usar_fluxo
+        self.pontos_fluxo = np.array(pontos_fluxo)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.tracks = []
+        self._proximo_id = 0
+        self._cinza_anterior = None
+
+    def _novo_filtro(self):
+        return OneEuroFilter(min_cutoff=self.min_cutoff, beta=self.beta)
+
+    def _guardar_frame(self, frame):
+        if self.usar_fluxo and frame is not None:
+            self._cinza_anterior = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # Corrige os tracks com uma nova inferência.
+    # keypoints: (P, 17, 2) de todas as pessoas detectadas; caixas: (P, 4). P pode ser 0.
+    def update(self, keypoints, caixas, t, frame=None):
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, 17, 2)
+        caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4)
+
+        livres_det = set(range(len(caixas)))
+        livres_trk = set(range(len(self.tracks)))
+        if self.tracks and len(caixas):
+            # Associação gulosa: os pares com maior IoU são casados primeiro.
+            iou = iou_matrix(np.stack([trk.caixa for trk in self.tracks]), caixas)
+            for indice in np.argsort(iou, axis=None)[::-1]:
+                i_trk, i_det = np.unravel_index(indice, iou.shape)
+                if iou[i_trk, i_det] < self.iou_min:
+                    break
+                if i_trk in livres_trk and i_det in livres_det:
+                    self.tracks[i_trk].corrigir(keypoints[i_det], caixas[i_det], t)
+                    livres_trk.discard(i_trk)
+                    livres_det.discard(i_det)
+
+        for i_trk in livres_trk:
+            self.tracks[i_trk].perdidos += 1
+        self.tracks = [trk for trk in self.tracks if trk.perdidos <= self.max_perdidos]
+
+        for i_det in sorted(livres_det):
+            self.tracks.append(Track(self._proximo_id, keypoints[i_det], caixas[i_det], t, self._novo_filtro()))
+            self._proximo_id += 1
+
+        self._guardar_frame(frame)
+        return self.tracks
+
+    # Prevê a posição de todos os tracks num frame em que o YOLO não rodou.
+    def predict(self, t, frame=None):
+        cinza = None
+        if self.usar_fluxo and frame is not None and self._cinza_anterior is not None:
+            cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        for trk in self.tracks:
+            dt = t - trk.t
+            # Velocidade constante, estimada pelo filtro One-Euro.
+            deslocamento = trk.filtro.velocidade * dt
+
+            if cinza is not None:
+                pontos = trk.keypoints[self.pontos_fluxo]
+                validos = np.all(pontos > 0, axis=-1)
+                if np.any(validos):
+                    origem = pontos[validos].reshape(-1, 1, 2).astype(np.float32)
+                    destino, status, _ = cv2.calcOpticalFlowPyrLK(self._cinza_anterior, cinza, origem, None,
+                                                                  winSize=(21, 21), maxLevel=2)
+                    ok = status.reshape(-1) == 1
+                    if np.any(ok):
+                        fluxo = (destino - origem).reshape(-1, 2)
+                        # Os pontos seguidos usam o próprio fluxo; o resto do corpo segue o fluxo médio.
+                        deslocamento = np.broadcast_to(fluxo[ok].mean(axis=0), trk.keypoints.shape).copy()
+                        indices = self.pontos_fluxo[validos][ok]
+                        deslocamento[indices] = fluxo[ok]
+
+            trk.deslocar(deslocamento, t)
+
+        if cinza is not None:
+            self._cinza_anterior = cinza
+        else:
+            self._guardar_frame(frame)
+        return self.tracks
+
+    # Track que controla o carrinho: o mais antigo ainda ativo, então quem entra depois na imagem não "rouba" o controle.
+    def principal(self):
+        return min(self.tracks, key=lambda trk: trk.id) if self.tracks else None
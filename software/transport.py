@@ -0,0 +1,224 @@
+# --- Transporte Serial Compartilhado ---
+# Os scripts repetiam a mesma configuração: porta 'COM7' fixa, time.sleep(2) bloqueante, arduino.write()
+# síncrono dentro do loop e nenhuma reconexão. Quando o Bluetooth caía, o joystick_control.py quebrava
+# e o script do YOLO continuava sem carrinho.
+# Aqui uma thread em segundo plano cuida de tudo isso:
+#   - send() não bloqueia: só guarda o comando. Se vários chegarem antes da escrita, só o mais novo vai.
+#   - Sem porta definida, procura automaticamente a porta do carrinho.
+#   - Se a conexão cair, tenta reconectar com espera crescente (backoff).
+#   - Sem comandos novos, repete o último a cada 'intervalo_repeticao': o firmware para o carrinho
+#     quando fica sem receber nada (watchdog), então um comando constante precisa ser renovado.
+#     A repetição só continua enquanto o controle dá sinal de vida (send() ou keepalive() a cada frame):
+#     se o loop de controle travar, as repetições param e o watchdog do firmware para o carrinho.
+# FakeSerialPort cria um pseudo-terminal (pty) que se comporta como o carrinho, para testar sem hardware.
+import os
+import select
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from protocol import BAUD_PADRAO, TIPO_COMANDO, CommandLink, FrameParser, direcao_para_rodas, encode_ack
+
+
+# Palavras que costumam aparecer na descrição da porta do carrinho (Bluetooth SPP, HC-05, Arduino, conversores USB).
+PALAVRAS_PORTA = ('hc-05', 'hc-06', 'bluetooth', 'arduino', 'ch340', 'usb serial', 'usb-serial')
+
+
+# Procura a porta do carrinho entre as portas seriais do sistema. Retorna o nome (ex: 'COM7') ou None.
+def find_port(palavras=PALAVRAS_PORTA):
+    for info in serial.tools.list_ports.comports():
+        texto = f"{info.description} {info.manufacturer or ''} {info.hwid}".lower()
+        if any(palavra in texto for palavra in palavras):
+            return info.device
+    return None
+
+
+class SerialTransport(threading.Thread):
+    # porta: nome da porta (ex: 'COM7'); None procura automaticamente com find_port().
+    # espera_conexao: pausa depois de abrir a porta (o Arduino reinicia ao conectar), feita fora do loop principal.
+    # backoff_inicial / backoff_max: espera entre tentativas de reconexão, dobrando a cada falha.
+    # gravador: recorder.SessionRecorder opcional que registra o tráfego serial.
+    # metricas: metrics.LatencyMonitor opcional que recebe o tempo de escrita e a latência ponta a ponta.
+    # intervalo_repeticao: segundos sem escrita até repetir o último comando (menor que o watchdog do firmware, 0.5 s).
+    # validade_sinal: segundos depois do último send()/keepalive() em que as repetições ainda acontecem.
+    def __init__(self, porta=None, baud=BAUD_PADRAO, espera_conexao=2.0, backoff_inicial=0.5, backoff_max=8.0,
+                 gravador=None, metricas=None, intervalo_repeticao=0.2, validade_sinal=0.35):
+        super().__init__(name="serial", daemon=True)
+        self.porta = porta
+        self.baud = baud
+        self.espera_conexao = espera_conexao
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.gravador = gravador
+        self.metricas = metricas
+        self.intervalo_repeticao = intervalo_repeticao
+        self.validade_sinal = validade_sinal
+
+        self.serial = None
+        self.link = None
+        self.coalescidos = 0  # Comandos substituídos por um mais novo antes de serem escritos.
+        self._cond = threading.Condition()
+        self._pendente = None
+        self._fechando = False
+        self._ultimas_rodas = None  # Último (esquerda, direita) escrito, para as repetições.
+        self._ultima_escrita = 0.0
+        self._ultimo_sinal = 0.0  # Último send() ou keepalive() do controle.
+        self.repetidos = 0  # Comandos repetidos por falta de comandos novos.
+
+    @property
+    def conectado(self):
+        return self.serial is not None
+
+    # Agenda (esquerda, direita) para envio e retorna na hora. Só o comando pendente mais novo é escrito.
+    # 'instante' (time.perf_counter() da origem do comando, ex: leitura do frame) mede a latência até a escrita.
+    def send(self, esquerda, direita, instante=None):
+        with self._cond:
+            self._ultimo_sinal = time.perf_counter()
+            if self._pendente is not None:
+                self.coalescidos += 1
+            self._pendente = (esquerda, direita, instante)
+            self._cond.notify()
+
+    def send_direction(self, direcao, velocidade, instante=None):
+        self.send(*direcao_para_rodas(direcao, velocidade), instante=instante)
+
+    # Avisa que o controle continua rodando e que o último comando ainda vale (ex: um frame com o mesmo comando).
+    def keepalive(self):
+        self._ultimo_sinal = time.perf_counter()
+
+    # Envia o comando de parada, espera ele sair e fecha a porta.
+    def close(self, timeout=2.0):
+        with self._cond:
+            self._pendente = (0, 0, None)
+            self._fechando = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+        self._desconectar()
+
+    def _conectar(self):
+        porta = self.porta or find_port()
+        if porta is None:
+            return False
+        try:
+            conexao = serial.Serial(porta, self.baud, timeout=0, write_timeout=1)
+        except serial.SerialException as e:
+            print(f"Erro ao conectar na porta {porta}: {e}")
+            return False
+        print(f"Conectado ao Arduino na porta {porta}")
+        time.sleep(self.espera_conexao)  # Estabiliza a conexão serial (só esta thread espera).
+        self.serial = conexao
+        self.link = CommandLink(conexao, gravador=self.gravador)
+        return True
+
+    def _desconectar(self):
+        conexao, self.serial = self.serial, None
+        if conexao is not None:
+            try:
+                conexao.close()
+            except (serial.SerialException, OSError):
+                pass
+
+    def run(self):
+        espera = self.backoff_inicial
+        while True:
+            if self.serial is None:
+                if self._conectar():
+                    espera = self.backoff_inicial
+                    continue
+                # Sem carrinho: espera (ou sai, se estiver fechando) e tenta de novo com espera maior.
+                with self._cond:
+                    if self._cond.wait_for(lambda: self._fechando, espera):
+                        return
+                espera = min(espera * 2, self.backoff_max)
+                continue
+
+            with self._cond:
+                # O timeout curto garante que os acks sejam lidos mesmo sem comandos novos.
+                self._cond.wait_for(lambda: self._pendente is not None or self._fechando, 0.01)
+                comando, self._pendente = self._pendente, None
+
+            repeticao = False
+            agora = time.perf_counter()
+            if comando is None and self._ultimas_rodas is not None and not self._fechando and \
+                    agora - self._ultima_escrita >= self.intervalo_repeticao and \
+                    agora - self._ultimo_sinal <= self.validade_sinal:
+                comando = (*self._ultimas_rodas, None)
+                repeticao = True
+
+            try:
+                if comando is not None:
+                    esquerda, direita, instante = comando
+                    inicio = time.perf_counter()
+                    self.link.send(esquerda, direita, instante)
+                    self._ultimas_rodas = (esquerda, direita)
+                    self._ultima_escrita = time.perf_counter()
+                    if self._fechando:
+                        self.serial.flush()  # Garante que a parada final saiu antes de fechar a porta.
+                    if repeticao:
+                        self.repetidos += 1
+                    elif self.metricas is not None:
+                        self.metricas.toc('escrita_serial', inicio)
+                        if instante is not None:
+                            self.metricas.toc('ponta_a_ponta', instante)
+                self.link.poll_acks()
+            except (serial.SerialException, OSError) as e:
+                print(f"Conexão com o carrinho perdida: {e}. Tentando reconectar...")
+                self._desconectar()
+                with self._cond:
+                    # O comando que falhou volta para a fila, a não ser que já exista um mais novo.
+                    if self._pendente is None and not repeticao:
+                        self._pendente = comando
+                continue
+
+            with self._cond:
+                if self._fechando and self._pendente is None:
+                    return
+
+
+class FakeSerialPort:
+    # Pseudo-terminal que imita o carrinho: abra 'port' com serial.Serial (ou SerialTransport)
+    # e cada quadro de comando recebido é guardado em 'recebidos' e, com auto_ack, confirmado.
+    # Só funciona em sistemas com pty (Linux/macOS).
+    def __init__(self, auto_ack=True):
+        import tty  # Só existe em sistemas POSIX; importado aqui para o módulo continuar funcionando no Windows.
+
+        self._mestre, self._escravo = os.openpty()
+        tty.setraw(self._escravo)  # Sem tradução de '\n' nem eco: os bytes passam exatamente como enviados.
+        self.port = os.ttyname(self._escravo)
+        self.auto_ack = auto_ack
+        self.parser = FrameParser()
+        self.recebidos = []  # (instante, seq, esquerda, direita)
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._ler, name="porta-falsa", daemon=True)
+        self._thread.start()
+
+    def _ler(self):
+        while not self._parar.is_set():
+            prontos, _, _ = select.select([self._mestre], [], [], 0.05)
+            if not prontos:
+                continue
+            try:
+                dados = os.read(self._mestre, 4096)
+            except OSError:
+                break
+            for tipo, seq, rodas in self.parser.feed(dados):
+                if tipo != TIPO_COMANDO:
+                    continue
+                self.recebidos.append((time.perf_counter(), seq, *rodas))
+                if self.auto_ack:
+                    os.write(self._mestre, encode_ack(seq))
+
+    def close(self):
+        self._parar.set()
+        self._thread.join(timeout=1)
+        os.close(self._mestre)
+        os.close(self._escravo)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,8 +1,10 @@
-from ultralytics import YOLO
 import cv2
-import matplotlib.pyplot as plt
 import numpy as np
 import time
+from scheduler import AdaptiveScheduler
+from backends import load_backend
+from capture import Capture
+from display import Display, StaticOverlay
 
 # Carregando o modelo
 
@@ -18,14 +20,27 @@ def compute_angle(start, middle, end):
     return angle_deg
 
 class PoseEstimation:
-    def __init__(self, video_name):
-        self.model = YOLO("yolo11n-pose.pt") #carrega o modelo
+    def __init__(self, video_name, headless=False, backend='auto'):
         self.active_keypoints = range(17) #[11,13,15]
         self.video_path = video_name
         self.scale = 1.0
         current_fps = 24
-        desired_fps = 10
-        self.skip_factor = current_fps // desired_fps
+        # o skip_factor agora e calculado pela latencia medida do modelo (antes era current_fps // desired_fps fixo)
+        self.scheduler = AdaptiveScheduler(fps_alvo=current_fps, usar_roi=False)
+        # carrega o modelo (ONNX/OpenVINO em cache quando instalados, senao Ultralytics) e ja aquece
+        # em todos os imgsz do agendador, antes da camera abrir
+        self.model = load_backend(backend, imgsz_opcoes=self.scheduler.imgsz_opcoes)
+        # headless: so roda a inferencia, sem desenhar nem abrir janela
+        self.headless = headless
+
+    # desenha o joystick uma vez; o StaticOverlay so copia o resultado em cada frame
+    @staticmethod
+    def draw_joy(camada, width, height):
+        color = (255,255,0)
+        center_x = 150
+        center_y = 150
+        radius = 150
+        cv2.circle(camada, (center_x, center_y), radius, color,2)
 
     def analyze_pose(self, show_angle=False):
         frame_count = 0
@@ -34,78 +49,83 @@ class PoseEstimation:
 
         window_name = "KeyPoints on Video"
 
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        cam = cv2.VideoCapture(0)
+        # a janela so e redimensionada quando o tamanho do frame muda
+        display = None if self.headless else Display(window_name, self.scale)
+        joy = StaticOverlay(self.draw_joy)
+        cam = Capture(0)
+        # pessoas da ultima inferencia: nos frames pulados pelo agendador o esqueleto continua sendo
+        # desenhado com elas, senao ele pisca com skip_factor > 1
+        pessoas = ()
         while cam.isOpened():
             ret, frame = cam.read()
             if not ret:
                 break
-            #frame_count +=1
-            #if frame_count % self.skip_factor != 0:
-            #    continue
-            height, width, _ = frame.shape
-            window_width = int(frame.shape[1] * self.scale)
-            window_height = int(frame.shape[1] * self.scale)
-            cv2.resizeWindow(window_name, window_width, window_height)
-
-            results = self.model(frame)
-            keypoints = results[0].keypoints.xy.cpu().numpy()[0]
-
-            #for i in range(len(self.active_keypoints)-1):
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[4]].astype(int)), color, 2)
-            
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[4]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[2]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[2]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[0]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[0]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[1]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[1]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[3]].astype(int)), color, 2)
-            
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[10]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[8]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[8]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[6]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[5]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[5]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[7]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[7]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[9]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[12]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[5]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[12]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[13]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[13]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[15]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[12]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[14]].astype(int)), color, 2)
-            cv2.line(frame, tuple(keypoints[self.active_keypoints[14]].astype(int)),
-                            tuple(keypoints[self.active_keypoints[16]].astype(int)), color, 2)
+            # frames pulados pelo agendador (ou sem ninguem) tambem sao exibidos: assim a janela
+            # continua respondendo e o 'q' funciona
+            if self.scheduler.should_infer():
+                inicio = time.perf_counter()
+                pessoas, _ = self.model.infer(frame, self.scheduler.imgsz)
+                self.scheduler.update(time.perf_counter() - inicio)
+            if self.headless:
+                cam.recycle(frame)
+                continue
+            if len(pessoas) > 0:
+                self.draw_skeleton(frame, pessoas[0], color)
             # draw joy
-            center_x = 150
-            center_y = 150
-            radius = 150
-            cv2.circle(frame, (center_x, center_y), radius, color,2)
+            joy.apply(frame)
             ##########
 
-
-            #self.draw_joy(frame)
-            frame = cv2.flip(frame, 1)
-            cv2.imshow(window_name, frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            frame = cv2.flip(frame, 1, dst=frame)
+            continuar = display.show(frame)
+            cam.recycle(frame)  # o buffer volta para a captura
+            if not continuar:
                 break
         cam.release()
-        cv2.destroyAllWindows()
-
-def run_analyze_pose(show_angle):
-    pe = PoseEstimation('bmu.mp4')
+        if display is not None:
+            display.close()
+
+    def draw_skeleton(self, frame, keypoints, color):
+        # desenha os ossos da pessoa (antes ficava no meio do loop)
+        #for i in range(len(self.active_keypoints)-1):
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[4]].astype(int)), color, 2)
+        
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[4]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[2]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[2]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[0]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[0]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[1]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[1]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[3]].astype(int)), color, 2)
+        
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[10]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[8]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[8]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[6]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[5]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[5]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[7]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[7]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[9]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[6]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[12]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[5]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[12]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[11]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[13]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[13]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[15]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[12]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[14]].astype(int)), color, 2)
+        cv2.line(frame, tuple(keypoints[self.active_keypoints[14]].astype(int)),
+                        tuple(keypoints[self.active_keypoints[16]].astype(int)), color, 2)
+
+def run_analyze_pose(show_angle, headless=False):
+    pe = PoseEstimation('bmu.mp4', headless=headless)
     pe.analyze_pose(show_angle=show_angle)
 
 if __name__ == '__main__':
@@ -1,10 +1,21 @@
 # --- Importação das Bibliotecas Necessárias ---
-from ultralytics import YOLO  # A biblioteca principal para rodar o modelo de IA.
 import cv2                    # OpenCV, para captura de câmera, desenho de formas e exibição de vídeo.
 import numpy as np            # Numpy, para operações numéricas (usado pelo YOLO e OpenCV).
 import math                   # Biblioteca de matemática, para cálculos trigonométricos e geométricos.
-import serial                 # PySerial, para a comunicação via porta serial com o Arduino/Bluetooth.
 import time                   # Biblioteca de tempo, para adicionar pequenas pausas (delays).
+import argparse               # Para ler as opções da linha de comando (ex: --pipeline).
+
+from pipeline import PosePipeline  # Threads de captura, inferência e envio (modo --pipeline).
+from pose_mapper import PoseCommandMapper  # Lógica vetorizada do joystick em anel e desenho do esqueleto.
+from scheduler import AdaptiveScheduler  # Pulo de frames, ROI e imgsz ajustados pela latência medida.
+from tracker import PoseTracker  # IDs estáveis por pessoa e previsão dos keypoints entre inferências.
+from transport import SerialTransport  # Conexão serial em segundo plano, com reconexão e envio sem bloqueio.
+from recorder import ReplayCapture, SessionRecorder  # Gravação da sessão e replay sem webcam.
+from capture import Capture, mirror_boxes, mirror_keypoints  # Webcam, vídeo, RTSP ou imagens, sem alocar por frame.
+from metrics import LatencyMonitor  # Tempo de cada etapa (p50/p95/p99) e fps, com overlay e exportação.
+from display import Display, StaticOverlay  # Janela redimensionada só quando muda e desenhos fixos em cache.
+from backends import BACKENDS, load_backend  # Modelo em ONNX Runtime/OpenVINO (com cache) ou Ultralytics.
+from gestures import GESTOS, GestureEngine  # Volante com as duas mãos, parada com a mão levantada e swipe de modo.
 
 # --- Definição da Classe Principal do Projeto ---
 # Usar uma classe ajuda a organizar o código, mantendo variáveis e funções relacionadas juntas.
@@ -12,185 +23,416 @@ class PoseEstimation:
     # --- Método Construtor (__init__) ---
     # Este método é executado automaticamente uma única vez quando criamos um objeto da classe.
     # É usado para configurar tudo o que o programa precisa para começar.
-    def __init__(self, video_name):
-        # Carrega o modelo de estimativa de pose pré-treinado do YOLO.
-        # Este arquivo (.pt) deve estar na mesma pasta do script.
-        self.model = YOLO("yolo11n-pose.pt")
-        
-        # O caminho do vídeo não é usado se a webcam estiver ativa, mas é parte da estrutura.
+    def __init__(self, video_name, fps_alvo=25, usar_fluxo=False, porta=None, gravador=None, verbose=False,
+                 arquivo_metricas=None, headless=False, backend='auto', gestos=None):
+        # Caminho de um vídeo para usar no lugar da webcam (None = webcam).
         self.video_path = video_name
+
+        # Gravação opcional da sessão (recorder.SessionRecorder): keypoints, comandos e tráfego serial.
+        self.gravador = gravador
+        # No replay de uma sessão sem imagens (ou com --replay-keypoints) os keypoints gravados
+        # substituem o YOLO (ver detectar_pose).
+        self.replay = None
         
         # Fator de escala para redimensionar a janela de exibição no final. 0.5 = 50% do tamanho original.
         self.scale = 1.0
+
+        # Modo headless (sem monitor, ex: computador de bordo): nada é desenhado nem exibido.
+        self.headless = headless
+        self.display = None if headless else Display("Controle com YOLO", self.scale)
+        # O anel do joystick e as diagonais não mudam: são desenhados uma vez e só copiados em cada frame.
+        self.overlay_joystick = StaticOverlay(self.desenhar_joystick)
+        # O "efeito espelho" é feito no próprio buffer da captura. No modo headless ninguém vê a imagem,
+        # então ela nem é espelhada: só os keypoints são (a não ser que o fluxo óptico precise da imagem).
+        self.espelhar_imagem = not headless or usar_fluxo
+
+        # Converte os keypoints em comandos (direção + velocidade) usando o joystick virtual em anel.
+        # outer_radius é a área total do joystick e inner_radius a "zona morta" no centro.
+        self.mapper = PoseCommandMapper(outer_radius=200, inner_radius=60)
+
+        # Decide a cada frame se o YOLO roda, em qual recorte e com qual resolução, para manter o fps_alvo.
+        self.scheduler = AdaptiveScheduler(fps_alvo=fps_alvo)
+
+        # Carrega o modelo de estimativa de pose pré-treinado do YOLO.
+        # Este arquivo (.pt) deve estar na mesma pasta do script. Com backend 'auto' ele roda exportado para
+        # ONNX Runtime ou OpenVINO quando instalados (a exportação fica em cache), senão pelo Ultralytics.
+        # O modelo já é aquecido aqui em todos os imgsz do agendador, antes da câmera abrir, para que a
+        # primeira inferência (bem mais lenta) não aconteça no meio do controle.
+        self.backend = load_backend(backend, imgsz_opcoes=self.scheduler.imgsz_opcoes)
+
+        # Mantém um ID por pessoa entre os frames e prevê os keypoints nos frames em que o YOLO é pulado.
+        # Com usar_fluxo=True a previsão usa fluxo óptico no pulso e nos ombros.
+        self.tracker = PoseTracker(usar_fluxo=usar_fluxo)
+
+        # Gestos opcionais (nomes de gestures.GESTOS) reconhecidos no histórico de keypoints de cada pessoa.
+        # Com eles a mão levantada para o carrinho e o swipe alterna entre o joystick em anel e o volante.
+        self.gestos = GestureEngine(gestos) if gestos else None
         
+        # Mede o tempo de cada etapa do loop. As estatísticas aparecem na janela e podem ser exportadas.
+        self.metricas = LatencyMonitor()
+        # Imprime cada comando enviado. Desligado por padrão: o print no loop principal também custa tempo.
+        self.verbose = verbose
+        self.arquivo_metricas = arquivo_metricas  # .json ou .csv gravado no fim da execução (None = não exporta).
+
         # --- Configuração da Conexão com o Arduino ---
-        self.arduino = None  # Inicia a variável do Arduino como nula.
-        porta_bluetooth = 'COM7'  # IMPORTANTE: Verifique no seu PC e altere esta porta COM se necessário.
-        
-        # O bloco 'try...except' tenta se conectar ao Arduino.
-        # Se a conexão falhar (carrinho desligado, porta errada), ele avisa o erro mas não trava o programa.
-        try:
-            self.arduino = serial.Serial(porta_bluetooth, 9600, timeout=1)
-            print(f"Conectado ao Arduino na porta {porta_bluetooth}")
-            time.sleep(2)  # Uma pequena pausa para estabilizar a conexão serial.
-        except serial.SerialException as e:
-            print(f"Erro ao conectar ao Arduino: {e}")
-            print("O programa continuará em modo de teste visual.")
+        # porta: ex 'COM7' (veja nas configurações Bluetooth do PC). Com None a porta é procurada automaticamente.
+        # A conexão roda em segundo plano: se o carrinho estiver desligado, o programa segue em modo de teste
+        # visual e conecta sozinho quando ele aparecer (ou reconecta se o Bluetooth cair).
+        self.transporte = SerialTransport(porta, gravador=gravador, metricas=self.metricas)
+        self.transporte.start()
         
         # Esta variável armazena o último comando enviado.
         # Usamos isso para evitar enviar o mesmo comando repetidamente e sobrecarregar o Bluetooth.
         self.ultimo_comando = ""
 
+    # --- Processamento de um Frame ---
+    # Faz todo o trabalho de visão em um único frame: roda o YOLO, decide o comando e desenha o joystick
+    # e o esqueleto. Retorna o comando e o frame desenhado. O tempo de cada etapa vai para self.metricas.
+    # Fica separado do loop para poder ser usado tanto no modo sequencial quanto no modo com threads.
+    def processar_frame(self, frame):
+        t = self.metricas.tic()
+        # Imagem da câmera sem espelho e sem desenhos, para a gravação. Como o espelho e os desenhos
+        # são feitos no próprio buffer, a cópia só é necessária quando as imagens são gravadas.
+        original = frame
+        if self.gravador is not None and self.gravador.salvar_frames:
+            original = frame.copy()
+        # Inverte o frame horizontalmente para criar um "efeito espelho", que é mais intuitivo.
+        # dst=frame: espelha no lugar, sem alocar outra imagem.
+        if self.espelhar_imagem:
+            frame = cv2.flip(frame, 1, dst=frame)
+        # Obtém as dimensões do frame (altura, largura) para cálculos de posicionamento.
+        height, width, _ = frame.shape
+
+        # --- Executa a Detecção de Pose do YOLO no Frame Atual ---
+        # Roda antes dos desenhos, para o modelo ver a imagem limpa. Nos frames pulados pelo agendador
+        # os keypoints são os da última inferência.
+        keypoints = self.detectar_pose(frame)
+        t = self.metricas.toc('inferencia', t)
+        
+        # Centro do joystick virtual: o ponto central da tela.
+        center_x, center_y = width // 2, height // 2
+
+        # Inicia as variáveis de controle com valores padrão de "parado".
+        direcao = 'S'
+        velocidade = 0
+        ativo = False
+
+        # --- Lógica de Controle do Joystick em Anel ---
+        # O mapeador usa o pulso (índice 9; tudo está invertido por causa do espelho) como cursor,
+        # mede a distância e o ângulo até o centro e escolhe a direção pelo cone onde o pulso está.
+        # A velocidade (0-9) é proporcional à distância dentro do anel. Fora do anel o comando é 'S0'.
+        # Se nenhuma pessoa foi detectada, o carrinho fica parado.
+        if keypoints is not None:
+            direcao, velocidade, ativo = self.mapper.map_one(keypoints, (center_x, center_y))
+
+        # --- Gestos (opcional) ---
+        # A parada de emergência vale em qualquer modo; no modo volante o comando vem das duas mãos.
+        estado = self.atualizar_gestos(keypoints) if self.gestos is not None else None
+        if estado is not None:
+            if estado.parada:
+                direcao, velocidade, ativo = 'S', 0, False
+            elif estado.modo == 'volante':
+                direcao, velocidade = estado.volante or ('S', 0)
+                ativo = False
+        # Formata a direção e a velocidade em uma única string (ex: "F7", "S0").
+        comando_final = f"{direcao}{velocidade}"
+        t = self.metricas.toc('mapeamento', t)
+
+        # --- Desenho do Joystick e do Esqueleto na Tela (Feedback Visual) ---
+        # No modo headless ninguém vai ver o frame, então os desenhos são pulados.
+        if not self.headless:
+            self.overlay_joystick.apply(frame)
+
+            if keypoints is not None:
+                if ativo:
+                    # Desenha um ponto verde no pulso para mostrar que o controle está ativo.
+                    pulso_x, pulso_y = keypoints[self.mapper.keypoint]
+                    cv2.circle(frame, (int(pulso_x), int(pulso_y)), 10, (0, 255, 0), -1)
+
+                # --- Desenho do Esqueleto Completo (Feedback Visual) ---
+                # Todos os ossos com os dois pontos detectados são desenhados de uma vez, em cor ciano.
+                self.mapper.draw_skeleton(frame, keypoints, color=(255, 255, 0))
+            if estado is not None:
+                # Modo atual no canto superior (as métricas ficam no canto inferior); vermelho durante a parada.
+                texto = "PARADA" if estado.parada else f"modo: {estado.modo}"
+                cor = (0, 0, 255) if estado.parada else (255, 255, 255)
+                cv2.putText(frame, texto, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, cor, 2, cv2.LINE_AA)
+            self.metricas.toc('desenho', t)
+        
+        if self.gravador is not None:
+            self.gravador.record_frame(original, keypoints, direcao, velocidade)
+        return comando_final, frame
+
+    # --- Atualização dos Gestos ---
+    # Todas as pessoas rastreadas alimentam o próprio histórico (assim quem assumir o controle já tem um);
+    # retorna o GestureState de quem controla o carrinho, ou None.
+    def atualizar_gestos(self, keypoints):
+        if self.replay is not None:
+            # No replay só existem os keypoints gravados da pessoa que controlava, e o tempo é o gravado:
+            # os gestos dependem de janelas de tempo, então o relógio de parede mudaria os comandos.
+            if keypoints is None:
+                return None
+            return self.gestos.update(0, keypoints, self.replay.tempo)
+        agora = time.perf_counter()
+        estados = self.gestos.update_tracks(self.tracker.tracks, agora)
+        principal = self.tracker.principal()
+        if principal is None or principal.perdidos > 0:  # Como em _keypoints_principal: track perdido não dirige.
+            return None
+        return estados.get(principal.id)
+
+    # --- Desenho do Joystick Virtual ---
+    # Chamado pelo StaticOverlay só quando o tamanho do frame muda; o resultado fica em cache.
+    def desenhar_joystick(self, camada, width, height):
+        # --- Definições Geométricas do Joystick Virtual ---
+        center_x, center_y = width // 2, height // 2  # Ponto central da tela.
+        outer_radius = self.mapper.outer_radius  # Raio do círculo externo (a área total do joystick).
+        inner_radius = self.mapper.inner_radius  # Raio do círculo interno (a "zona morta" no centro).
+
+        # Desenha o círculo externo em verde.
+        cv2.circle(camada, (center_x, center_y), outer_radius, (0, 255, 0), 2)
+        # Desenha a zona morta em vermelho.
+        cv2.circle(camada, (center_x, center_y), inner_radius, (0, 0, 255), 2)
+        
+        # Calcula os pontos para desenhar as linhas de divisão diagonais (formato de "X").
+        offset = int(outer_radius / math.sqrt(2))
+        # Desenha as duas linhas diagonais em branco para delimitar visualmente os quadrantes.
+        cv2.line(camada, (center_x - offset, center_y - offset), 
+                         (center_x + offset, center_y + offset), (255, 255, 255), 1)
+        cv2.line(camada, (center_x - offset, center_y + offset), 
+                         (center_x + offset, center_y - offset), (255, 255, 255), 1)
+
+    # --- Detecção de Pose com Agendamento Adaptativo e Rastreamento ---
+    # Retorna os 17 keypoints (x, y) da pessoa que controla o carrinho, em coordenadas do frame, ou None.
+    # O agendador decide se este frame passa pelo modelo, qual recorte (ROI) usar e com qual imgsz.
+    # Nos frames sem inferência o rastreador prevê onde os keypoints estão.
+    def detectar_pose(self, frame):
+        # Replay: os keypoints gravados (já em coordenadas do frame espelhado) são usados direto,
+        # para que a mesma sessão produza sempre os mesmos comandos.
+        if self.replay is not None:
+            return self.replay.keypoints
+
+        agora = time.perf_counter()
+        if not self.scheduler.should_infer():
+            self.tracker.predict(agora, frame)
+            return self._keypoints_principal()
+
+        # Recorta a região em volta da última pessoa (ou usa o frame inteiro se ela foi perdida).
+        x0, y0, x1, y1 = self.scheduler.roi(frame.shape)
+        largura = frame.shape[1]
+        if not self.espelhar_imagem:
+            # A imagem não foi espelhada: o recorte (em coordenadas espelhadas) é espelhado para achá-la.
+            x0, x1 = largura - x1, largura - x0
+        inicio = time.perf_counter()
+        # Extrai os 17 pontos-chave e a caixa de todas as pessoas detectadas.
+        keypoints, caixas = self.backend.infer(frame[y0:y1, x0:x1], self.scheduler.imgsz)
+        latencia = time.perf_counter() - inicio
+
+        if len(caixas) > 0:
+            # Volta do recorte para o frame inteiro. Pontos não detectados continuam em (0, 0).
+            detectados = np.all(keypoints > 0, axis=-1)
+            keypoints[detectados] += (x0, y0)
+            caixas = caixas + (x0, y0, x0, y0)
+            if not self.espelhar_imagem:
+                # Espelha só as coordenadas, como se a imagem tivesse sido espelhada.
+                keypoints = mirror_keypoints(keypoints, largura)
+                caixas = mirror_boxes(caixas, largura)
+
+        # O rastreador associa as detecções às pessoas já conhecidas; a mais antiga continua no controle.
+        self.tracker.update(keypoints, caixas, agora, frame)
+        principal = self.tracker.principal()
+        # Só a caixa de uma pessoa encontrada nesta inferência define o próximo recorte; se ela foi perdida,
+        # o agendador volta para o frame inteiro em vez de continuar recortando em volta da caixa antiga.
+        encontrado = principal is not None and principal.perdidos == 0
+        self.scheduler.update(latencia, principal.caixa if encontrado else None)
+        return self._keypoints_principal()
+
+    # Keypoints de quem controla o carrinho, ou None (carrinho parado) se não há ninguém ou se a pessoa
+    # não foi encontrada na última inferência: o track continua vivo por alguns frames para recuperar o ID
+    # quando ela reaparecer, mas a previsão dele não dirige o carrinho.
+    def _keypoints_principal(self):
+        principal = self.tracker.principal()
+        if principal is None or principal.perdidos > 0:
+            return None
+        return principal.keypoints
+
+    # --- Envio do Comando para o Arduino ---
+    # 'instante_captura' (time.perf_counter() da leitura do frame) permite medir a latência ponta a ponta.
+    def enviar_comando(self, comando_final, instante_captura=None):
+        t = self.metricas.tic()
+        # Envia o comando apenas se ele for novo. O envio não bloqueia: o transporte escreve
+        # na porta em segundo plano e, se vários comandos se acumularem, só o mais recente sai.
+        if comando_final != self.ultimo_comando:
+            self.transporte.send_direction(comando_final[0], int(comando_final[1:]), instante=instante_captura)
+            if self.verbose:
+                print(f"Comando enviado: {comando_final}")
+            self.ultimo_comando = comando_final # Atualiza o último comando enviado.
+        else:
+            # Mesmo comando: só avisa que o loop continua vivo, para o transporte seguir repetindo o comando.
+            self.transporte.keepalive()
+        self.metricas.toc('serial', t)
+        if instante_captura is not None:
+            self.metricas.toc('total', instante_captura)
+        self.metricas.frame_done()
+
+    # --- Exibição do Frame ---
+    # Retorna False quando o usuário pede para sair (tecla 'q').
+    def exibir_frame(self, frame):
+        t = self.metricas.tic()
+        # Escreve fps e p50/p95/p99 de cada etapa no canto da imagem.
+        self.metricas.draw_overlay(frame)
+        # Mostra o frame final (com todos os desenhos) na janela, redimensionada pelo fator de escala
+        # só quando o tamanho muda. Se a tecla 'q' for pressionada, encerra o loop.
+        continuar = self.display.show(frame)
+        self.metricas.toc('exibicao', t)
+        return continuar
+
     # --- Método Principal de Análise e Controle ---
     # Contém o loop principal que roda continuamente para processar o vídeo.
-    def analyze_pose_and_control(self):
-        # Cria uma janela com um nome específico. O WINDOW_NORMAL permite redimensioná-la.
-        cv2.namedWindow("Controle com YOLO", cv2.WINDOW_NORMAL)
-        # Inicia a captura de vídeo da webcam padrão (índice 0).
-        cam = cv2.VideoCapture(0)
-        
+    # Com pipelined=True, captura, inferência e envio rodam em threads separadas (ver pipeline.py).
+    # 'fonte' substitui a câmera por qualquer objeto com isOpened/read/release (ex: capture.Capture,
+    # recorder.ReplayCapture).
+    def analyze_pose_and_control(self, pipelined=False, fonte=None):
+        if fonte is not None:
+            cam = fonte
+        elif self.video_path:
+            cam = Capture(self.video_path)  # Arquivo de vídeo, URL RTSP ou diretório de imagens.
+        else:
+            # Inicia a captura de vídeo da webcam padrão (índice 0).
+            cam = Capture(0)
+
+        if isinstance(cam, ReplayCapture) and cam.usar_keypoints:
+            if pipelined:
+                # No modo com threads a captura descarta frames, então não daria para casar frame e keypoints.
+                raise ValueError("o replay de keypoints gravados só funciona no modo sequencial")
+            self.replay = cam
+
+        try:
+            if pipelined:
+                self._loop_pipeline(cam)
+            else:
+                self._loop_sequencial(cam)
+        except KeyboardInterrupt:
+            # Sem janela (headless) a forma de sair é o Ctrl+C.
+            print("\nPrograma encerrado pelo usuário.")
+        finally:
+            # --- Finalização do Programa ---
+            # Este código é executado quando o loop termina.
+            # Envia um último comando de parada para garantir que o carrinho não continue andando.
+            self.transporte.close() # Envia a parada e fecha a conexão serial de forma segura.
+            if self.gravador is not None:
+                self.gravador.close() # Grava o que ainda está no buffer e o meta.json da sessão.
+            if self.arquivo_metricas:
+                self.metricas.export(self.arquivo_metricas) # Salva p50/p95/p99 de cada etapa e o fps.
+            
+            cam.release() # Libera o dispositivo da câmera para que outros programas possam usá-la.
+            if self.display is not None:
+                self.display.close() # Fecha a janela do OpenCV.
+
+    # Modo original: cada etapa roda uma depois da outra na mesma thread.
+    def _loop_sequencial(self, cam):
+        reciclar = getattr(cam, 'recycle', None)
         # Loop principal: continua rodando enquanto a câmera estiver aberta.
         while cam.isOpened():
             # Lê um único frame (uma imagem) da câmera. 'ret' é um booleano (True se a leitura foi bem-sucedida).
+            instante_captura = self.metricas.tic()
             ret, frame = cam.read()
             if not ret:  # Se não conseguir ler o frame, encerra o loop.
                 break
-            
-            # Inverte o frame horizontalmente para criar um "efeito espelho", que é mais intuitivo.
-            frame = cv2.flip(frame, 1)
-            # Obtém as dimensões do frame (altura, largura) para cálculos de posicionamento.
-            height, width, _ = frame.shape
-            
-            # --- Definições Geométricas do Joystick Virtual ---
-            center_x, center_y = width // 2, height // 2  # Ponto central da tela.
-            outer_radius = 200  # Raio do círculo externo (a área total do joystick).
-            inner_radius = 60   # Raio do círculo interno (a "zona morta" no centro).
-
-            # --- Desenho do Joystick na Tela (Feedback Visual) ---
-            # Desenha o círculo externo em verde.
-            cv2.circle(frame, (center_x, center_y), outer_radius, (0, 255, 0), 2)
-            # Desenha a zona morta em vermelho.
-            cv2.circle(frame, (center_x, center_y), inner_radius, (0, 0, 255), 2)
-            
-            # Calcula os pontos para desenhar as linhas de divisão diagonais (formato de "X").
-            offset = int(outer_radius / math.sqrt(2))
-            # Desenha as duas linhas diagonais em branco para delimitar visualmente os quadrantes.
-            cv2.line(frame, (center_x - offset, center_y - offset), 
-                             (center_x + offset, center_y + offset), (255, 255, 255), 1)
-            cv2.line(frame, (center_x - offset, center_y + offset), 
-                             (center_x + offset, center_y - offset), (255, 255, 255), 1)
-
-            # --- Executa a Detecção de Pose do YOLO no Frame Atual ---
-            results = self.model(frame, verbose=False) # verbose=False para não poluir o terminal com logs do YOLO.
-            
-            # Inicia as variáveis de controle com valores padrão de "parado".
-            direcao = 'S'
-            velocidade = 0
-
-            # O 'try...except IndexError' evita que o programa quebre se o YOLO não detectar nenhuma pessoa no frame.
-            try:
-                # Extrai as coordenadas (x, y) dos 17 pontos-chave da primeira pessoa detectada.
-                keypoints = results[0].keypoints.xy.cpu().numpy()[0]
-                
-                # --- Ponto de Controle ---
-                # Selecionamos o pulso direito (índice 10) como nosso cursor.
-                # Para usar o pulso esquerdo, o índice seria 9.
-                # Tudo está invertido
-                pulso_x, pulso_y = keypoints[9]
-
-                # --- Lógica de Controle do Joystick em Anel ---
-                # Calcula a distância do pulso ao centro usando o Teorema de Pitágoras.
-                distance_from_center = math.sqrt((pulso_x - center_x)**2 + (pulso_y - center_y)**2)
-                
-                # A lógica de controle só é ativada se o pulso estiver dentro do anel (entre o raio interno e externo).
-                if inner_radius < distance_from_center <= outer_radius:
-                    # Desenha um ponto verde no pulso para mostrar que o controle está ativo.
-                    cv2.circle(frame, (int(pulso_x), int(pulso_y)), 10, (0, 255, 0), -1)
-
-                    # --- LÓGICA DE CONTROLE POR ÂNGULO (MAIS ROBUSTA) ---
-                    # Calcula a posição do pulso em relação ao centro.
-                    delta_x = pulso_x - center_x
-                    delta_y = pulso_y - center_y
-                    
-                    # Calcula o ângulo em graus. Usamos atan2 para obter o quadrante correto.
-                    # Multiplicamos delta_y por -1 porque no OpenCV o eixo Y cresce para baixo.
-                    angle = math.degrees(math.atan2(-delta_y, delta_x))
-
-                    # Define as zonas de comando (cones) baseadas no ângulo calculado.
-                    if -45 <= angle < 45:
-                        direcao = 'R'  # Direita
-                    elif 45 <= angle < 135:
-                        direcao = 'F'  # Frente
-                    elif angle >= 135 or angle < -135:
-                        direcao = 'L'  # Esquerda
-                    elif -135 <= angle < -45:
-                        direcao = 'B'  # Trás
-                    
-                    # Calcula a velocidade (0-9) de forma proporcional à distância do pulso ao centro do anel.
-                    velocidade = int( (distance_from_center - inner_radius) / (outer_radius - inner_radius) * 9 )
-                
-                # Garante que, por algum erro de cálculo, a velocidade nunca passe de 9.
-                velocidade = min(velocidade, 9)
-
-                # --- Desenho do Esqueleto Completo (Feedback Visual) ---
-                color = (255, 255, 0) # Cor ciano para o esqueleto.
-                # Lista de pares de índices de keypoints que devem ser conectados por uma linha.
-                connections = [
-                    (6, 4), (4, 2), (2, 0), (0, 1), (1, 3), (10, 8), (8, 6), (6, 5),
-                    (5, 7), (7, 9), (6, 12), (11, 5), (11, 12), (11, 13), (13, 15),
-                    (12, 14), (14, 16)
-                ]
-                # Itera sobre as conexões e desenha cada linha do esqueleto.
-                for start_idx, end_idx in connections:
-                    # Verifica se os pontos-chave são válidos (detectados) antes de desenhar.
-                    if np.all(keypoints[start_idx] > 0) and np.all(keypoints[end_idx] > 0):
-                        cv2.line(frame, tuple(keypoints[start_idx].astype(int)), tuple(keypoints[end_idx].astype(int)), color, 2)
-
-            except IndexError:
-                # Se nenhuma pessoa for detectada, o código dentro do 'try' falha e vem para cá.
-                # 'pass' significa que ele simplesmente ignora o erro e continua para o próximo frame.
-                pass 
-            
-            # --- Envio do Comando para o Arduino ---
-            # Formata a direção e a velocidade em uma única string (ex: "F7", "S0").
-            comando_final = f"{direcao}{velocidade}"
-            # Envia o comando apenas se a conexão com o Arduino existir e se o comando for novo.
-            if self.arduino and self.arduino.is_open and comando_final != self.ultimo_comando:
-                self.arduino.write((comando_final + "\n").encode()) # Envia o comando pela porta serial.
-                print(f"Comando enviado: {comando_final}")
-                self.ultimo_comando = comando_final # Atualiza o último comando enviado.
-
-            # --- Exibição do Frame ---
-            # Redimensiona a janela de acordo com o fator de escala definido no construtor.
-            window_width = int(width * self.scale)
-            window_height = int(height * self.scale)
-            cv2.resizeWindow("Controle com YOLO", window_width, window_height)
-            # Mostra o frame final (com todos os desenhos) na janela.
-            cv2.imshow("Controle com YOLO", frame)
-
-            # Espera por 1 milissegundo. Se a tecla 'q' for pressionada, encerra o loop.
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            self.metricas.toc('captura', instante_captura)
+            comando_final, frame = self.processar_frame(frame)
+            self.enviar_comando(comando_final, instante_captura)
+            continuar = self.headless or self.exibir_frame(frame)
+            # Frame já exibido: o buffer volta para a captura (capture.Capture) usar na próxima leitura.
+            if reciclar is not None:
+                reciclar(frame)
+            if not continuar:
                 break
-        
-        # --- Finalização do Programa ---
-        # Este código é executado quando o loop 'while' termina.
-        # Envia um último comando de parada para garantir que o carrinho não continue andando.
-        if self.arduino and self.arduino.is_open:
-            self.arduino.write(b'S0\n')
-            self.arduino.close() # Fecha a conexão serial de forma segura.
-        
-        cam.release() # Libera o dispositivo da câmera para que outros programas possam usá-la.
-        cv2.destroyAllWindows() # Fecha todas as janelas do OpenCV.
+
+    # Modo com threads: a thread principal só exibe o frame mais recente que a inferência produziu.
+    # No modo headless ela só espera o fim da captura (ou o Ctrl+C).
+    def _loop_pipeline(self, cam):
+        pipeline = PosePipeline(cam, self.processar_frame, self.enviar_comando, exibir=not self.headless,
+                                metricas=self.metricas)
+        pipeline.start()
+        try:
+            while self.headless and pipeline.rodando():
+                pipeline.parar.wait(0.1)
+            while pipeline.rodando():
+                frame = pipeline.fila_exibicao.get(timeout=0.1)
+                if frame is None:
+                    continue
+                continuar = self.exibir_frame(frame)
+                pipeline.recycle(frame)
+                if not continuar:
+                    break
+        finally:
+            # Para as threads antes do comando de parada final, para que nenhum comando atrasado chegue depois dele.
+            pipeline.stop()
+        # Um erro numa das threads (ex: no modelo) encerra o programa com o erro, e não em silêncio;
+        # o comando de parada é enviado no finally de analyze_pose_and_control.
+        pipeline.check()
 
 # --- Função para Executar o Programa ---
-def run_control():
+# video: arquivo de vídeo no lugar da webcam. replay: diretório de uma sessão gravada (velocidade 0 = sem esperar).
+# replay_keypoints: usa os keypoints gravados mesmo numa sessão com imagens (só o controle é testado).
+# gravar: diretório onde a sessão será gravada; gravar_frames inclui as imagens além dos keypoints.
+# resolucao (largura, altura), fps_camera e buffer_camera são pedidos à câmera ao vivo.
+def run_control(pipelined=False, fps_alvo=25, usar_fluxo=False, porta=None, video=None,
+                replay=None, velocidade_replay=0.0, replay_keypoints=False, gravar=None, gravar_frames=False,
+                metricas=None, verbose=False, headless=False, backend='auto', resolucao=None, fps_camera=None, buffer_camera=1, gestos=None):
+    gravador = SessionRecorder(gravar, salvar_frames=gravar_frames) if gravar else None
     # Cria uma instância (objeto) da nossa classe PoseEstimation.
-    pe = PoseEstimation('video.mp4')
+    pe = PoseEstimation(video, fps_alvo=fps_alvo, usar_fluxo=usar_fluxo, porta=porta, gravador=gravador,
+                        verbose=verbose, arquivo_metricas=metricas, headless=headless,
+                        backend=backend, gestos=gestos)
+    if replay:
+        fonte = ReplayCapture(replay, velocidade=velocidade_replay, usar_keypoints=replay_keypoints or None)
+    else:
+        largura, altura = resolucao or (None, None)
+        fonte = Capture(video if video is not None else 0, largura, altura, fps_camera, buffer_camera)
     # Chama o método principal para iniciar a detecção e o controle.
-    pe.analyze_pose_and_control()
+    pe.analyze_pose_and_control(pipelined=pipelined, fonte=fonte)
 
 # --- Ponto de Entrada do Script ---
 # A condição __name__ == '__main__' garante que o código abaixo só será executado
 # quando você rodar este arquivo diretamente (e não quando ele for importado por outro script).
 if __name__ == '__main__':
-    run_control()   
+    parser = argparse.ArgumentParser(description="Controle do carrinho com a pose detectada pelo YOLO.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="roda captura, inferência e envio serial em threads separadas")
+    parser.add_argument('--fps-alvo', type=int, default=25,
+                        help="taxa de frames que o agendador adaptativo tenta manter")
+    parser.add_argument('--fluxo-optico', action='store_true',
+                        help="prevê pulso e ombros com fluxo óptico nos frames sem inferência")
+    parser.add_argument('--porta', default=None,
+                        help="porta serial do carrinho (ex: COM7); sem ela a porta é procurada automaticamente")
+    parser.add_argument('--video', default=None,
+                        help="índice da webcam, arquivo de vídeo, URL RTSP ou diretório de imagens (padrão: webcam 0)")
+    parser.add_argument('--resolucao', default=None, help="resolução pedida à câmera, ex: 640x480")
+    parser.add_argument('--fps-camera', type=int, default=None, help="fps pedido à câmera")
+    parser.add_argument('--buffer-camera', type=int, default=1,
+                        help="frames guardados pelo driver da câmera (1 = sempre o mais novo)")
+    parser.add_argument('--replay', default=None, help="diretório de uma sessão gravada com --gravar")
+    parser.add_argument('--replay-keypoints', action='store_true',
+                        help="no replay, usa os keypoints gravados em vez de rodar o modelo sobre as imagens gravadas")
+    parser.add_argument('--velocidade-replay', type=float, default=0.0,
+                        help="1 = tempo real, 4 = quatro vezes mais rápido, 0 = o mais rápido possível")
+    parser.add_argument('--gravar', default=None, help="diretório onde gravar keypoints, comandos e serial")
+    parser.add_argument('--gravar-frames', action='store_true', help="grava também as imagens da câmera")
+    parser.add_argument('--metricas', default=None,
+                        help="arquivo .json ou .csv onde salvar os tempos de cada etapa ao sair")
+    parser.add_argument('--verbose', action='store_true', help="imprime cada comando enviado")
+    parser.add_argument('--headless', action='store_true',
+                        help="não desenha nem abre janela (ex: computador de bordo sem monitor); saia com Ctrl+C")
+    parser.add_argument('--backend', choices=BACKENDS, default='auto',
+                        help="onde o modelo roda; 'auto' usa ONNX Runtime ou OpenVINO se instalados, senão o Ultralytics")
+    parser.add_argument('--gestos', nargs='+', choices=tuple(GESTOS), default=None,
+                        help="gestos reconhecidos: volante (duas mãos), parada (mão levantada) e swipe (troca o modo)")
+    args = parser.parse_args()
+    run_control(pipelined=args.pipeline, fps_alvo=args.fps_alvo, usar_fluxo=args.fluxo_optico, porta=args.porta,
+                video=args.video, replay=args.replay, velocidade_replay=args.velocidade_replay,
+                replay_keypoints=args.replay_keypoints,
+                gravar=args.gravar, gravar_frames=args.gravar_frames, metricas=args.metricas, verbose=args.verbose,
+                headless=args.headless, backend=args.backend,
+                resolucao=tuple(int(v) for v in args.resolucao.split('x')) if args.resolucao else None,
+                fps_camera=args.fps_camera, buffer_camera=args.buffer_camera, gestos=args.gestos)   